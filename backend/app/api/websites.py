@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from app.core.database import get_supabase
 from app.core.auth import get_current_active_user
 from app.models.user import User
 from app.models.website import Website, WebsiteCreate, WebsiteUpdate, WebsiteStatus
-from app.services.scraper import scrape_website
-from app.services.embeddings import process_website_embeddings
+from app.services.archive import get_crawl_archive
+from app.services.ingestion import enqueue_website_ingestion, enqueue_website_reindex
 from datetime import datetime
+import asyncio
 import uuid
 
 router = APIRouter()
@@ -217,6 +218,11 @@ async def delete_website(
         # Delete website
         supabase.table("websites").delete().eq("id", website_id).execute()
         
+        # Drop its archived pages too
+        archive = get_crawl_archive()
+        if archive is not None:
+            await asyncio.to_thread(archive.delete_website, website_id)
+        
         return {"message": "Website deleted successfully"}
     except Exception as e:
         raise HTTPException(
@@ -227,7 +233,6 @@ async def delete_website(
 @router.post("/{website_id}/scrape")
 async def start_website_scraping(
     website_id: str,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user)
 ):
     """Start scraping a website"""
@@ -244,52 +249,41 @@ async def start_website_scraping(
         
         website = Website(**website_response.data)
         
-        # Update status to scraping
-        supabase.table("websites").update({
-            "status": WebsiteStatus.SCRAPING.value,
-            "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", website_id).execute()
-        
-        # Start background scraping task
-        background_tasks.add_task(scrape_and_process_website, website_id, str(website.url))
+        # Queue the scrape for the ingestion workers; status moves to scraping once a worker picks it up
+        job = await enqueue_website_ingestion(website)
         
-        return {"message": "Website scraping started", "website_id": website_id}
+        return {"message": "Website scraping started", "website_id": website_id, "job_id": job.id}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to start scraping: {str(e)}"
         )
 
-async def scrape_and_process_website(website_id: str, website_url: str):
-    """Background task to scrape and process website"""
+@router.post("/{website_id}/reindex")
+async def start_website_reindex(
+    website_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Re-index a website from the crawl archive with the current chunking and embedding settings"""
     supabase = await get_supabase()
     
     try:
-        # Scrape website
-        scraped_content = await scrape_website(website_url)
-        
-        # Update status to processing
-        supabase.table("websites").update({
-            "status": WebsiteStatus.PROCESSING.value,
-            "pages_scraped": len(scraped_content),
-            "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", website_id).execute()
+        # Check if website exists and belongs to user
+        website_response = supabase.table("websites").select("*").eq("id", website_id).eq("user_id", current_user.id).single().execute()
+        if not website_response.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Website not found"
+            )
         
-        # Process embeddings
-        total_chunks = await process_website_embeddings(website_id, scraped_content)
+        website = Website(**website_response.data)
         
-        # Update status to completed
-        supabase.table("websites").update({
-            "status": WebsiteStatus.COMPLETED.value,
-            "total_chunks": total_chunks,
-            "last_scraped_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", website_id).execute()
+        # Pages come from the local archive, so nothing is fetched again
+        job = await enqueue_website_reindex(website)
         
+        return {"message": "Website re-indexing started", "website_id": website_id, "job_id": job.id}
     except Exception as e:
-        # Update status to failed
-        supabase.table("websites").update({
-            "status": WebsiteStatus.FAILED.value,
-            "error_message": str(e),
-            "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", website_id).execute() 
\ No newline at end of file
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to start re-indexing: {str(e)}"
+        )
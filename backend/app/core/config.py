@@ -17,10 +17,39 @@ class Settings(BaseSettings):
     HUGGINGFACE_API_KEY: str
     HUGGINGFACE_EMBEDDING_MODEL: str = "sentence-transformers/paraphrase-MiniLM-L3-v2"
     HUGGINGFACE_CHAT_MODEL: str = "microsoft/DialoGPT-medium"
+
+    # Embedding Backend Configuration
+    EMBEDDING_BACKEND: str = "huggingface_api"  # "huggingface_api", "local" (in-process torch), or "auto" (local when installed)
+    EMBEDDING_DIMENSION: int = 384  # Vector size of HUGGINGFACE_EMBEDDING_MODEL
+    EMBEDDING_BATCH_SIZE: int = 64  # Texts per forward pass of the local model
+    EMBEDDING_THREADS: int = 0  # CPU threads for local inference; 0 lets torch decide
+    EMBEDDING_DEVICE: str = "cpu"
+    HUGGINGFACE_API_URL: str = "https://api-inference.huggingface.co/models"  # Model name is appended
+    EMBEDDING_REMOTE_BATCH_SIZE: int = 32  # Texts per request to the remote endpoint
+    EMBEDDING_REMOTE_CONCURRENCY: int = 4  # Initial requests in flight; adapts to latency and 429/503
+    EMBEDDING_REMOTE_MAX_CONCURRENCY: int = 16
+    EMBEDDING_REMOTE_TIMEOUT: float = 30.0
+    EMBEDDING_REMOTE_MAX_RETRIES: int = 4
+    EMBEDDING_REMOTE_RETRY_BASE_DELAY: float = 0.5
+    EMBEDDING_REMOTE_RETRY_MAX_DELAY: float = 20.0
+    EMBEDDING_CIRCUIT_FAILURES: int = 5  # Consecutive failures that stop calls to the endpoint
+    EMBEDDING_CIRCUIT_RESET_SECONDS: float = 30.0
+    EMBEDDING_CACHE_ENABLED: bool = True  # Reuse vectors of chunk text embedded before (any website)
+    EMBEDDING_CACHE_PATH: str = "embedding_cache.db"
+    EMBEDDING_CACHE_MAX_MB: int = 512  # Least recently used vectors are evicted beyond this; 0 for no limit
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048  # Chat query vectors kept in memory per model; 0 disables the cache
+    QUERY_EMBEDDING_CACHE_TTL: float = 3600.0
+    QUERY_EMBEDDING_COALESCE: bool = True  # Concurrent identical queries share one embedding call
     
     # Qdrant Configuration
     QDRANT_URL: str
     QDRANT_API_KEY: str
+    QDRANT_PREFER_GRPC: bool = False  # Talk to Qdrant over gRPC instead of REST
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: float = 30.0
+    QDRANT_MAX_CONNECTIONS: int = 16  # Pooled HTTP connections to Qdrant
+    QDRANT_UPSERT_BATCH_SIZE: int = 256  # Points per upsert request
+    QDRANT_UPSERT_CONCURRENCY: int = 4  # Upsert requests in flight across all pipelines
     
     # Application Configuration
     SECRET_KEY: str
@@ -38,6 +67,87 @@ class Settings(BaseSettings):
     MAX_PAGES_TO_SCRAPE: int = 50
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 50
+    NEAR_DUPLICATE_DETECTION: bool = True  # Drop near-duplicate pages and chunks before embedding
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 3  # Max differing SimHash bits (of 64) for a near-duplicate
+    BOILERPLATE_STRIPPING: bool = True  # Remove lines repeated across most of a site's pages
+    BOILERPLATE_MIN_PAGE_FRACTION: float = 0.5
+    BOILERPLATE_MIN_PAGES: int = 3
+    BOILERPLATE_SAMPLE_PAGES: int = 20  # Pages used to learn boilerplate before the pipeline streams
+    BOILERPLATE_SAMPLE_WAIT_SECONDS: float = 5.0  # Longest a sampled page is held back before chunking starts; 0 waits for the full sample
+
+    # Ingestion Pipeline Configuration (queue sizes bound memory, concurrency is per stage)
+    PIPELINE_PAGE_QUEUE_SIZE: int = 16
+    PIPELINE_CHUNK_QUEUE_SIZE: int = 256
+    PIPELINE_UPSERT_QUEUE_SIZE: int = 8
+    PIPELINE_EMBED_BATCH_SIZE: int = 32
+    PIPELINE_EMBED_CONCURRENCY: int = 2
+    PIPELINE_UPSERT_CONCURRENCY: int = 2
+    PIPELINE_CHECKPOINT_INTERVAL: float = 15.0  # Seconds between progress checkpoints of ingestion jobs
+
+    # Ingestion Job Queue Configuration
+    JOB_QUEUE_BACKEND: str = "sqlite"  # "sqlite" (workers on this host) or "supabase" (workers on any host, migration 006)
+    JOB_QUEUE_PATH: str = "ingestion_jobs.db"  # SQLite backend: shared by the API and every worker on this host
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_LEASE_SECONDS: float = 60.0  # Jobs whose worker stops heartbeating are reclaimed after this
+    JOB_RETRY_BASE_DELAY: float = 30.0
+    JOB_RETRY_MAX_DELAY: float = 600.0
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_CHECKPOINT_MAX_AGE: float = 86400.0  # Older checkpoints are ignored and the job starts over
+    JOB_RETENTION_SECONDS: float = 604800.0  # Completed and failed jobs are deleted after this; 0 keeps them
+    INGESTION_WORKER_CONCURRENCY: int = 2  # Jobs run at once per worker process
+    INGESTION_EMBEDDED_WORKER: bool = True  # Run a worker inside the API process; disable when using separate workers
+
+    # Crawl Archive Configuration (fetched pages kept on disk for re-indexing without refetching)
+    CRAWL_ARCHIVE_ENABLED: bool = True
+    CRAWL_ARCHIVE_PATH: str = "crawl_archive"
+    CRAWL_ARCHIVE_COMPRESSION: str = "auto"  # "zstd", "zlib", or "auto" (zstd when zstandard is installed)
+    CRAWL_ARCHIVE_SEGMENT_MB: int = 64
+
+    # Fair-share Scheduling Configuration (tenant = the user who owns the website)
+    JOB_MAX_RUNNING_PER_TENANT: int = 2  # Jobs one tenant may have running at once; 0 for no limit
+    JOB_MAX_RUNNING_GLOBAL: int = 0  # Jobs running across all workers; 0 for no limit
+    SCHEDULER_SMALL_SITE_PAGES: int = 20  # New sites and sites this small are queued in the priority lane
+    SCHEDULER_PRIORITY_LANE_PAGES: int = 50  # A crawl leaves the priority lane after this many pages
+    SCRAPER_TENANT_CONCURRENCY: int = 16  # Fetch slots one tenant may hold across all crawls; 0 for no limit
+    EMBEDDING_GLOBAL_CONCURRENCY: int = 4  # Embedding requests in flight across all pipelines
+
+    # Crawler HTTP Configuration
+    SCRAPER_CONCURRENCY: int = 8  # Concurrent fetches per crawl
+    SCRAPER_GLOBAL_CONCURRENCY: int = 64  # Concurrent fetches across all crawls
+    SCRAPER_REQUEST_TIMEOUT: float = 10.0
+    SCRAPER_MAX_CONNECTIONS: int = 100
+    SCRAPER_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SCRAPER_KEEPALIVE_EXPIRY: float = 30.0
+    SCRAPER_MAX_FRONTIER_SIZE: int = 10000
+    CRAWL_MEMORY_CAP_MB: int = 64  # Page text (UTF-8 bytes) a batch crawl keeps in memory before spilling to disk; 0 for no cap
+    CRAWL_SPILL_DIR: str = ""  # Directory for spilled page text (system temp directory when empty)
+    SCRAPER_MAX_DEPTH: int = 10
+    SCRAPER_RESPECT_ROBOTS: bool = True
+    SCRAPER_MAX_CRAWL_DELAY: float = 10.0  # Upper bound on a site's robots.txt Crawl-delay
+    SCRAPER_HOST_RATE: float = 20.0  # Requests per second per host when robots.txt sets no Crawl-delay; 0 for no limit
+    SCRAPER_HOST_BURST: int = 10
+    SCRAPER_HOST_MAX_CONCURRENCY: int = 16  # Ceiling for the adaptive per-host concurrency (starts at SCRAPER_CONCURRENCY)
+    SCRAPER_LATENCY_TOLERANCE: float = 3.0  # Back off a host whose latency exceeds this multiple of its best
+    SCRAPER_MAX_RETRIES: int = 2  # Retries of a page answered with 429/503
+    SCRAPER_RETRY_BASE_DELAY: float = 1.0  # Backoff after 429/503 when there is no Retry-After
+    SCRAPER_MAX_RETRY_AFTER: float = 60.0  # Longest pause honored for a host's Retry-After
+    SITEMAP_DISCOVERY_ENABLED: bool = True
+    SITEMAP_MAX_URLS: int = 10000
+    SITEMAP_MAX_FILES: int = 25  # Sitemap and sitemap index files read per crawl
+    HTML_EXTRACTION_BACKEND: str = "auto"  # "lxml", "bs4", or "auto" (lxml when installed)
+    EXTRACTION_WORKERS: int = 2  # Processes parsing HTML off the event loop; 0 parses in-process
+
+    # Browser Pool Configuration (dynamic scraping)
+    DYNAMIC_RENDERING_ENABLED: bool = True  # Render JS-shell pages detected during the crawl
+    BROWSER_POOL_SIZE: int = 4  # Browser contexts, i.e. concurrently rendered tabs
+    BROWSER_CONTEXT_MAX_PAGES: int = 50  # Recycle a context after this many pages
+    BROWSER_PAGE_TIMEOUT_MS: int = 15000
+    BROWSER_LEAN_MODE: bool = True  # Block non-essential resources and wait for DOM stability
+    BROWSER_RENDER_BUDGET_MS: int = 8000  # Total time allowed per page in lean mode
+    BROWSER_DOM_QUIET_MS: int = 500  # DOM is considered stable after this long without mutations
+    BROWSER_BLOCKED_RESOURCE_TYPES: List[str] = [
+        "image", "media", "font", "stylesheet", "texttrack", "manifest", "eventsource", "websocket", "other"
+    ]
     
     @validator('ALLOWED_ORIGINS', pre=True)
     def parse_allowed_origins(cls, v):
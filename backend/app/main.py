@@ -4,11 +4,16 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 
 from app.api import auth, websites, chat, embeddings
 from app.core.config import settings
+from app.services.scraper import scraper
+from app.services.browser_pool import browser_pool
+from app.services.embeddings import embedding_service
+from app.workers.ingestion import IngestionWorker
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +22,10 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Ingestion worker running inside the API process (see INGESTION_EMBEDDED_WORKER)
+ingestion_worker = None
+ingestion_worker_task = None
+
 app = FastAPI(
     title="AI Chatbot Builder API",
     description="A portfolio-ready AI chatbot builder that allows businesses to create custom chatbots for their websites",
@@ -55,6 +64,21 @@ async def startup_event():
     
     logger.info("Configuration validation completed")
 
+    global ingestion_worker, ingestion_worker_task
+    if settings.INGESTION_EMBEDDED_WORKER:
+        ingestion_worker = IngestionWorker()
+        ingestion_worker_task = asyncio.create_task(ingestion_worker.run())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the embedded ingestion worker and release pooled crawler connections, the shared browser and the embedding backend"""
+    if ingestion_worker is not None:
+        ingestion_worker.stop()
+        await asyncio.gather(ingestion_worker_task, return_exceptions=True)
+    await scraper.close()
+    await browser_pool.close()
+    await embedding_service.close()
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(websites.router, prefix="/api/websites", tags=["Websites"])
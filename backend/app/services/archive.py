@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from app.core.config import settings
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:  # pragma: no cover - zstandard is an optional speedup
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class CrawlArchive:
+    """Local, content-addressed store of fetched HTML and extracted text.
+
+    Blobs are compressed (zstd when installed, zlib otherwise) and appended to
+    segment files; an SQLite index maps each blob's SHA-256 to its segment and
+    offset, and each (website, URL) to the blobs of its latest fetch. Identical
+    documents are stored once, however often they are fetched.
+
+    Every writer appends to segment files of its own, so several worker
+    processes can share one archive directory. Calls block; run them in a
+    thread from async code.
+    """
+
+    def __init__(self, root: str, segment_bytes: int, compression: str = "auto"):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        if compression == "auto":
+            compression = "zstd" if ZSTD_AVAILABLE else "zlib"
+        if compression == "zstd" and not ZSTD_AVAILABLE:
+            raise ValueError("zstd compression requires the zstandard package")
+        self.codec = compression
+
+        self._segments_dir = os.path.join(root, "segments")
+        os.makedirs(self._segments_dir, exist_ok=True)
+        self._index_path = os.path.join(root, "index.db")
+        self._lock = threading.Lock()
+        self._segment_name: Optional[str] = None
+        self._segment_file: Optional[BinaryIO] = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    segment TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    raw_length INTEGER NOT NULL,
+                    codec TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    website_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    html_digest TEXT,
+                    text_digest TEXT NOT NULL,
+                    title TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (website_id, url)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self._index_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def put(self, website_id: str, url: str, text: str, title: str = "", html: Optional[bytes] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Archive the latest fetch of a page; `html` is None for pages known only as rendered text"""
+        text_bytes = text.encode('utf-8')
+        with self._lock, self._connect() as conn:
+            html_digest = self._put_blob(conn, html) if html is not None else None
+            text_digest = self._put_blob(conn, text_bytes)
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (website_id, url, html_digest, text_digest, title, etag, "
+                "last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (website_id, url, html_digest, text_digest, title, etag, last_modified, time.time())
+            )
+
+    def iter_pages(self, website_id: str, batch_size: int = 32) -> Iterator[List[Dict[str, Any]]]:
+        """Yield a website's archived pages in URL order, a batch at a time.
+
+        Each page has url, title, etag, last_modified, fetched_at, html (bytes
+        or None) and text. Only one batch is held in memory.
+        """
+        after = ""
+        while True:
+            batch = self.read_batch(website_id, after, batch_size)
+            if not batch:
+                return
+            yield batch
+            after = batch[-1]['url']
+
+    def read_batch(self, website_id: str, after: str, limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` archived pages with URLs sorting after `after`"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM pages WHERE website_id = ? AND url > ? ORDER BY url LIMIT ?",
+                (website_id, after, limit)
+            ).fetchall()
+            files: Dict[str, BinaryIO] = {}
+            try:
+                return [self._load_page(conn, row, files) for row in rows]
+            finally:
+                for handle in files.values():
+                    handle.close()
+
+    def count(self, website_id: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM pages WHERE website_id = ?", (website_id,)).fetchone()[0]
+
+    def delete_website(self, website_id: str):
+        """Forget a website's pages; their blobs stay in the segments until those are rewritten"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages WHERE website_id = ?", (website_id,))
+
+    def close(self):
+        with self._lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+
+    def _load_page(self, conn: sqlite3.Connection, row: sqlite3.Row, files: Dict[str, BinaryIO]) -> Dict[str, Any]:
+        html = self._read_blob(conn, row['html_digest'], files) if row['html_digest'] else None
+        return {
+            'url': row['url'],
+            'title': row['title'] or '',
+            'etag': row['etag'],
+            'last_modified': row['last_modified'],
+            'fetched_at': row['fetched_at'],
+            'html': html,
+            'text': self._read_blob(conn, row['text_digest'], files).decode('utf-8')
+        }
+
+    def _put_blob(self, conn: sqlite3.Connection, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        if conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone():
+            return digest
+
+        compressed = _compress(data, self.codec)
+        segment, offset = self._append(compressed)
+        # Another process may have stored the same blob meanwhile; either copy is valid
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (digest, segment, offset, length, raw_length, codec) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (digest, segment, offset, len(compressed), len(data), self.codec)
+        )
+        return digest
+
+    def _append(self, data: bytes) -> Tuple[str, int]:
+        if self._segment_file is None or self._segment_file.tell() >= self.segment_bytes:
+            if self._segment_file is not None:
+                self._segment_file.close()
+            self._segment_name = f"{int(time.time())}-{os.getpid()}-{uuid.uuid4().hex[:8]}.seg"
+            self._segment_file = open(os.path.join(self._segments_dir, self._segment_name), 'ab')
+
+        offset = self._segment_file.tell()
+        self._segment_file.write(data)
+        # The index row is only written once the bytes are in the segment
+        self._segment_file.flush()
+        return self._segment_name, offset
+
+    def _read_blob(self, conn: sqlite3.Connection, digest: str, files: Dict[str, BinaryIO]) -> bytes:
+        blob = conn.execute("SELECT * FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if blob is None:
+            raise KeyError(f"Archive blob {digest} is missing")
+        handle = files.get(blob['segment'])
+        if handle is None:
+            handle = files[blob['segment']] = open(os.path.join(self._segments_dir, blob['segment']), 'rb')
+        handle.seek(blob['offset'])
+        return _decompress(handle.read(blob['length']), blob['codec'])
+
+
+_archive: Optional[CrawlArchive] = None
+
+
+def get_crawl_archive() -> Optional[CrawlArchive]:
+    """The process-wide crawl archive, or None when archiving is disabled"""
+    global _archive
+    if not settings.CRAWL_ARCHIVE_ENABLED:
+        return None
+    if _archive is None:
+        _archive = CrawlArchive(settings.CRAWL_ARCHIVE_PATH, settings.CRAWL_ARCHIVE_SEGMENT_MB * 1024 * 1024,
+                                settings.CRAWL_ARCHIVE_COMPRESSION)
+    return _archive
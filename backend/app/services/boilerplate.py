@@ -0,0 +1,166 @@
+import math
+import time
+from collections import Counter
+from typing import Collection, Dict, List, Optional, Set
+
+
+class BoilerplateDetector:
+    """Find text lines repeated across a large share of a site's pages.
+
+    Cookie banners, sidebars, "related posts" and contact blocks appear as
+    identical lines on most pages. A line is boilerplate when it occurs on at
+    least `min_page_fraction` of the observed pages (and on at least
+    `min_pages` pages, so small sites are left alone).
+    """
+
+    def __init__(self, min_page_fraction: float = 0.5, min_pages: int = 3):
+        self.min_page_fraction = min_page_fraction
+        self.min_pages = min_pages
+        self.page_count = 0
+        self._line_pages: Counter = Counter()
+
+    def observe(self, text: str):
+        """Count the distinct lines of one page"""
+        self.page_count += 1
+        self._line_pages.update(set(text.split('\n')))
+
+    def boilerplate_lines(self) -> Set[str]:
+        threshold = max(self.min_pages, math.ceil(self.page_count * self.min_page_fraction))
+        return {line for line, pages in self._line_pages.items() if pages >= threshold}
+
+
+class BoilerplateStripper:
+    """Remove boilerplate lines from pages, keeping one canonical copy.
+
+    The first page that contains a boilerplate line keeps it, so the text is
+    still embedded (and searchable) once instead of on every page.
+    """
+
+    def __init__(self, boilerplate: Set[str]):
+        self.boilerplate = boilerplate
+        self._kept: Set[str] = set()
+        self.lines_removed = 0
+        self.chars_removed = 0
+
+    def strip(self, text: str) -> str:
+        if not self.boilerplate:
+            return text
+
+        kept_lines = []
+        for line in text.split('\n'):
+            if line in self.boilerplate:
+                if line in self._kept:
+                    self.lines_removed += 1
+                    self.chars_removed += len(line) + 1
+                    continue
+                self._kept.add(line)
+            kept_lines.append(line)
+        return '\n'.join(kept_lines)
+
+    def refine(self, boilerplate: Set[str], emitted: Set[str]):
+        """Switch to a refined profile; its lines already in `emitted` text count as kept"""
+        self.boilerplate = boilerplate
+        self._kept |= boilerplate & emitted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'boilerplate_lines': len(self.boilerplate),
+            'lines_removed': self.lines_removed,
+            'chars_removed': self.chars_removed
+        }
+
+
+def strip_boilerplate(pages: Collection[Dict[str, str]], min_page_fraction: float,
+                      min_pages: int) -> BoilerplateStripper:
+    """Detect boilerplate across pages and strip it from their content in place.
+
+    `pages` is iterated twice, one page at a time, so it can be a PageStore
+    whose content lives on disk. Pages without content (unchanged pages from
+    an incremental recrawl) are ignored. Returns the stripper so callers can
+    report what was removed.
+    """
+    detector = BoilerplateDetector(min_page_fraction, min_pages)
+    for page in pages:
+        if page.get('content'):
+            detector.observe(page['content'])
+
+    stripper = BoilerplateStripper(detector.boilerplate_lines())
+    for page in pages:
+        if page.get('content'):
+            page['content'] = stripper.strip(page['content'])
+    return stripper
+
+
+class StreamingBoilerplateFilter:
+    """Boilerplate stripping for pages that arrive one at a time.
+
+    The first `sample_pages` pages with content are held back and used to
+    learn the site's boilerplate; after that every page is stripped as soon as
+    it arrives. Pages without content pass straight through.
+
+    With `max_wait`, the sample is released once its first page has waited
+    that many seconds, stripped with the profile learned so far, so a slow
+    site does not hold back chunking. The profile keeps learning from the
+    following pages until `sample_pages` pages have been seen. Boilerplate it
+    learns late was already let through on the early pages; those copies
+    count as the canonical one, so later pages do not keep another.
+    """
+
+    def __init__(self, sample_pages: int, min_page_fraction: float, min_pages: int, max_wait: float = 0.0):
+        self.sample_pages = max(1, sample_pages)
+        self.max_wait = max_wait
+        self.detector = BoilerplateDetector(min_page_fraction, min_pages)
+        self.stripper: Optional[BoilerplateStripper] = None
+        self._sample: List[Dict[str, str]] = []
+        self._sample_started = 0.0
+        # Lines of the pages released while the profile is still learning
+        self._released_lines: Set[str] = set()
+
+    def push(self, page: Dict[str, str]) -> List[Dict[str, str]]:
+        """Add a page, returning the pages that are ready to be processed"""
+        if not page.get('content'):
+            return [page]
+        if self.stripper is not None:
+            if self.detector.page_count < self.sample_pages:
+                # The sample was released early; refine the profile with this page
+                self.detector.observe(page['content'])
+                self.stripper.refine(self.detector.boilerplate_lines(), self._released_lines)
+            page['content'] = self.stripper.strip(page['content'])
+            self._record_released([page])
+            return [page]
+
+        if not self._sample:
+            self._sample_started = time.monotonic()
+        self._sample.append(page)
+        self.detector.observe(page['content'])
+        if len(self._sample) < self.sample_pages and self.wait_remaining() != 0:
+            return []
+        return self.flush()
+
+    def wait_remaining(self) -> Optional[float]:
+        """Seconds until the held-back sample is due for release, or None if it can wait indefinitely"""
+        if not self._sample or self.max_wait <= 0:
+            return None
+        return max(0.0, self._sample_started + self.max_wait - time.monotonic())
+
+    def flush(self) -> List[Dict[str, str]]:
+        """Strip and release the held-back sample (at the end of a small crawl, or when it waited too long)"""
+        if self.stripper is None:
+            self.stripper = BoilerplateStripper(self.detector.boilerplate_lines())
+        ready, self._sample = self._sample, []
+        for page in ready:
+            page['content'] = self.stripper.strip(page['content'])
+        self._record_released(ready)
+        return ready
+
+    def _record_released(self, pages: List[Dict[str, str]]):
+        if self.detector.page_count >= self.sample_pages:
+            # The profile is final
+            self._released_lines = set()
+            return
+        for page in pages:
+            self._released_lines.update(page['content'].split('\n'))
+
+    @property
+    def chars_removed(self) -> int:
+        return self.stripper.chars_removed if self.stripper is not None else 0
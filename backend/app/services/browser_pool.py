@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+from typing import Dict, List, Optional, Any
+from playwright.async_api import async_playwright
+from app.core.config import settings
+from app.services.extraction import clean_text
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+REMOVE_BOILERPLATE_JS = """
+    () => {
+        const elements = document.querySelectorAll('script, style, nav, footer, header, .nav, .footer, .header');
+        elements.forEach(el => el.remove());
+    }
+"""
+
+BODY_TEXT_JS = """
+    () => {
+        return document.body ? document.body.innerText : '';
+    }
+"""
+
+LINKS_JS = """
+    () => Array.from(document.querySelectorAll('a[href]'), a => a.href)
+"""
+
+# Resolves once the DOM has gone `quietMs` without mutations, or after `timeoutMs`
+DOM_STABLE_JS = """
+    ([quietMs, timeoutMs]) => new Promise(resolve => {
+        let quietTimer = null;
+        let capTimer = null;
+        const observer = new MutationObserver(() => {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(done, quietMs);
+        });
+        function done() {
+            observer.disconnect();
+            clearTimeout(quietTimer);
+            clearTimeout(capTimer);
+            resolve();
+        }
+        observer.observe(document.documentElement || document, {
+            childList: true, subtree: true, characterData: true
+        });
+        quietTimer = setTimeout(done, quietMs);
+        capTimer = setTimeout(done, timeoutMs);
+    })
+"""
+
+# Analytics, ads and session-recording hosts that never contribute page text
+TRACKER_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com',
+    'doubleclick.net', 'googlesyndication.com', 'facebook.net', 'connect.facebook.net',
+    'hotjar.com', 'segment.io', 'segment.com', 'mixpanel.com', 'clarity.ms',
+    'fullstory.com', 'optimizely.com', 'nr-data.net', 'hs-analytics.net',
+    'hs-scripts.com', 'bat.bing.com', 'snap.licdn.com', 'analytics.tiktok.com',
+    'static.ads-twitter.com', 'quantserve.com', 'scorecardresearch.com'
+)
+
+
+class _ContextSlot:
+    """One browser context in the pool and the number of pages it has rendered"""
+
+    def __init__(self):
+        self.context = None
+        self.pages_served = 0
+
+
+class BrowserPool:
+    """Long-lived Chromium instance with a fixed number of reusable browser contexts.
+
+    Every crawl job renders through the same pool, so the browser is launched
+    once per process instead of once per scrape. Each context renders one tab
+    at a time; with `size` contexts up to `size` pages render concurrently.
+    Contexts are recycled after `max_pages_per_context` pages to bound memory.
+    """
+
+    def __init__(self, size: int = None, max_pages_per_context: int = None):
+        self.size = max(1, size or settings.BROWSER_POOL_SIZE)
+        self.max_pages_per_context = max(1, max_pages_per_context or settings.BROWSER_CONTEXT_MAX_PAGES)
+        self._playwright = None
+        self._browser = None
+        self._slots: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self):
+        """Launch the shared browser if it is not already running"""
+        async with self._start_lock:
+            if self.started:
+                return
+
+            await self._shutdown_browser()
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._slots = asyncio.Queue()
+            for _ in range(self.size):
+                self._slots.put_nowait(_ContextSlot())
+            logger.info(f"Browser pool started with {self.size} contexts")
+
+    async def close(self):
+        """Close every context and stop the browser"""
+        async with self._start_lock:
+            await self._shutdown_browser()
+
+    async def _shutdown_browser(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"Error stopping Playwright: {e}")
+        self._browser = None
+        self._playwright = None
+        self._slots = None
+
+    async def _new_context(self):
+        context = await self._browser.new_context(
+            viewport={"width": 1280, "height": 720},
+            user_agent=USER_AGENT
+        )
+        if settings.BROWSER_LEAN_MODE:
+            await context.route("**/*", self._route_request)
+        return context
+
+    async def _route_request(self, route):
+        """Abort requests that cannot change the page's text content"""
+        request = route.request
+        try:
+            if self._should_block(request.resource_type, request.url):
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            # The page may already be closed when a late request is routed
+            pass
+
+    def _should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in settings.BROWSER_BLOCKED_RESOURCE_TYPES:
+            return True
+        host = urlparse(url).hostname or ''
+        return any(host == tracker or host.endswith('.' + tracker) for tracker in TRACKER_HOSTS)
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a fresh tab from one of the pooled browser contexts"""
+        if not self.started:
+            await self.start()
+
+        slots = self._slots
+        slot = await slots.get()
+        page = None
+        try:
+            if slot.context is None:
+                slot.context = await self._new_context()
+                slot.pages_served = 0
+            page = await slot.context.new_page()
+            yield page
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            slot.pages_served += 1
+            if slot.context is not None and (slot.pages_served >= self.max_pages_per_context or not self.started):
+                try:
+                    await slot.context.close()
+                except Exception:
+                    pass
+                slot.context = None
+            slots.put_nowait(slot)
+
+    async def render(self, url: str, timeout_ms: int = None) -> Optional[Dict[str, Any]]:
+        """Render a page and return its title, visible text and links"""
+        try:
+            async with self.page() as page:
+                if settings.BROWSER_LEAN_MODE:
+                    budget_ms = timeout_ms or settings.BROWSER_RENDER_BUDGET_MS
+                    # Hard cap in case the page ignores Playwright's own timeouts
+                    await asyncio.wait_for(self._load_lean(page, url, budget_ms), timeout=budget_ms / 1000 + 1)
+                else:
+                    await page.goto(url, wait_until='networkidle', timeout=timeout_ms or settings.BROWSER_PAGE_TIMEOUT_MS)
+
+                    # Wait for content to load
+                    await page.wait_for_timeout(1000)
+
+                title = await page.title()
+                content = await self._extract_content(page)
+                links: List[str] = await page.evaluate(LINKS_JS)
+
+                return {
+                    # Where the page ended up after redirects; its relative links resolve against this
+                    'url': page.url,
+                    'title': title,
+                    'content': content,
+                    'links': links
+                }
+        except Exception as e:
+            logger.warning(f"Failed to render {url}: {e}")
+            return None
+
+    async def _load_lean(self, page, url: str, budget_ms: int):
+        """Load a page within a render budget, waiting for the DOM to settle instead of sleeping"""
+        deadline = time.monotonic() + budget_ms / 1000
+        await page.goto(url, wait_until='domcontentloaded', timeout=budget_ms)
+
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms > 0:
+            await page.evaluate(DOM_STABLE_JS, [settings.BROWSER_DOM_QUIET_MS, remaining_ms])
+
+    async def _extract_content(self, page) -> str:
+        """Extract text content from Playwright page"""
+        try:
+            # Remove unwanted elements
+            await page.evaluate(REMOVE_BOILERPLATE_JS)
+
+            # Get text content
+            text = await page.evaluate(BODY_TEXT_JS)
+
+            # Clean up text, keeping one line per block like the static extractors
+            return clean_text(text)
+
+        except Exception as e:
+            logger.warning(f"Failed to extract dynamic content: {e}")
+            return ""
+
+
+# Global browser pool shared by all crawl jobs
+browser_pool = BrowserPool()
@@ -0,0 +1,212 @@
+import asyncio
+import time
+from typing import List, Dict, Set, Any, Optional, Tuple
+from urllib.parse import urlparse
+from app.core.config import settings
+from app.services.frontier import URLFrontier, normalize_url
+from app.services.page_store import PageStore
+from app.services.scheduler import LANE_NORMAL
+
+
+class CrawlStats:
+    """Counters collected while crawling a single website"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.pages_fetched = 0
+        self.pages_failed = 0
+        self.pages_rendered = 0
+        self.pages_not_modified = 0
+        self.pages_unchanged = 0
+        self.pages_skipped_lastmod = 0
+        self.sitemap_urls = 0
+        self.pages_near_duplicate = 0
+        self.boilerplate_chars_removed = 0
+        self.pages_kept = 0
+        self.pages_throttled = 0
+        self.pages_spilled = 0
+        self.pages_gone = 0
+        self.bytes_downloaded = 0
+
+    @property
+    def duration(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'pages_fetched': self.pages_fetched,
+            'pages_failed': self.pages_failed,
+            'pages_rendered': self.pages_rendered,
+            'pages_not_modified': self.pages_not_modified,
+            'pages_unchanged': self.pages_unchanged,
+            'pages_skipped_lastmod': self.pages_skipped_lastmod,
+            'sitemap_urls': self.sitemap_urls,
+            'pages_near_duplicate': self.pages_near_duplicate,
+            'boilerplate_chars_removed': self.boilerplate_chars_removed,
+            'pages_kept': self.pages_kept,
+            'pages_throttled': self.pages_throttled,
+            'pages_spilled': self.pages_spilled,
+            'pages_gone': self.pages_gone,
+            'bytes_downloaded': self.bytes_downloaded,
+            'duration_seconds': round(self.duration, 3)
+        }
+
+
+class CrawlContext:
+    """State owned by one crawl job: frontier, visited set, page budget and stats.
+
+    A new context is created for every scrape so concurrent crawls of different
+    websites never share (or clear) each other's state.
+    """
+
+    def __init__(self, base_url: str, max_pages: int, max_frontier_size: Optional[int] = None,
+                 max_depth: Optional[int] = None, manifest: Optional[Dict[str, Dict[str, Any]]] = None,
+                 website_id: Optional[str] = None, memory_cap: int = 0, spill_dir: Optional[str] = None):
+        self.base_url = base_url
+        # Set for crawls of a stored website; fetched documents are then archived under it
+        self.website_id = website_id
+        # Host as normalize_url spells it (lowercase, no default port), which is how links are compared
+        self.base_domain = urlparse(normalize_url(base_url)).netloc
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.manifest = manifest or {}
+        self.robots = None
+        self.crawl_delay = 0.0
+        self.sitemap_lastmod: Dict[str, Optional[str]] = {}
+        self.frontier = URLFrontier(max_size=max_frontier_size)
+        self.visited_urls: Set[str] = set()
+        # URLs that answered 404 or 410
+        self.gone_urls: Set[str] = set()
+        # Kept pages of a batch crawl; content beyond `memory_cap` bytes is spilled to disk
+        self.pages = PageStore(memory_cap, spill_dir)
+        self.page_count = 0
+        # When set, kept pages are handed to this queue instead of collected in `pages`
+        self.page_sink: Optional[asyncio.Queue] = None
+        self.stats = CrawlStats()
+        # Who the crawl's fetches are accounted to by the shared fetch scheduler
+        self.tenant = self.base_domain
+        self.base_lane = LANE_NORMAL
+        # URLs handed out by next_url whose work is not finished yet: still being
+        # fetched, or (in streaming mode) their page is still being indexed.
+        # Keyed by canonical URL, holding the (url, depth) pair to fetch again
+        self.open_urls: Dict[str, Tuple[str, int]] = {}
+        self._in_flight = 0
+        self._frontier_changed = asyncio.Condition()
+
+    @property
+    def budget_remaining(self) -> int:
+        return max(0, self.max_pages - self.page_count)
+
+    @property
+    def budget_exhausted(self) -> bool:
+        return self.page_count >= self.max_pages
+
+    @property
+    def lane(self) -> int:
+        """Scheduling lane for this crawl's next request.
+
+        A crawl queued in the priority lane only keeps it for its first pages,
+        so a large site that was misjudged as small cannot hold the lane.
+        """
+        if self.page_count < settings.SCHEDULER_PRIORITY_LANE_PAGES:
+            return self.base_lane
+        return LANE_NORMAL
+
+    async def next_url(self) -> Optional[Tuple[str, int]]:
+        """Wait for the next URL to fetch.
+
+        Returns None once the budget is spent, or when the frontier is empty
+        and no other worker is still fetching a page that could add links.
+        """
+        async with self._frontier_changed:
+            while True:
+                if self.budget_exhausted:
+                    return None
+                item = self.frontier.pop()
+                if item is not None:
+                    self._in_flight += 1
+                    self.open_urls[normalize_url(item[0])] = item
+                    return item
+                if self._in_flight == 0:
+                    return None
+                await self._frontier_changed.wait()
+
+    async def url_done(self, url: str, depth: int, new_urls: List[str], release: bool = True):
+        """Finish a URL handed out by next_url, queueing the links it produced.
+
+        With `release` False the URL stays open until release() is called,
+        so a checkpoint taken in between still treats it as unfinished.
+        """
+        async with self._frontier_changed:
+            if not self.budget_exhausted and (self.max_depth is None or depth < self.max_depth):
+                for new_url in new_urls:
+                    self.frontier.add(new_url, depth + 1)
+            self._in_flight -= 1
+            if release:
+                self.open_urls.pop(normalize_url(url), None)
+            self._frontier_changed.notify_all()
+
+    def release(self, url: str):
+        """Mark an open URL as fully processed"""
+        self.open_urls.pop(normalize_url(url), None)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Crawl progress that survives a restart: URLs still to do and URLs finished"""
+        return {
+            'frontier': list(self.open_urls.values()) + self.frontier.snapshot(),
+            'visited': [url for url in self.visited_urls if url not in self.open_urls]
+        }
+
+    def restore(self, checkpoint: Dict[str, Any], completed_pages: int = 0):
+        """Continue a crawl from checkpoint(); finished URLs are never fetched again"""
+        for url in checkpoint.get('visited', []):
+            self.mark_visited(url)
+            self.frontier.mark_seen(url)
+        for url, depth in checkpoint.get('frontier', []):
+            self.frontier.add(url, depth)
+        self.page_count = completed_pages
+
+    @property
+    def complete(self) -> bool:
+        """Whether every reachable URL was visited (no page budget or frontier limit cut the crawl short)"""
+        return not self.budget_exhausted and self.frontier.dropped == 0
+
+    def removed_manifest_urls(self) -> Set[str]:
+        """Pages of the previous crawl that are gone from the site.
+
+        Those that answered 404/410, plus, after a complete crawl, those that
+        were not reached again. Pages that failed for other reasons are kept.
+        """
+        removed = self.gone_urls & set(self.manifest)
+        if self.complete:
+            removed |= set(self.manifest) - self.visited_urls
+        return removed
+
+    def mark_visited(self, url: str) -> bool:
+        """Record a URL (by its canonical form) as visited, returning False if it was already seen"""
+        url = normalize_url(url)
+        if url in self.visited_urls:
+            return False
+        self.visited_urls.add(url)
+        return True
+
+    async def add_page(self, page: Dict[str, str]) -> bool:
+        """Add a scraped page if the budget allows it.
+
+        In streaming mode the page goes to `page_sink`; a full sink blocks the
+        calling fetch worker, which is how downstream stages slow the crawl.
+        """
+        if self.budget_exhausted:
+            return False
+        self.page_count += 1
+        self.stats.pages_kept += 1
+        if self.page_sink is not None:
+            await self.page_sink.put(page)
+        else:
+            self.pages.append(page)
+        return True
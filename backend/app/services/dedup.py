@@ -0,0 +1,83 @@
+import hashlib
+import re
+from typing import Dict, List, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r'\w+')
+
+FINGERPRINT_BITS = 64
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash of a text over word shingles.
+
+    Texts that share most of their shingles get fingerprints that differ in
+    only a few bits, so near-duplicates can be found by Hamming distance.
+    """
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) > shingle_size:
+        shingles = {' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    else:
+        shingles = {' '.join(tokens)}
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+         for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+    # One row of 64 bits per shingle; each bit votes +1 / -1
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+
+    fingerprint = 0
+    for bit in np.flatnonzero(votes > 0):
+        fingerprint |= 1 << int(bit)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """LSH index over SimHash fingerprints.
+
+    Fingerprints are split into `max_distance + 1` bands. Two fingerprints
+    within `max_distance` bits of each other must agree exactly on at least
+    one band, so only fingerprints sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        edges = [round(i * FINGERPRINT_BITS / band_count) for i in range(band_count + 1)]
+        self._bands: List[Tuple[int, int]] = [
+            (start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])
+        ]
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self.checked = 0
+        self.pruned = 0
+
+    def _band_keys(self, fingerprint: int):
+        return [(fingerprint >> shift) & mask for shift, mask in self._bands]
+
+    def is_duplicate(self, text: str) -> bool:
+        """Return True if `text` is a near-duplicate of an earlier text, otherwise index it"""
+        self.checked += 1
+        fingerprint = simhash(text)
+        keys = self._band_keys(fingerprint)
+
+        for bucket, key in zip(self._buckets, keys):
+            for candidate in bucket.get(key, ()):
+                if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    self.pruned += 1
+                    return True
+
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(fingerprint)
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return {'checked': self.checked, 'pruned': self.pruned}
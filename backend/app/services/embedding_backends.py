@@ -0,0 +1,302 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Type
+import httpx
+import numpy as np
+from app.core.config import settings
+from app.services.rate_control import (
+    OVERLOAD_STATUSES, AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitOpenError, jittered_backoff,
+    parse_retry_after
+)
+
+logger = logging.getLogger(__name__)
+
+# sentence-transformers pulls in torch; only check that it is there until a model is needed
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+
+class EmbeddingBackendError(Exception):
+    """Texts could not be embedded (after retries, or because the backend's circuit is open)"""
+
+
+class EmbeddingBackend:
+    """Interface for embedding backends.
+
+    embed() returns one vector of `dimension` floats per input text, in
+    order. Every backend must produce vectors from the same model so that
+    collections stay searchable when the backend is switched.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name: str, dimension: int):
+        self.model_name = model_name
+        self.dimension = dimension
+
+    async def embed(self, texts: List[str]) -> List[np.ndarray]:
+        raise NotImplementedError
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single search query; backends may serve these ahead of ingestion batches"""
+        return (await self.embed([text]))[0]
+
+    async def close(self):
+        pass
+
+
+class HuggingFaceAPIBackend(EmbeddingBackend):
+    """Embeds through a remote HuggingFace feature-extraction endpoint.
+
+    Texts go out in batches of `batch_size` as list-valued `inputs` over one
+    pooled HTTP client. The number of batches in flight adapts to the
+    endpoint (AIMD on latency and 429/503). Failed batches are retried with
+    jittered backoff, honoring Retry-After, and a circuit breaker stops
+    calling an endpoint that keeps failing. A batch that cannot be embedded
+    raises EmbeddingBackendError.
+    """
+
+    name = "huggingface_api"
+
+    def __init__(self, model_name: str, dimension: int, api_url: str, api_key: Optional[str] = None,
+                 batch_size: int = 32, concurrency: int = 4, max_concurrency: int = 16,
+                 max_retries: int = 4, timeout: float = 30.0):
+        super().__init__(model_name, dimension)
+        self.url = f"{api_url.rstrip('/')}/{model_name}"
+        self.api_key = api_key
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = AdaptiveConcurrencyLimiter(concurrency, maximum=max_concurrency)
+        self.breaker = CircuitBreaker("Embedding API", settings.EMBEDDING_CIRCUIT_FAILURES,
+                                      settings.EMBEDDING_CIRCUIT_RESET_SECONDS)
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'failed_batches': 0}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.limiter.maximum,
+                                    max_keepalive_connections=self.limiter.maximum)
+            )
+        return self._client
+
+    async def embed(self, texts: List[str]) -> List[np.ndarray]:
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        pending = []
+        for index, text in enumerate(texts):
+            clean_text = text.strip()
+            if clean_text:
+                pending.append((index, clean_text))
+            else:
+                # Empty texts get a zero vector without a request
+                vectors[index] = np.zeros(self.dimension, dtype=np.float32)
+
+        batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+        tasks = [asyncio.create_task(self._embed_batch([text for _, text in batch])) for batch in batches]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        for batch, batch_vectors in zip(batches, results):
+            for (index, _), vector in zip(batch, batch_vectors):
+                vectors[index] = vector
+        return vectors
+
+    async def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        attempt = 0
+        while True:
+            try:
+                self.breaker.check()
+            except CircuitOpenError as e:
+                self.stats['failed_batches'] += 1
+                raise EmbeddingBackendError(str(e)) from e
+
+            await self.limiter.acquire()
+            started = time.monotonic()
+            response, error = None, None
+            try:
+                self.stats['requests'] += 1
+                response = await self._get_client().post(
+                    self.url, json={"inputs": texts, "options": {"wait_for_model": True}}
+                )
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                await self.limiter.release()
+            latency = time.monotonic() - started
+
+            if response is not None and response.status_code == 200:
+                try:
+                    vectors = self._parse(response.json(), len(texts))
+                except ValueError as e:
+                    self.breaker.record_failure()
+                    self.stats['failed_batches'] += 1
+                    raise EmbeddingBackendError(f"Unexpected embedding API response: {e}") from e
+                self.limiter.on_success(latency)
+                self.breaker.record_success()
+                return vectors
+
+            retry_after = None
+            if response is None:
+                # Timeouts and connection failures
+                self.limiter.on_overload()
+                self.breaker.record_failure()
+                reason = f"{type(error).__name__}: {error}"
+            elif response.status_code in OVERLOAD_STATUSES:
+                # Throttling is the endpoint asking us to slow down, not a failure
+                self.limiter.on_overload()
+                self.breaker.record_success()
+                self.stats['throttled'] += 1
+                retry_after = parse_retry_after(response.headers.get('retry-after'))
+                reason = f"HTTP {response.status_code}"
+            elif response.status_code >= 500:
+                self.breaker.record_failure()
+                reason = f"HTTP {response.status_code}"
+            else:
+                self.breaker.record_success()
+                self.stats['failed_batches'] += 1
+                raise EmbeddingBackendError(f"Embedding API rejected the request: HTTP {response.status_code} "
+                                            f"{response.text[:200]}")
+
+            attempt += 1
+            if attempt > self.max_retries:
+                self.stats['failed_batches'] += 1
+                raise EmbeddingBackendError(f"Embedding API failed after {attempt} attempts ({reason})")
+
+            delay = jittered_backoff(attempt, settings.EMBEDDING_REMOTE_RETRY_BASE_DELAY,
+                                     settings.EMBEDDING_REMOTE_RETRY_MAX_DELAY)
+            if retry_after is not None:
+                delay = min(max(delay, retry_after), settings.EMBEDDING_REMOTE_RETRY_MAX_DELAY)
+            self.stats['retries'] += 1
+            logger.info(f"Embedding batch of {len(texts)} failed ({reason}); retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def _parse(self, data, count: int) -> List[np.ndarray]:
+        if isinstance(data, dict):
+            raise ValueError(data.get('error') or 'expected a list of embeddings')
+        if not isinstance(data, list) or len(data) != count:
+            raise ValueError(f"expected {count} embeddings")
+
+        vectors = []
+        for item in data:
+            vector = np.asarray(item, dtype=np.float32)
+            if vector.ndim == 2:
+                # Token embeddings from a model without a pooling layer: mean-pool them
+                vector = vector.mean(axis=0)
+            if vector.shape != (self.dimension,):
+                raise ValueError(f"expected {self.dimension}-dimensional vectors, got shape {vector.shape}")
+            vectors.append(vector)
+        return vectors
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+class LocalSentenceTransformerBackend(EmbeddingBackend):
+    """Runs the model in-process with sentence-transformers.
+
+    The model is loaded once, on first use, and ingestion batches are
+    encoded on a single dedicated thread: torch already spreads one batch
+    over `threads` cores, so concurrent batches would only compete for them.
+    Search queries get a thread of their own, so a chat message never waits
+    behind the ingestion batches already queued.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name: str, dimension: int, batch_size: int = 64, threads: int = 0,
+                 device: str = "cpu"):
+        super().__init__(model_name, dimension)
+        self.batch_size = max(1, batch_size)
+        self.threads = threads
+        self.device = device
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-query")
+
+    async def embed(self, texts: List[str]) -> List[np.ndarray]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts)
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(self._query_executor, self._encode, [text]))[0]
+
+    def _encode(self, texts: List[str]) -> List[np.ndarray]:
+        model = self._load()
+        vectors = model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False)
+        return list(vectors)
+
+    def _load(self):
+        with self._load_lock:
+            if self._model is None:
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                if self.threads > 0:
+                    torch.set_num_threads(self.threads)
+                model = SentenceTransformer(self.model_name, device=self.device)
+                dimension = model.get_sentence_embedding_dimension()
+                if dimension != self.dimension:
+                    raise ValueError(f"Embedding model {self.model_name} produces {dimension}-dimensional vectors, "
+                                     f"but EMBEDDING_DIMENSION is {self.dimension}")
+                logger.info(f"Loaded local embedding model {self.model_name} on {self.device}")
+                self._model = model
+            return self._model
+
+    async def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._query_executor.shutdown(wait=False, cancel_futures=True)
+
+
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    HuggingFaceAPIBackend.name: HuggingFaceAPIBackend,
+    LocalSentenceTransformerBackend.name: LocalSentenceTransformerBackend,
+}
+
+
+def get_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """Create an embedding backend by name.
+
+    The remote API backend is the default; the local backend runs torch
+    inside this process and must be chosen explicitly ("local", or "auto"
+    to use it whenever sentence-transformers is installed).
+    """
+    name = (name or settings.EMBEDDING_BACKEND).lower()
+    if name == "auto":
+        name = LocalSentenceTransformerBackend.name if SENTENCE_TRANSFORMERS_AVAILABLE else HuggingFaceAPIBackend.name
+
+    if name == LocalSentenceTransformerBackend.name and not SENTENCE_TRANSFORMERS_AVAILABLE:
+        logger.warning("sentence-transformers is not installed, falling back to the HuggingFace API backend")
+        name = HuggingFaceAPIBackend.name
+
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name}")
+
+    if name == LocalSentenceTransformerBackend.name:
+        return LocalSentenceTransformerBackend(settings.HUGGINGFACE_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION,
+                                               batch_size=settings.EMBEDDING_BATCH_SIZE,
+                                               threads=settings.EMBEDDING_THREADS,
+                                               device=settings.EMBEDDING_DEVICE)
+    return HuggingFaceAPIBackend(settings.HUGGINGFACE_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION,
+                                 settings.HUGGINGFACE_API_URL, settings.HUGGINGFACE_API_KEY,
+                                 batch_size=settings.EMBEDDING_REMOTE_BATCH_SIZE,
+                                 concurrency=settings.EMBEDDING_REMOTE_CONCURRENCY,
+                                 max_concurrency=settings.EMBEDDING_REMOTE_MAX_CONCURRENCY,
+                                 max_retries=settings.EMBEDDING_REMOTE_MAX_RETRIES,
+                                 timeout=settings.EMBEDDING_REMOTE_TIMEOUT)
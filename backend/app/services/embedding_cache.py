@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of parameters in one statement
+_QUERY_CHUNK = 500
+# Eviction frees space down to this share of the cap, so it does not run on every insert
+_EVICT_TO = 0.9
+
+
+def normalize_text(text: str) -> str:
+    """The form of a text that is hashed: NFC, whitespace collapsed and trimmed"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def cache_key(model_name: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode('utf-8')).digest()
+
+
+class EmbeddingCache:
+    """Persistent, content-addressed cache of embedding vectors.
+
+    Entries are keyed by SHA-256 of the model name and the normalized text,
+    so the same chunk is embedded once whichever website or page it appears
+    on. Vectors are stored as float16 in an SQLite database. When the stored
+    vectors exceed `max_bytes`, the least recently used entries are evicted.
+
+    Several worker processes can share one database file. Calls block; run
+    them in a thread from async code.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            # Tracked in-process and recounted before evicting, since other processes write too
+            self._bytes = self._stored_bytes(conn)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached float32 vectors for `texts`, in order, with None for misses"""
+        keys = [cache_key(model_name, text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock, self._connect() as conn:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _QUERY_CHUNK):
+                chunk = unique_keys[start:start + _QUERY_CHUNK]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype='<f2').astype(np.float32)
+            if found:
+                now = time.time()
+                conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                 [(now, key) for key in found])
+
+            vectors = [found.get(key) for key in keys]
+            hits = sum(vector is not None for vector in vectors)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model_name: str, texts: Sequence[str], vectors: Sequence[np.ndarray]):
+        """Store the vectors of `texts`, evicting old entries if the cache grows past its cap"""
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            rows[cache_key(model_name, text)] = np.asarray(vector, dtype='<f2').tobytes()
+        if not rows:
+            return
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = set()
+                keys = list(rows)
+                for start in range(0, len(keys), _QUERY_CHUNK):
+                    chunk = keys[start:start + _QUERY_CHUNK]
+                    existing.update(key for key, in conn.execute(
+                        f"SELECT key FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ))
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                                 [(key, vector, now) for key, vector in rows.items()])
+                self._bytes += sum(len(vector) for key, vector in rows.items() if key not in existing)
+                if self.max_bytes > 0 and self._bytes > self.max_bytes:
+                    self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._bytes = self._stored_bytes(conn)
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes
+        }
+
+    def _evict(self, conn: sqlite3.Connection):
+        self._bytes = self._stored_bytes(conn)
+        target = int(self.max_bytes * _EVICT_TO)
+        while self._bytes > target:
+            rows = conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT ?", (_QUERY_CHUNK,)
+            ).fetchall()
+            if not rows:
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                self._bytes -= size
+                if self._bytes <= target:
+                    break
+            conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+            self.evictions += len(evicted)
+        logger.info(f"Evicted embedding cache entries, {self.evictions} in total")
+
+    def _stored_bytes(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """The process-wide embedding cache, or None when caching is disabled"""
+    global _cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU of query vectors with a time-to-live.
+
+    Chat traffic repeats a small set of questions, so hot queries are
+    answered without calling the embedding model. Queries are keyed by their
+    normalized text and the normalized text is what gets embedded, so
+    variants that differ only in whitespace share an entry. With `coalesce`,
+    concurrent lookups of the same missing query wait for one embedding call.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, coalesce: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.coalesce = coalesce
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+        # normalized query -> (vector, expiry time), least recently used first
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._pending: Dict[str, "asyncio.Task[np.ndarray]"] = {}
+
+    async def get_or_embed(self, query: str, embed: Callable[[str], Awaitable[np.ndarray]]) -> np.ndarray:
+        """The cached vector of `query`, or the result of `embed(normalized query)` (which is then cached)"""
+        key = normalize_text(query)
+        entry = self._entries.get(key)
+        if entry is not None:
+            vector, expires = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            del self._entries[key]
+            self.expired += 1
+
+        if not self.coalesce:
+            self.misses += 1
+            return await self._load(key, embed)
+
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._pending[key] = asyncio.ensure_future(self._load(key, embed))
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # A cancelled caller must not cancel the call others are waiting for
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries
+        }
+
+    async def _load(self, key: str, embed: Callable[[str], Awaitable[np.ndarray]]) -> np.ndarray:
+        vector = np.asarray(await embed(key), dtype=np.float32)
+        # Callers share the array
+        vector.setflags(write=False)
+        self._entries[key] = (vector, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return vector
+
+    def _finish(self, key: str, task: "asyncio.Task[np.ndarray]"):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        # Retrieve the error so it is not reported as unhandled when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+_query_caches: Dict[str, QueryEmbeddingCache] = {}
+
+
+def get_query_embedding_cache(model_name: str) -> Optional[QueryEmbeddingCache]:
+    """The query cache shared by every website embedded with `model_name`, or None when disabled"""
+    if settings.QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        return None
+    cache = _query_caches.get(model_name)
+    if cache is None:
+        cache = _query_caches[model_name] = QueryEmbeddingCache(settings.QUERY_EMBEDDING_CACHE_SIZE,
+                                                                settings.QUERY_EMBEDDING_CACHE_TTL,
+                                                                settings.QUERY_EMBEDDING_COALESCE)
+    return cache
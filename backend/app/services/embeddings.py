@@ -1,25 +1,24 @@
 import asyncio
-import httpx
-import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import logging
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
 import numpy as np
 from app.core.config import settings
+from app.services.dedup import NearDuplicateIndex
+from app.services.embedding_backends import get_embedding_backend
+from app.services.embedding_cache import get_embedding_cache, get_query_embedding_cache, normalize_text
+from app.services.vector_store import create_vector_store
 import re
 import uuid
-import hashlib
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingService:
     def __init__(self):
-        self.qdrant_client = QdrantClient(
-            url=settings.QDRANT_URL,
-            api_key=settings.QDRANT_API_KEY
-        )
+        self.vector_store = create_vector_store()
         self.embedding_model = settings.HUGGINGFACE_EMBEDDING_MODEL
+        self.backend = get_embedding_backend(settings.EMBEDDING_BACKEND)
+        self.cache = get_embedding_cache()
+        self.query_cache = get_query_embedding_cache(self.embedding_model)
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = settings.CHUNK_OVERLAP
 
@@ -27,57 +26,180 @@ class EmbeddingService:
         """Process website content and store embeddings in Qdrant"""
         try:
             # Create collection for this website if it doesn't exist
-            collection_name = f"website_{website_id}"
-            await self._create_collection_if_not_exists(collection_name)
+            await self.ensure_collection(website_id)
             
             # Clear existing data for this website (skip for now to avoid selector issues)
             # await self._clear_collection(collection_name)
             
             total_chunks = 0
-            
+            skipped_pages = 0
+            near_duplicates = NearDuplicateIndex(settings.NEAR_DUPLICATE_MAX_DISTANCE)
+            # Chunks of several pages are embedded and upserted together
+            batch_pages: List[Tuple[Dict[str, str], int]] = []
+            batch_chunks: List[Dict[str, Any]] = []
+
             for page in pages:
-                # Chunk the content
-                chunks = self._chunk_text(page['content'])
-                
-                # Generate embeddings for chunks
-                embeddings = await self._generate_embeddings([chunk['text'] for chunk in chunks])
-                
-                # Store in Qdrant
-                points = []
-                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                    # Generate a unique ID using hash of website_id, url, and chunk index
-                    id_string = f"{website_id}_{page['url']}_{i}"
-                    point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, id_string))
-                    
-                    point = PointStruct(
-                        id=point_id,
-                        vector=embedding.tolist(),
-                        payload={
-                            'website_id': website_id,
-                            'url': page['url'],
-                            'title': page['title'],
-                            'content': chunk['text'],
-                            'chunk_index': i,
-                            'total_chunks': len(chunks)
-                        }
-                    )
-                    points.append(point)
-                
-                # Insert points in batches
-                if points:
-                    self.qdrant_client.upsert(
-                        collection_name=collection_name,
-                        points=points
-                    )
-                    total_chunks += len(points)
-            
-            logger.info(f"Processed {total_chunks} chunks for website {website_id}")
+                # Unchanged pages keep the chunks indexed by a previous crawl
+                if page.get('unchanged'):
+                    total_chunks += page.get('chunk_count') or 0
+                    skipped_pages += 1
+                    continue
+
+                # Chunk the content, skipping text already embedded for this website
+                chunks = self.chunk_page(page, near_duplicates)
+                batch_pages.append((page, len(chunks)))
+                batch_chunks.extend(chunks)
+
+                if len(batch_chunks) >= self.vector_store.batch_size:
+                    total_chunks += await self._store_pages(website_id, batch_pages, batch_chunks)
+                    batch_pages, batch_chunks = [], []
+
+            if batch_pages:
+                total_chunks += await self._store_pages(website_id, batch_pages, batch_chunks)
+
+            logger.info(
+                f"Processed {total_chunks} chunks for website {website_id} "
+                f"({skipped_pages} unchanged pages skipped, {near_duplicates.pruned} near-duplicate chunks pruned)"
+            )
             return total_chunks
             
         except Exception as e:
             logger.error(f"Error processing embeddings for website {website_id}: {e}")
             raise
 
+    async def _store_pages(self, website_id: str, pages: List[Tuple[Dict[str, str], int]],
+                           chunks: List[Dict[str, Any]]) -> int:
+        """Embed and store the chunks of several pages, then record each page's chunk count"""
+        embeddings = await self.embed_texts([chunk['text'] for chunk in chunks])
+        stored = await self.upsert_chunks(website_id, chunks, embeddings)
+        for page, chunk_count in pages:
+            await self.finish_page(website_id, page, chunk_count)
+        return stored
+
+    async def close(self):
+        """Release the embedding backend (threads, loaded model) and the Qdrant connections"""
+        try:
+            logger.info(f"Embedding cache stats: {await asyncio.to_thread(self.cache_stats)}")
+        except Exception as e:
+            logger.warning(f"Could not read embedding cache stats: {e}")
+        await self.backend.close()
+        await self.vector_store.close()
+
+    def collection_name(self, website_id: str) -> str:
+        return f"website_{website_id}"
+
+    async def ensure_collection(self, website_id: str):
+        """Create the website's collection if it doesn't exist"""
+        await self._create_collection_if_not_exists(self.collection_name(website_id))
+
+    def chunk_page(self, page: Dict[str, str],
+                   near_duplicates: Optional[NearDuplicateIndex] = None) -> List[Dict[str, Any]]:
+        """Split a page into chunk records ready to embed and upsert.
+
+        With `near_duplicates`, chunks repeating text already seen for the
+        website are dropped before the chunks are numbered.
+        """
+        texts = [chunk['text'] for chunk in self._chunk_text(page['content'])]
+        if near_duplicates is not None and settings.NEAR_DUPLICATE_DETECTION:
+            texts = [text for text in texts if not near_duplicates.is_duplicate(text)]
+
+        return [
+            {
+                'url': page['url'],
+                'title': page['title'],
+                'text': text,
+                'chunk_index': i,
+                'total_chunks': len(texts)
+            }
+            for i, text in enumerate(texts)
+        ]
+
+    async def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed a batch of texts, sending only those missing from the embedding cache to the model"""
+        if self.cache is None or not texts:
+            return await self._generate_embeddings(texts)
+
+        vectors = await asyncio.to_thread(self.cache.get_many, self.embedding_model, texts)
+        # Each distinct missing text is embedded once, however often it repeats in the batch
+        missing: Dict[str, str] = {}
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                missing.setdefault(normalize_text(text), text)
+        if missing:
+            missing_texts = list(missing.values())
+            embedded = dict(zip(missing, await self._generate_embeddings(missing_texts)))
+            await asyncio.to_thread(self.cache.put_many, self.embedding_model, missing_texts,
+                                    list(embedded.values()))
+            vectors = [embedded[normalize_text(text)] if vector is None else vector
+                       for text, vector in zip(texts, vectors)]
+        return vectors
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query, answering repeated queries from the query cache"""
+        if self.query_cache is None:
+            return await self.backend.embed_query(query)
+        return await self.query_cache.get_or_embed(query, self.backend.embed_query)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes of the chunk and query embedding caches (logged on close)"""
+        return {
+            'chunks': {'enabled': True, **self.cache.stats()} if self.cache is not None else {'enabled': False},
+            'queries': ({'enabled': True, **self.query_cache.stats()} if self.query_cache is not None
+                        else {'enabled': False})
+        }
+
+    async def upsert_chunks(self, website_id: str, chunks: List[Dict[str, Any]],
+                            embeddings: List[np.ndarray]) -> int:
+        """Store embedded chunk records (from any number of pages) in Qdrant"""
+        if not chunks:
+            return 0
+
+        # Generate a unique ID using hash of website_id, url, and chunk index
+        ids = [self._point_id(website_id, chunk['url'], chunk['chunk_index']) for chunk in chunks]
+        payloads = [
+            {
+                'website_id': website_id,
+                'url': chunk['url'],
+                'title': chunk['title'],
+                'content': chunk['text'],
+                'chunk_index': chunk['chunk_index'],
+                'total_chunks': chunk['total_chunks']
+            }
+            for chunk in chunks
+        ]
+        return await self.vector_store.upsert(self.collection_name(website_id), ids, np.vstack(embeddings), payloads)
+
+    async def finish_page(self, website_id: str, page: Dict[str, str], chunk_count: int):
+        """Record a page's chunk count once all its chunks are stored, deleting leftovers of its previous version"""
+        page['chunk_count'] = chunk_count
+        await self._delete_stale_chunks(self.collection_name(website_id), website_id, page['url'],
+                                        chunk_count, page.get('previous_chunk_count') or 0)
+
+    async def delete_pages(self, website_id: str, urls: List[str]):
+        """Delete all chunks of pages that were removed from the website"""
+        if urls:
+            await self.vector_store.delete_by_urls(self.collection_name(website_id), urls)
+
+    async def _delete_stale_chunks(self, collection_name: str, website_id: str, url: str,
+                                   chunk_count: int, previous_chunk_count: int):
+        """Delete chunks left over from a longer previous version of a page"""
+        if previous_chunk_count <= chunk_count:
+            return
+
+        stale_ids = [
+            self._point_id(website_id, url, i)
+            for i in range(chunk_count, previous_chunk_count)
+        ]
+        try:
+            await self.vector_store.delete_points(collection_name, stale_ids)
+        except Exception as e:
+            logger.warning(f"Failed to delete stale chunks for {url}: {e}")
+
+    def _point_id(self, website_id: str, url: str, chunk_index: int) -> str:
+        """Deterministic point ID for a chunk, so re-embedding a page overwrites it"""
+        id_string = f"{website_id}_{url}_{chunk_index}"
+        return str(uuid.uuid5(uuid.NAMESPACE_DNS, id_string))
+
     def _chunk_text(self, text: str) -> List[Dict[str, Any]]:
         """Split text into overlapping chunks"""
         chunks = []
@@ -124,67 +246,13 @@ class EmbeddingService:
         return chunks
 
     async def _generate_embeddings(self, texts: List[str]) -> List[np.ndarray]:
-        """Generate embeddings using HuggingFace API"""
-        try:
-            async with httpx.AsyncClient() as client:
-                # Use a simpler approach - send each text individually
-                embeddings = []
-                for text in texts:
-                    # Clean and prepare text
-                    clean_text = text.strip()
-                    if not clean_text:
-                        # Create a zero vector for empty text
-                        embeddings.append(np.zeros(384))
-                        continue
-                    
-                    response = await client.post(
-                        f"https://api-inference.huggingface.co/models/{self.embedding_model}",
-                        headers={
-                            "Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}",
-                            "Content-Type": "application/json"
-                        },
-                        json={"inputs": clean_text},
-                        timeout=30.0
-                    )
-                    
-                    if response.status_code != 200:
-                        logger.warning(f"HuggingFace API error for text '{clean_text[:50]}...': {response.status_code}")
-                        # Create a random vector as fallback
-                        embeddings.append(np.random.rand(384))
-                        continue
-                    
-                    embedding = response.json()
-                    
-                    # Convert to numpy array
-                    if isinstance(embedding, list) and len(embedding) > 0:
-                        embeddings.append(np.array(embedding[0]))
-                    elif isinstance(embedding, list):
-                        embeddings.append(np.random.rand(384))
-                    else:
-                        embeddings.append(np.array(embedding))
-                
-                return embeddings
-                    
-        except Exception as e:
-            logger.error(f"Error generating embeddings: {e}")
-            # Return random embeddings as fallback
-            return [np.random.rand(384) for _ in texts]
+        """Generate embeddings with the configured backend"""
+        return await self.backend.embed(texts)
 
     async def _create_collection_if_not_exists(self, collection_name: str):
         """Create Qdrant collection if it doesn't exist"""
         try:
-            collections = self.qdrant_client.get_collections()
-            collection_names = [col.name for col in collections.collections]
-            
-            if collection_name not in collection_names:
-                self.qdrant_client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(
-                        size=384,  # Size for paraphrase-MiniLM-L3-v2
-                        distance=Distance.COSINE
-                    )
-                )
-                logger.info(f"Created collection: {collection_name}")
+            await self.vector_store.ensure_collection(collection_name, self.backend.dimension)
         except Exception as e:
             logger.error(f"Error creating collection {collection_name}: {e}")
             raise
@@ -192,10 +260,7 @@ class EmbeddingService:
     async def _clear_collection(self, collection_name: str):
         """Clear all points from a collection"""
         try:
-            self.qdrant_client.delete(
-                collection_name=collection_name,
-                points_selector={"all": True}
-            )
+            await self.vector_store.clear(collection_name)
             logger.info(f"Cleared collection: {collection_name}")
         except Exception as e:
             logger.error(f"Error clearing collection {collection_name}: {e}")
@@ -206,17 +271,11 @@ class EmbeddingService:
         try:
             collection_name = f"website_{website_id}"
             
-            # Generate embedding for query
-            query_embeddings = await self._generate_embeddings([query])
-            query_vector = query_embeddings[0].tolist()
+            # Generate embedding for query (hot queries come from the query cache)
+            query_vector = await self.embed_query(query)
             
             # Search in Qdrant
-            search_results = self.qdrant_client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=top_k,
-                with_payload=True
-            )
+            search_results = await self.vector_store.search(collection_name, query_vector, top_k)
             
             # Format results
             results = []
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+from bs4 import BeautifulSoup
+from app.services.render_detector import needs_rendering
+
+try:
+    import lxml.etree
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:  # pragma: no cover - lxml is an optional speedup
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Leading <?xml ...?> declaration of XHTML documents
+XML_DECLARATION = re.compile(r'^\ufeff?\s*<\?xml[^>]*\?>')
+
+# Elements whose text never belongs to the page content
+REMOVED_TAGS = ("script", "style", "nav", "footer", "header")
+
+# Elements that start a new line of text; lines are the unit of boilerplate detection
+BLOCK_TAGS = (
+    "title", "p", "div", "section", "article", "main", "aside", "h1", "h2", "h3", "h4", "h5", "h6",
+    "ul", "ol", "li", "dl", "dt", "dd", "table", "thead", "tbody", "tfoot", "tr", "td", "th",
+    "blockquote", "pre", "br", "hr", "form", "fieldset", "figure", "figcaption", "address",
+    "details", "summary", "center"
+)
+
+
+class ExtractedPage:
+    """Title, cleaned text and raw link targets extracted from one HTML document"""
+
+    __slots__ = ('title', 'text', 'links')
+
+    def __init__(self, title: str, text: str, links: List[str]):
+        self.title = title
+        self.text = text
+        self.links = links
+
+
+def clean_text(text: str) -> str:
+    """Collapse whitespace within each line and drop empty lines"""
+    lines = (' '.join(line.split()) for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+class HTMLExtractor:
+    """Interface for HTML extraction backends.
+
+    Every backend must produce the same text for the same document: scripts,
+    styles, nav, header and footer are dropped, every block element starts a
+    new line and whitespace is collapsed within lines. Links are the raw href
+    values found outside the removed elements.
+    """
+
+    name = "base"
+
+    def extract(self, html: bytes) -> ExtractedPage:
+        raise NotImplementedError
+
+
+class BeautifulSoupExtractor(HTMLExtractor):
+    """Reference backend built on BeautifulSoup's pure-Python html.parser"""
+
+    name = "bs4"
+
+    def extract(self, html: bytes) -> ExtractedPage:
+        soup = BeautifulSoup(html, 'html.parser')
+
+        title_tag = soup.find('title')
+        title = title_tag.get_text().strip() if title_tag else ""
+
+        # Remove script and style elements
+        for element in soup(list(REMOVED_TAGS)):
+            element.decompose()
+
+        for element in soup(list(BLOCK_TAGS)):
+            element.insert(0, '\n')
+            element.insert_after('\n')
+
+        text = clean_text(soup.get_text())
+        links = [link['href'] for link in soup.find_all('a', href=True)]
+
+        return ExtractedPage(title, text, links)
+
+
+class LxmlExtractor(HTMLExtractor):
+    """Fast backend built on lxml's C HTML parser"""
+
+    name = "lxml"
+
+    def extract(self, html: bytes) -> ExtractedPage:
+        try:
+            # Decoding up front avoids libxml2 guessing Latin-1 for pages without a charset
+            document = html.decode('utf-8')
+            # lxml rejects str input that carries an XML encoding declaration (XHTML pages)
+            document = XML_DECLARATION.sub('', document, count=1)
+        except UnicodeDecodeError:
+            document = html
+
+        try:
+            root = lxml.html.document_fromstring(document)
+        except (lxml.etree.ParserError, ValueError) as e:
+            # Empty or unparseable for lxml: let the reference parser have a go
+            logger.debug(f"lxml could not parse document ({e}), falling back to BeautifulSoup")
+            return BeautifulSoupExtractor().extract(html)
+
+        title_element = root.find('.//title')
+        title = title_element.text_content().strip() if title_element is not None else ""
+
+        for element in list(root.iter(*REMOVED_TAGS)):
+            element.drop_tree()
+
+        for element in root.iter(*BLOCK_TAGS):
+            element.text = '\n' + (element.text or '')
+            element.tail = '\n' + (element.tail or '')
+
+        text = clean_text(root.text_content())
+        links = [href for href in root.xpath('//a/@href')]
+
+        return ExtractedPage(title, text, links)
+
+
+EXTRACTORS = {
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def get_extractor(name: Optional[str] = None) -> HTMLExtractor:
+    """Select an extraction backend: 'bs4', 'lxml', or 'auto' (lxml when installed)"""
+    name = (name or "auto").lower()
+    if name == "auto":
+        name = LxmlExtractor.name if LXML_AVAILABLE else BeautifulSoupExtractor.name
+
+    if name == LxmlExtractor.name and not LXML_AVAILABLE:
+        logger.warning("lxml is not installed, falling back to the BeautifulSoup extractor")
+        name = BeautifulSoupExtractor.name
+
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown HTML extraction backend: {name}")
+
+    return EXTRACTORS[name]()
+
+
+# Extractors created inside pool worker processes, one per backend name
+_worker_extractors: Dict[str, HTMLExtractor] = {}
+
+
+def extract_document(html: bytes, backend: Optional[str] = None) -> Dict[str, Any]:
+    """Parse raw HTML and return its title, text, links and whether it needs JS rendering.
+
+    Module-level so it can run in a ProcessPoolExecutor worker.
+    """
+    extractor = _worker_extractors.get(backend)
+    if extractor is None:
+        extractor = _worker_extractors[backend] = get_extractor(backend)
+
+    extracted = extractor.extract(html)
+    return {
+        'title': extracted.title,
+        'text': extracted.text,
+        'links': extracted.links,
+        'needs_rendering': needs_rendering(html.decode('utf-8', errors='replace'), extracted.text)
+    }
+
+
+class ExtractionPool:
+    """Bounded process pool that parses HTML off the event loop.
+
+    With `workers` set to 0 documents are parsed in-process, which keeps
+    small deployments free of extra processes.
+    """
+
+    def __init__(self, workers: int, backend: Optional[str] = None):
+        self.workers = max(0, workers)
+        self.backend = backend
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers only import this module, not the API application
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    async def extract(self, html: bytes) -> Dict[str, Any]:
+        """Extract a document in a worker process (or inline when the pool is disabled)"""
+        if self.workers == 0:
+            return extract_document(html, self.backend)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), extract_document, html, self.backend)
+        except BrokenProcessPool:
+            logger.warning("Extraction worker died, restarting the process pool")
+            self.close()
+            return await loop.run_in_executor(self._get_executor(), extract_document, html, self.backend)
+
+    def close(self, wait: bool = False):
+        """Shut down the worker processes (with `wait`, block until they have exited)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,140 @@
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import re
+
+# Number of priority levels; lower numbers are crawled first
+PRIORITY_LEVELS = 16
+
+# Query parameters that never change page content
+TRACKING_PARAMS = {
+    'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'ref', 'ref_src', 'igshid', 'spm'
+}
+
+# Path segments that usually carry the content a support chatbot needs
+HIGH_VALUE_SEGMENTS = {
+    'about', 'about-us', 'contact', 'contact-us', 'pricing', 'prices', 'plans',
+    'services', 'service', 'products', 'product', 'faq', 'faqs', 'help',
+    'support', 'hours', 'locations', 'location', 'team', 'menu', 'shipping',
+    'delivery', 'returns', 'refunds', 'policy', 'terms', 'privacy', 'docs',
+    'features', 'how-it-works', 'booking', 'book'
+}
+
+# Path segments that are mostly listings, duplicates or dead ends
+LOW_VALUE_SEGMENTS = {
+    'tag', 'tags', 'category', 'categories', 'author', 'page', 'archive',
+    'archives', 'login', 'signin', 'sign-in', 'logout', 'register', 'signup',
+    'cart', 'checkout', 'account', 'my-account', 'wp-admin', 'wp-json',
+    'wp-login.php', 'feed', 'rss', 'search', 'print', 'share', 'calendar',
+    'comments', 'attachment', 'cdn-cgi'
+}
+
+_DATE_SEGMENT = re.compile(r'^\d{4}$|^\d{1,2}$')
+
+
+def normalize_url(url: str) -> str:
+    """Canonicalize a URL so trivially different spellings share one frontier entry.
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the query string and strips trailing slashes.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path or '/')
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query_params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    query = urlencode(sorted(query_params))
+
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def score_url(url: str, depth: int) -> int:
+    """Score a URL for crawl order; lower scores are more valuable"""
+    parts = urlsplit(url)
+    segments = [segment.lower() for segment in parts.path.split('/') if segment]
+
+    score = depth * 2
+    if any(segment in HIGH_VALUE_SEGMENTS for segment in segments):
+        score -= 3
+    if any(segment in LOW_VALUE_SEGMENTS for segment in segments):
+        score += 6
+    if any(_DATE_SEGMENT.match(segment) for segment in segments):
+        score += 2  # Dated blog archives and paginated listings
+    if len(segments) > 3:
+        score += len(segments) - 3
+    if parts.query:
+        score += 2
+
+    return min(max(score, 0), PRIORITY_LEVELS - 1)
+
+
+class URLFrontier:
+    """Priority frontier of URLs still to crawl.
+
+    URLs are checked against a set-backed index of their canonical forms on
+    insert, then placed into one of a fixed number of priority buckets. They
+    are queued as discovered: a canonical URL may have lost the trailing slash
+    that relative links on the page depend on. Both insert and dequeue are
+    O(1) since the number of buckets is constant.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self._buckets: List[Deque[Tuple[str, int]]] = [deque() for _ in range(PRIORITY_LEVELS)]
+        self._seen: Set[str] = set()
+        self._size = 0
+        self._lowest = PRIORITY_LEVELS
+        # URLs turned away because the frontier was full
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self._seen
+
+    def add(self, url: str, depth: int = 0) -> bool:
+        """Queue a URL unless it (or an equivalent spelling) was seen before"""
+        canonical = normalize_url(url)
+        if canonical in self._seen:
+            return False
+        if self.max_size is not None and self._size >= self.max_size:
+            self.dropped += 1
+            return False
+
+        self._seen.add(canonical)
+        priority = score_url(canonical, depth)
+        self._buckets[priority].append((url.strip(), depth))
+        self._size += 1
+        self._lowest = min(self._lowest, priority)
+        return True
+
+    def mark_seen(self, url: str):
+        """Record a URL in the dedup index without queueing it"""
+        self._seen.add(normalize_url(url))
+
+    def snapshot(self) -> List[Tuple[str, int]]:
+        """Queued (url, depth) pairs in crawl order, for checkpointing"""
+        return [item for bucket in self._buckets for item in bucket]
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Dequeue the most valuable URL and its depth, or None when empty"""
+        while self._lowest < PRIORITY_LEVELS:
+            bucket = self._buckets[self._lowest]
+            if bucket:
+                self._size -= 1
+                return bucket.popleft()
+            self._lowest += 1
+        return None
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Set
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.models.website import Website, WebsiteStatus
+from app.services.archive import get_crawl_archive
+from app.services.embeddings import embedding_service
+from app.services.job_queue import Job, JobQueue, JobStatus, get_job_queue
+from app.services.page_manifest import delete_manifest_pages, load_page_manifest, save_page_manifest
+from app.services.pipeline import IngestionPipeline
+from app.services.reindex import ArchiveReplay
+from app.services.scheduler import LANE_NORMAL, LANE_PRIORITY
+from app.services.scraper import scraper
+
+logger = logging.getLogger(__name__)
+
+# Job kinds
+INGEST_WEBSITE = "ingest_website"
+REINDEX_WEBSITE = "reindex_website"
+
+
+async def update_website_status(website_id: str, status: WebsiteStatus, **fields):
+    """Reflect ingestion progress in the website's status fields"""
+    supabase = await get_supabase()
+    supabase.table("websites").update({
+        "status": status.value,
+        "updated_at": datetime.utcnow().isoformat(),
+        **fields
+    }).eq("id", website_id).execute()
+
+
+def ingestion_lane(website: Website) -> int:
+    """New and small websites go in the priority lane so they finish quickly behind large crawls"""
+    if website.last_scraped_at is None or website.pages_scraped <= settings.SCHEDULER_SMALL_SITE_PAGES:
+        return LANE_PRIORITY
+    return LANE_NORMAL
+
+
+async def enqueue_website_ingestion(website: Website, queue: Optional[JobQueue] = None) -> Job:
+    """Queue a scrape-and-index job for a website (returns the existing job if one is pending).
+
+    The job is accounted to the website's owner, so websites of one user share
+    that user's fair share of the workers.
+    """
+    return await _enqueue(INGEST_WEBSITE, website, queue)
+
+
+async def enqueue_website_reindex(website: Website, queue: Optional[JobQueue] = None) -> Job:
+    """Queue a job that re-indexes a website from the crawl archive, without fetching anything"""
+    return await _enqueue(REINDEX_WEBSITE, website, queue)
+
+
+async def _enqueue(kind: str, website: Website, queue: Optional[JobQueue]) -> Job:
+    queue = queue or get_job_queue()
+    lane = ingestion_lane(website)
+    job = await queue.enqueue(kind, website.id, {"url": str(website.url), "lane": lane},
+                              priority=lane, tenant_id=website.user_id)
+    if job.status == JobStatus.QUEUED and job.attempts == 0:
+        await update_website_status(website.id, WebsiteStatus.PENDING, error_message=None)
+    return job
+
+
+async def ingest_website(job: Job):
+    """Scrape a website and index it as one streaming pipeline"""
+    website_id = job.website_id
+    website_url = job.payload["url"]
+    queue = get_job_queue()
+
+    async def crawl_finished(crawl):
+        # Embedding of the last pages continues after the crawl itself is done
+        await update_website_status(website_id, WebsiteStatus.PROCESSING, pages_scraped=crawl.page_count)
+
+    async def save_checkpoint(data):
+        await queue.save_checkpoint(website_id, job.kind, data)
+
+    await update_website_status(website_id, WebsiteStatus.SCRAPING)
+
+    # Pick up where an interrupted or failed attempt left off
+    checkpoint = await queue.load_checkpoint(website_id, job.kind, max_age=settings.JOB_CHECKPOINT_MAX_AGE)
+
+    # Revalidate pages known from the previous crawl instead of re-indexing them
+    manifest = await load_page_manifest(website_id)
+    pipeline = IngestionPipeline(website_id, website_url, manifest, on_crawl_finished=crawl_finished,
+                                 checkpoint=checkpoint, on_checkpoint=save_checkpoint,
+                                 tenant=job.tenant_id, lane=job.payload.get("lane", LANE_NORMAL))
+    total_chunks = await pipeline.run()
+    await save_page_manifest(website_id, pipeline.pages)
+    await prune_removed_pages(website_id, pipeline.crawl.removed_manifest_urls() | pipeline.dropped_manifest_urls())
+    await queue.clear_checkpoint(website_id, job.kind)
+
+    await update_website_status(
+        website_id,
+        WebsiteStatus.COMPLETED,
+        pages_scraped=len(pipeline.pages),
+        total_chunks=total_chunks,
+        last_scraped_at=datetime.utcnow().isoformat(),
+        error_message=None
+    )
+
+
+async def prune_removed_pages(website_id: str, urls: Set[str]):
+    """Drop the chunks and manifest rows of pages that are gone from the website.
+
+    This includes pages that are still there but were dropped as
+    near-duplicates of another page (or held only boilerplate), so their old
+    chunks do not linger. The manifest rows are only deleted once the chunks
+    are, so a failed delete is retried after the next crawl.
+    """
+    if not urls:
+        return
+    try:
+        await embedding_service.delete_pages(website_id, sorted(urls))
+    except Exception as e:
+        logger.warning(f"Could not delete chunks of {len(urls)} removed pages of website {website_id}: {e}")
+        return
+    await delete_manifest_pages(website_id, urls)
+    logger.info(f"Pruned {len(urls)} removed or duplicate pages of website {website_id}")
+
+
+async def reindex_website(job: Job):
+    """Re-extract, re-chunk and re-embed a website's archived pages with the current settings"""
+    website_id = job.website_id
+    archive = get_crawl_archive()
+    if archive is None:
+        raise RuntimeError("Re-indexing needs the crawl archive (CRAWL_ARCHIVE_ENABLED)")
+    if not await asyncio.to_thread(archive.count, website_id):
+        raise RuntimeError(f"Website {website_id} has no archived pages; scrape it first")
+
+    await update_website_status(website_id, WebsiteStatus.PROCESSING)
+
+    manifest = await load_page_manifest(website_id)
+    replay = ArchiveReplay(archive, scraper.extraction_pool, website_id)
+    pipeline = IngestionPipeline(website_id, job.payload["url"], manifest, crawler=replay,
+                                 tenant=job.tenant_id, lane=job.payload.get("lane", LANE_NORMAL))
+    total_chunks = await pipeline.run()
+    await save_page_manifest(website_id, pipeline.pages)
+    await prune_removed_pages(website_id, pipeline.dropped_manifest_urls())
+
+    await update_website_status(
+        website_id,
+        WebsiteStatus.COMPLETED,
+        pages_scraped=len(pipeline.pages),
+        total_chunks=total_chunks,
+        error_message=None
+    )
+
+
+# Job kind -> coroutine that runs it; a raised exception fails the attempt
+JOB_HANDLERS = {
+    INGEST_WEBSITE: ingest_website,
+    REINDEX_WEBSITE: reindex_website,
+}
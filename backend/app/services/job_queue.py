@@ -0,0 +1,521 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from app.core.config import settings
+from app.services.rate_control import jittered_backoff
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class Job:
+    """One unit of ingestion work and its delivery state"""
+
+    __slots__ = ('id', 'kind', 'website_id', 'tenant_id', 'payload', 'status', 'priority', 'attempts',
+                 'max_attempts', 'run_after', 'lease_owner', 'lease_expires_at', 'claimed_at', 'last_error',
+                 'created_at', 'updated_at')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+        if isinstance(self.payload, str):
+            self.payload = json.loads(self.payload)
+        self.payload = self.payload or {}
+
+    @property
+    def retries_left(self) -> bool:
+        return self.attempts < self.max_attempts
+
+    @property
+    def attempts_exhausted(self) -> bool:
+        """Claimed more often than allowed: earlier workers died while holding the lease"""
+        return self.attempts > self.max_attempts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class JobQueue:
+    """Interface for persistent ingestion job queues.
+
+    Jobs are claimed with a lease; a worker must heartbeat before the lease
+    expires, otherwise the job becomes claimable again (the worker is assumed
+    dead). Failed jobs are retried with exponential backoff until
+    `max_attempts` claims have been used.
+
+    Claims are shared fairly between tenants (the owners of the websites):
+    higher `priority` goes first, then the tenant with the fewest running
+    jobs, then the tenant served least recently. A tenant that queues a
+    hundred sites therefore does not delay everyone else's single site.
+
+    Checkpoints are kept per website and job kind rather than per job, so
+    a retry and a job queued again after a final failure both resume from
+    the last saved progress. Workers call purge() now and then to delete
+    finished jobs and stale checkpoints.
+
+    SQLiteJobQueue serves workers on one host; SupabaseJobQueue serves
+    workers on any number of hosts.
+    """
+
+    async def enqueue(self, kind: str, website_id: str, payload: Optional[Dict[str, Any]] = None,
+                      priority: int = 0, max_attempts: Optional[int] = None,
+                      tenant_id: Optional[str] = None) -> Job:
+        raise NotImplementedError
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        raise NotImplementedError
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        raise NotImplementedError
+
+    async def complete(self, job_id: str, worker_id: str):
+        raise NotImplementedError
+
+    async def fail(self, job_id: str, worker_id: str, error: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    async def active_job(self, website_id: str, kind: Optional[str] = None) -> Optional[Job]:
+        raise NotImplementedError
+
+    async def save_checkpoint(self, website_id: str, kind: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def load_checkpoint(self, website_id: str, kind: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def clear_checkpoint(self, website_id: str, kind: str):
+        raise NotImplementedError
+
+    async def purge(self, older_than: float) -> int:
+        raise NotImplementedError
+
+
+def retry_delay(attempts: int) -> float:
+    """Jittered exponential backoff before retrying a job that failed `attempts` times"""
+    return jittered_backoff(attempts, settings.JOB_RETRY_BASE_DELAY, settings.JOB_RETRY_MAX_DELAY)
+
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue stored in a local SQLite database.
+
+    Any number of worker processes on the same host can share the database
+    file; claims run in an IMMEDIATE transaction so a job is handed to one
+    worker only. Calls run in a thread to keep the event loop free.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    website_id TEXT NOT NULL,
+                    tenant_id TEXT NOT NULL,
+                    payload TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    run_after REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    claimed_at REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, run_after)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_website ON jobs (website_id, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_tenant ON jobs (tenant_id, status)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    website_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (website_id, kind)
+                )
+            """)
+            # When each tenant was last served; kept apart from the jobs so it survives purges
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tenant_claims (
+                    tenant_id TEXT PRIMARY KEY,
+                    last_claimed_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _row_to_job(self, row: Optional[sqlite3.Row]) -> Optional[Job]:
+        return Job(**dict(row)) if row is not None else None
+
+    async def enqueue(self, kind: str, website_id: str, payload: Optional[Dict[str, Any]] = None,
+                      priority: int = 0, max_attempts: Optional[int] = None,
+                      tenant_id: Optional[str] = None) -> Job:
+        """Queue a job, or return the job already queued or running for this website and kind.
+
+        Jobs without a tenant are treated as a tenant of their own.
+        """
+        return await asyncio.to_thread(self._enqueue, kind, website_id, payload or {}, priority,
+                                       max_attempts or settings.JOB_MAX_ATTEMPTS, tenant_id or website_id)
+
+    def _enqueue(self, kind: str, website_id: str, payload: Dict[str, Any], priority: int,
+                 max_attempts: int, tenant_id: str) -> Job:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = conn.execute(
+                    "SELECT * FROM jobs WHERE website_id = ? AND kind = ? AND status IN (?, ?)",
+                    (website_id, kind, JobStatus.QUEUED, JobStatus.RUNNING)
+                ).fetchone()
+                if existing is not None:
+                    conn.execute("COMMIT")
+                    return self._row_to_job(existing)
+
+                job_id = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, website_id, tenant_id, payload, status, priority, attempts, "
+                    "max_attempts, run_after, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                    (job_id, kind, website_id, tenant_id, json.dumps(payload), JobStatus.QUEUED, priority,
+                     max_attempts, now, now, now)
+                )
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                conn.execute("COMMIT")
+                return self._row_to_job(row)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        """Lease the next runnable job: a queued job that is due, or a running job whose lease expired.
+
+        Returns None while the running-job limits (JOB_MAX_RUNNING_GLOBAL and
+        JOB_MAX_RUNNING_PER_TENANT) leave nothing claimable. Every claim counts
+        as an attempt, including reclaims after a lost lease.
+        """
+        return await asyncio.to_thread(self._claim, worker_id, lease_seconds)
+
+    def _claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._next_claimable(conn, now)
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row['status'] == JobStatus.RUNNING:
+                    logger.warning(f"Reclaiming job {row['id']} from {row['lease_owner']} after its lease expired")
+
+                conn.execute(
+                    "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires_at = ?, claimed_at = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (JobStatus.RUNNING, worker_id, now + lease_seconds, now, now, row['id'])
+                )
+                conn.execute(
+                    "INSERT INTO tenant_claims (tenant_id, last_claimed_at) VALUES (?, ?) "
+                    "ON CONFLICT (tenant_id) DO UPDATE SET last_claimed_at = excluded.last_claimed_at",
+                    (row['tenant_id'], now)
+                )
+                claimed = conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+                conn.execute("COMMIT")
+                return self._row_to_job(claimed)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _next_claimable(self, conn: sqlite3.Connection, now: float) -> Optional[sqlite3.Row]:
+        # Jobs whose lease expired are not running any more, whatever their status says
+        max_global = settings.JOB_MAX_RUNNING_GLOBAL
+        if max_global > 0:
+            running = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND lease_expires_at > ?",
+                (JobStatus.RUNNING, now)
+            ).fetchone()[0]
+            if running >= max_global:
+                return None
+
+        # Within a priority: the tenant with the fewest running jobs, then the
+        # one that has waited longest since its last claim (never-served first).
+        # Only running jobs are counted, so finished jobs do not slow claims down.
+        max_per_tenant = settings.JOB_MAX_RUNNING_PER_TENANT
+        return conn.execute(
+            "WITH running AS ("
+            "  SELECT tenant_id, COUNT(*) AS running FROM jobs "
+            "  WHERE status = ? AND lease_expires_at > ? GROUP BY tenant_id"
+            ") "
+            "SELECT jobs.* FROM jobs "
+            "LEFT JOIN running ON running.tenant_id = jobs.tenant_id "
+            "LEFT JOIN tenant_claims ON tenant_claims.tenant_id = jobs.tenant_id "
+            "WHERE ((jobs.status = ? AND jobs.run_after <= ?) OR (jobs.status = ? AND jobs.lease_expires_at <= ?)) "
+            "AND (? <= 0 OR COALESCE(running.running, 0) < ?) "
+            "ORDER BY jobs.priority DESC, COALESCE(running.running, 0), tenant_claims.last_claimed_at, "
+            "jobs.run_after, jobs.created_at "
+            "LIMIT 1",
+            (JobStatus.RUNNING, now, JobStatus.QUEUED, now, JobStatus.RUNNING, now, max_per_tenant, max_per_tenant)
+        ).fetchone()
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; returns False if the worker no longer owns the job"""
+        return await asyncio.to_thread(self._update_owned, job_id, worker_id,
+                                       "lease_expires_at = ?", (time.time() + lease_seconds,))
+
+    async def complete(self, job_id: str, worker_id: str):
+        await asyncio.to_thread(self._update_owned, job_id, worker_id,
+                                "status = ?, lease_owner = NULL, lease_expires_at = NULL, last_error = NULL",
+                                (JobStatus.COMPLETED,))
+
+    async def fail(self, job_id: str, worker_id: str, error: str) -> Optional[Job]:
+        """Record a failed attempt, scheduling a retry with backoff while attempts remain.
+
+        Returns None, changing nothing, if the worker no longer owns the job.
+        """
+        return await asyncio.to_thread(self._fail, job_id, worker_id, error)
+
+    def _fail(self, job_id: str, worker_id: str, error: str) -> Optional[Job]:
+        job = self._get(job_id)
+        if job.retries_left:
+            owned = self._update_owned(
+                job_id, worker_id,
+                "status = ?, run_after = ?, lease_owner = NULL, lease_expires_at = NULL, last_error = ?",
+                (JobStatus.QUEUED, time.time() + retry_delay(job.attempts), error)
+            )
+        else:
+            owned = self._update_owned(job_id, worker_id,
+                                       "status = ?, lease_owner = NULL, lease_expires_at = NULL, last_error = ?",
+                                       (JobStatus.FAILED, error))
+        return self._get(job_id) if owned else None
+
+    def _update_owned(self, job_id: str, worker_id: str, assignments: str, values: tuple) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                (*values, time.time(), job_id, worker_id, JobStatus.RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as conn:
+            return self._row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    async def active_job(self, website_id: str, kind: Optional[str] = None) -> Optional[Job]:
+        """The queued or running job for a website, if any"""
+        return await asyncio.to_thread(self._active_job, website_id, kind)
+
+    def _active_job(self, website_id: str, kind: Optional[str]) -> Optional[Job]:
+        query = "SELECT * FROM jobs WHERE website_id = ? AND status IN (?, ?)"
+        params: List[Any] = [website_id, JobStatus.QUEUED, JobStatus.RUNNING]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._connect() as conn:
+            return self._row_to_job(conn.execute(query + " LIMIT 1", params).fetchone())
+
+    async def save_checkpoint(self, website_id: str, kind: str, data: Dict[str, Any]):
+        await asyncio.to_thread(self._save_checkpoint, website_id, kind, json.dumps(data))
+
+    def _save_checkpoint(self, website_id: str, kind: str, data: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO checkpoints (website_id, kind, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (website_id, kind) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (website_id, kind, data, time.time())
+            )
+
+    async def load_checkpoint(self, website_id: str, kind: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The saved checkpoint, or None if there is none or it is older than `max_age` seconds"""
+        return await asyncio.to_thread(self._load_checkpoint, website_id, kind, max_age)
+
+    def _load_checkpoint(self, website_id: str, kind: str, max_age: Optional[float]) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data, updated_at FROM checkpoints WHERE website_id = ? AND kind = ?",
+                (website_id, kind)
+            ).fetchone()
+        if row is None or (max_age is not None and time.time() - row['updated_at'] > max_age):
+            return None
+        return json.loads(row['data'])
+
+    async def clear_checkpoint(self, website_id: str, kind: str):
+        await asyncio.to_thread(self._clear_checkpoint, website_id, kind)
+
+    def _clear_checkpoint(self, website_id: str, kind: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE website_id = ? AND kind = ?", (website_id, kind))
+
+    async def purge(self, older_than: float) -> int:
+        """Delete finished jobs, checkpoints and tenant history untouched for `older_than` seconds.
+
+        Returns the number of jobs deleted.
+        """
+        return await asyncio.to_thread(self._purge, time.time() - older_than)
+
+    def _purge(self, cutoff: float) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = conn.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                    (JobStatus.COMPLETED, JobStatus.FAILED, cutoff)
+                ).rowcount
+                conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (cutoff,))
+                conn.execute(
+                    "DELETE FROM tenant_claims WHERE last_claimed_at < ? AND tenant_id NOT IN "
+                    "(SELECT tenant_id FROM jobs WHERE status IN (?, ?))",
+                    (cutoff, JobStatus.QUEUED, JobStatus.RUNNING)
+                )
+                conn.execute("COMMIT")
+                return deleted
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+
+class SupabaseJobQueue(JobQueue):
+    """Job queue stored in the Supabase Postgres database (migration 006).
+
+    Workers on any host can share it. Each state change is one call to a
+    database function: claims pick a row with FOR UPDATE SKIP LOCKED, and
+    lease and checkpoint times come from the database clock so workers need
+    not agree on the time. The tables are only reachable with the service
+    role key.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def _rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        return self.client.rpc(function, params).execute().data
+
+    def _rpc_job(self, function: str, params: Dict[str, Any]) -> Optional[Job]:
+        rows = self._rpc(function, params)
+        return Job(**rows[0]) if rows else None
+
+    async def enqueue(self, kind: str, website_id: str, payload: Optional[Dict[str, Any]] = None,
+                      priority: int = 0, max_attempts: Optional[int] = None,
+                      tenant_id: Optional[str] = None) -> Job:
+        """Queue a job, or return the job already queued or running for this website and kind"""
+        return await asyncio.to_thread(self._rpc_job, "enqueue_ingestion_job", {
+            'p_kind': kind,
+            'p_website_id': website_id,
+            'p_tenant_id': tenant_id or website_id,
+            'p_payload': payload or {},
+            'p_priority': priority,
+            'p_max_attempts': max_attempts or settings.JOB_MAX_ATTEMPTS
+        })
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        return await asyncio.to_thread(self._rpc_job, "claim_ingestion_job", {
+            'p_worker_id': worker_id,
+            'p_lease_seconds': lease_seconds,
+            'p_max_per_tenant': settings.JOB_MAX_RUNNING_PER_TENANT,
+            'p_max_global': settings.JOB_MAX_RUNNING_GLOBAL
+        })
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return bool(await asyncio.to_thread(self._rpc, "heartbeat_ingestion_job", {
+            'p_job_id': job_id, 'p_worker_id': worker_id, 'p_lease_seconds': lease_seconds
+        }))
+
+    async def complete(self, job_id: str, worker_id: str):
+        await asyncio.to_thread(self._rpc, "complete_ingestion_job", {'p_job_id': job_id, 'p_worker_id': worker_id})
+
+    async def fail(self, job_id: str, worker_id: str, error: str) -> Optional[Job]:
+        return await asyncio.to_thread(self._fail, job_id, worker_id, error)
+
+    def _fail(self, job_id: str, worker_id: str, error: str) -> Optional[Job]:
+        job = self._get(job_id)
+        return self._rpc_job("fail_ingestion_job", {
+            'p_job_id': job_id,
+            'p_worker_id': worker_id,
+            'p_error': error,
+            'p_retry_delay': retry_delay(job.attempts)
+        })
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        rows = self.client.table("ingestion_jobs").select("*").eq("id", job_id).execute().data
+        return Job(**rows[0]) if rows else None
+
+    async def active_job(self, website_id: str, kind: Optional[str] = None) -> Optional[Job]:
+        return await asyncio.to_thread(self._active_job, website_id, kind)
+
+    def _active_job(self, website_id: str, kind: Optional[str]) -> Optional[Job]:
+        query = self.client.table("ingestion_jobs").select("*").eq("website_id", website_id).in_(
+            "status", [JobStatus.QUEUED, JobStatus.RUNNING]
+        )
+        if kind:
+            query = query.eq("kind", kind)
+        rows = query.limit(1).execute().data
+        return Job(**rows[0]) if rows else None
+
+    async def save_checkpoint(self, website_id: str, kind: str, data: Dict[str, Any]):
+        await asyncio.to_thread(self._rpc, "save_ingestion_checkpoint", {
+            'p_website_id': website_id, 'p_kind': kind, 'p_data': data
+        })
+
+    async def load_checkpoint(self, website_id: str, kind: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The saved checkpoint, or None if there is none or it is older than `max_age` seconds"""
+        return await asyncio.to_thread(self._rpc, "load_ingestion_checkpoint", {
+            'p_website_id': website_id, 'p_kind': kind, 'p_max_age': max_age
+        })
+
+    async def clear_checkpoint(self, website_id: str, kind: str):
+        await asyncio.to_thread(lambda: self.client.table("ingestion_checkpoints").delete().eq(
+            "website_id", website_id
+        ).eq("kind", kind).execute())
+
+    async def purge(self, older_than: float) -> int:
+        return await asyncio.to_thread(self._rpc, "purge_ingestion_jobs", {'p_older_than': older_than})
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue for the configured backend"""
+    global _job_queue
+    if _job_queue is None:
+        backend = settings.JOB_QUEUE_BACKEND.lower()
+        if backend == "sqlite":
+            _job_queue = SQLiteJobQueue(settings.JOB_QUEUE_PATH)
+        elif backend == "supabase":
+            from app.core.database import supabase_admin
+            _job_queue = SupabaseJobQueue(supabase_admin)
+        else:
+            raise ValueError(f"Unknown job queue backend: {settings.JOB_QUEUE_BACKEND}")
+    return _job_queue
@@ -0,0 +1,60 @@
+from typing import Iterable, List, Dict, Any
+from datetime import datetime
+import logging
+from app.core.database import get_supabase
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FIELDS = ('title', 'etag', 'last_modified', 'lastmod', 'content_hash', 'chunk_count')
+
+# Rows per upsert request
+UPSERT_BATCH_SIZE = 500
+
+
+async def load_page_manifest(website_id: str) -> Dict[str, Dict[str, Any]]:
+    """Load the page manifest of a website, keyed by page URL"""
+    supabase = await get_supabase()
+
+    try:
+        response = supabase.table("website_pages").select("*").eq("website_id", website_id).execute()
+        return {row['url']: row for row in response.data or []}
+    except Exception as e:
+        # A missing manifest only means the next crawl is a full one
+        logger.warning(f"Could not load page manifest for website {website_id}: {e}")
+        return {}
+
+
+async def save_page_manifest(website_id: str, pages: List[Dict[str, Any]]):
+    """Record ETag, Last-Modified, sitemap lastmod, content hash and chunk count of crawled pages"""
+    supabase = await get_supabase()
+    now = datetime.utcnow().isoformat()
+
+    rows = []
+    for page in pages:
+        row = {'website_id': website_id, 'url': page['url'], 'updated_at': now}
+        for field in MANIFEST_FIELDS:
+            row[field] = page.get(field)
+        rows.append(row)
+
+    try:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            supabase.table("website_pages").upsert(
+                rows[start:start + UPSERT_BATCH_SIZE],
+                on_conflict="website_id,url"
+            ).execute()
+    except Exception as e:
+        logger.warning(f"Could not save page manifest for website {website_id}: {e}")
+
+
+async def delete_manifest_pages(website_id: str, urls: Iterable[str]):
+    """Forget pages that no longer exist on the website"""
+    supabase = await get_supabase()
+    urls = list(urls)
+
+    try:
+        for start in range(0, len(urls), UPSERT_BATCH_SIZE):
+            supabase.table("website_pages").delete().eq("website_id", website_id).in_(
+                "url", urls[start:start + UPSERT_BATCH_SIZE]
+            ).execute()
+    except Exception as e:
+        logger.warning(f"Could not delete removed pages from the manifest of website {website_id}: {e}")
@@ -0,0 +1,111 @@
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+def _encoded_size(text: str) -> int:
+    return len(text.encode('utf-8'))
+
+
+class PageStore:
+    """Ordered collection of crawled pages with a cap on the page text held in memory.
+
+    Pages are kept in memory until their content adds up to `memory_cap`
+    bytes (UTF-8 encoded); the content of every page after that is written
+    to an anonymous temporary file and only the rest of the page dict stays
+    in memory. A cap of 0 keeps everything in memory.
+
+    Iterating loads spilled pages back one at a time. Changes made to a page
+    while it is the current item (including a new 'content') are kept, so
+    callers can treat the store like a list of page dicts that they walk
+    through in order. The owner must close() the store to delete the file.
+    """
+
+    def __init__(self, memory_cap: int = 0, spill_dir: Optional[str] = None):
+        self.memory_cap = memory_cap
+        self.spill_dir = spill_dir or None
+        self.memory_bytes = 0
+        self.spilled = 0
+        self._pages: List[Dict[str, Any]] = []
+        # (offset, length) of the spilled content of each page, None if it is in memory
+        self._locations: List[Optional[Tuple[int, int]]] = []
+        self._file: Optional[BinaryIO] = None
+
+    def append(self, page: Dict[str, Any]):
+        content = page.get('content') or ''
+        size = _encoded_size(content)
+        if self.memory_cap <= 0 or self.memory_bytes + size <= self.memory_cap:
+            self.memory_bytes += size
+            self._pages.append(page)
+            self._locations.append(None)
+            return
+
+        page = {key: value for key, value in page.items() if key != 'content'}
+        self._pages.append(page)
+        self._locations.append(self._write(content))
+        self.spilled += 1
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self._pages)):
+            location = self._locations[index]
+            page = self._pages[index]
+            if location is None:
+                before = page.get('content') or ''
+                try:
+                    yield page
+                finally:
+                    current = page.get('content') or ''
+                    if current is not before:
+                        # Keep memory_bytes in step with rewritten content, which retain() subtracts
+                        self.memory_bytes += _encoded_size(current) - _encoded_size(before)
+                continue
+
+            content = self._read(location)
+            page['content'] = content
+            try:
+                yield page
+            finally:
+                current = page.pop('content', '')
+                if current is not content:
+                    self._locations[index] = self._write(current)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Copies of pages with their content loaded"""
+        if isinstance(key, slice):
+            return [self[index] for index in range(*key.indices(len(self)))]
+        page = dict(self._pages[key])
+        location = self._locations[key]
+        if location is not None:
+            page['content'] = self._read(location)
+        return page
+
+    def retain(self, indices: Iterable[int]):
+        """Keep only the pages at `indices` (in that order), freeing the memory of the others"""
+        indices = list(indices)
+        kept = set(indices)
+        for index, page in enumerate(self._pages):
+            if index not in kept and self._locations[index] is None:
+                self.memory_bytes -= _encoded_size(page.get('content') or '')
+        self._pages = [self._pages[index] for index in indices]
+        self._locations = [self._locations[index] for index in indices]
+
+    def close(self):
+        """Delete the spill file; the store must not be read afterwards"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, content: str) -> Tuple[int, int]:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix="crawl-pages-", dir=self.spill_dir)
+        data = content.encode('utf-8')
+        offset = self._file.seek(0, 2)
+        self._file.write(data)
+        return offset, len(data)
+
+    def _read(self, location: Tuple[int, int]) -> str:
+        offset, length = location
+        self._file.seek(offset)
+        return self._file.read(length).decode('utf-8')
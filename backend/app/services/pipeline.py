@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from app.core.config import settings
+from app.services.boilerplate import StreamingBoilerplateFilter
+from app.services.crawl_context import CrawlContext
+from app.services.dedup import NearDuplicateIndex
+from app.services.embeddings import EmbeddingService, embedding_service
+from app.services.scheduler import LANE_NORMAL, FairShareScheduler
+from app.services.scraper import WebsiteScraper, scraper
+
+logger = logging.getLogger(__name__)
+
+# Put on a queue once per consumer to tell it the upstream stage has finished
+_DONE = object()
+
+# Embedding requests in flight across every pipeline in this process, shared
+# fairly between tenants in proportion to the chunks they embed
+embed_slots = FairShareScheduler(settings.EMBEDDING_GLOBAL_CONCURRENCY,
+                                 quantum=max(1, settings.PIPELINE_EMBED_BATCH_SIZE))
+
+
+class PipelineStats:
+    """Counters for one pipeline run"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.first_chunk_at: Optional[float] = None
+        self.pages_received = 0
+        self.pages_completed = 0
+        self.pages_unchanged = 0
+        self.pages_near_duplicate = 0
+        self.boilerplate_chars_removed = 0
+        self.chunks_embedded = 0
+        self.chunks_upserted = 0
+        self.embed_batches = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.monotonic()
+        first_chunk = self.first_chunk_at - self.started_at if self.first_chunk_at else None
+        return {
+            'pages_received': self.pages_received,
+            'pages_completed': self.pages_completed,
+            'pages_unchanged': self.pages_unchanged,
+            'pages_near_duplicate': self.pages_near_duplicate,
+            'boilerplate_chars_removed': self.boilerplate_chars_removed,
+            'chunks_embedded': self.chunks_embedded,
+            'chunks_upserted': self.chunks_upserted,
+            'embed_batches': self.embed_batches,
+            'first_chunk_seconds': round(first_chunk, 3) if first_chunk is not None else None,
+            'duration_seconds': round(end - self.started_at, 3)
+        }
+
+
+class IngestionPipeline:
+    """Scrape a website and index it as a streaming, staged pipeline.
+
+    fetch + extract (the crawl workers and the extraction process pool) ->
+    page processing (boilerplate, near-duplicate pages, chunking) ->
+    embed workers -> upsert workers.
+
+    Stages are connected by bounded queues, so a slow stage makes the ones
+    before it wait instead of buffering the whole site in memory, and the
+    first chunks become searchable while the crawl is still running.
+
+    With `on_checkpoint`, the pipeline periodically hands over a snapshot of
+    its progress (see checkpoint()); passing that snapshot back as
+    `checkpoint` resumes the run without refetching or re-embedding the pages
+    that were already indexed.
+
+    Fetches and embedding calls are drawn from process-wide fair-share
+    schedulers under `tenant` (the website's domain by default), starting in
+    scheduling `lane`.
+    """
+
+    def __init__(self, website_id: str, base_url: str, manifest: Optional[Dict[str, Dict]] = None,
+                 crawler: Optional[WebsiteScraper] = None, embeddings: Optional[EmbeddingService] = None,
+                 on_crawl_finished: Optional[Callable[[CrawlContext], Awaitable[None]]] = None,
+                 checkpoint: Optional[Dict[str, Any]] = None,
+                 on_checkpoint: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+                 tenant: Optional[str] = None, lane: int = LANE_NORMAL):
+        self.website_id = website_id
+        self.base_url = base_url
+        self.crawler = crawler or scraper
+        self.embeddings = embeddings or embedding_service
+        self.on_crawl_finished = on_crawl_finished
+        self.on_checkpoint = on_checkpoint
+        self.checkpoint_interval = settings.PIPELINE_CHECKPOINT_INTERVAL
+        self.embed_batch_size = max(1, settings.PIPELINE_EMBED_BATCH_SIZE)
+        self.embed_concurrency = max(1, settings.PIPELINE_EMBED_CONCURRENCY)
+        self.upsert_concurrency = max(1, settings.PIPELINE_UPSERT_CONCURRENCY)
+
+        self.stats = PipelineStats()
+        self.crawl = self.crawler.new_context(base_url, manifest)
+        self.crawl.website_id = website_id
+        self.crawl.tenant = tenant or self.crawl.base_domain
+        self.crawl.base_lane = lane
+        # Manifest rows (pages without their content) of every indexed or unchanged page
+        self.pages: List[Dict[str, Any]] = []
+        # Pages dropped as near-duplicates or for holding nothing but boilerplate
+        self.dropped_urls: Set[str] = set()
+        self.total_chunks = 0
+
+        self._page_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.PIPELINE_PAGE_QUEUE_SIZE))
+        self._chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.PIPELINE_CHUNK_QUEUE_SIZE))
+        self._upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.PIPELINE_UPSERT_QUEUE_SIZE))
+        # url -> [page, chunks still waiting to be stored]
+        self._pending: Dict[str, List[Any]] = {}
+        self._near_duplicate_pages = NearDuplicateIndex(settings.NEAR_DUPLICATE_MAX_DISTANCE)
+        self._near_duplicate_chunks = NearDuplicateIndex(settings.NEAR_DUPLICATE_MAX_DISTANCE)
+
+        if checkpoint:
+            self._restore(checkpoint)
+
+    async def run(self) -> int:
+        """Run every stage to completion and return the website's total chunk count"""
+        await self.embeddings.ensure_collection(self.website_id)
+
+        tasks = [
+            asyncio.create_task(self._crawl_stage()),
+            asyncio.create_task(self._page_stage()),
+            asyncio.create_task(self._embed_stage()),
+            *(asyncio.create_task(self._upsert_worker()) for _ in range(self.upsert_concurrency))
+        ]
+        checkpoints = asyncio.create_task(self._checkpoint_loop()) if self.on_checkpoint else None
+        try:
+            # Stop everything as soon as one stage fails
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        except BaseException:
+            # Keep what was indexed so far for the next attempt (also on cancellation)
+            await self._save_checkpoint()
+            raise
+        finally:
+            if checkpoints is not None:
+                checkpoints.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.stats.finished_at = time.monotonic()
+        self.crawl.stats.pages_near_duplicate = self.stats.pages_near_duplicate
+        self.crawl.stats.boilerplate_chars_removed = self.stats.boilerplate_chars_removed
+        self.crawl.stats.finish()
+        logger.info(f"Crawl of {self.base_url} finished: {self.crawl.stats.to_dict()}")
+        logger.info(
+            f"Indexed {self.total_chunks} chunks for website {self.website_id} "
+            f"({self._near_duplicate_chunks.pruned} near-duplicate chunks pruned): {self.stats.to_dict()}"
+        )
+        return self.total_chunks
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Snapshot of the run: crawl progress and indexed pages.
+
+        Resuming is page-granular. Pages still moving through the pipeline are
+        not in `pages`; their URLs stay in the crawl frontier so a resumed run
+        fetches and chunks them again, and the chunks they had already stored
+        are overwritten under the same point IDs.
+        """
+        return {
+            'crawl': self.crawl.checkpoint(),
+            'pages': list(self.pages),
+            'dropped': sorted(self.dropped_urls)
+        }
+
+    def dropped_manifest_urls(self) -> Set[str]:
+        """Previously indexed pages that were dropped this run, whose old chunks must be deleted"""
+        return self.dropped_urls & set(self.crawl.manifest)
+
+    def _restore(self, checkpoint: Dict[str, Any]):
+        self.pages = list(checkpoint.get('pages', []))
+        self.dropped_urls = set(checkpoint.get('dropped', []))
+        self.total_chunks = sum(page.get('chunk_count') or 0 for page in self.pages)
+        self.crawl.restore(checkpoint.get('crawl', {}), completed_pages=len(self.pages))
+        logger.info(
+            f"Resuming ingestion of website {self.website_id} from a checkpoint: "
+            f"{len(self.pages)} pages and {self.total_chunks} chunks already indexed"
+        )
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            await self._save_checkpoint()
+
+    async def _save_checkpoint(self):
+        if self.on_checkpoint is None:
+            return
+        try:
+            await self.on_checkpoint(self.checkpoint())
+        except Exception as e:
+            logger.warning(f"Failed to save checkpoint for website {self.website_id}: {e}")
+
+    async def _crawl_stage(self):
+        try:
+            await self.crawler.stream_website(self.crawl, self._page_queue)
+        finally:
+            await self._page_queue.put(_DONE)
+
+        if self.on_crawl_finished is not None:
+            await self.on_crawl_finished(self.crawl)
+
+    async def _page_stage(self):
+        """Strip boilerplate, drop duplicate pages and chunk the rest, one page at a time"""
+        boilerplate = None
+        if settings.BOILERPLATE_STRIPPING:
+            boilerplate = StreamingBoilerplateFilter(settings.BOILERPLATE_SAMPLE_PAGES,
+                                                     settings.BOILERPLATE_MIN_PAGE_FRACTION,
+                                                     settings.BOILERPLATE_MIN_PAGES,
+                                                     settings.BOILERPLATE_SAMPLE_WAIT_SECONDS)
+        seen_urls = set()
+
+        while True:
+            try:
+                page = await asyncio.wait_for(self._page_queue.get(),
+                                              boilerplate.wait_remaining() if boilerplate is not None else None)
+            except asyncio.TimeoutError:
+                # Pages arrive slowly; start chunking with the boilerplate learned so far
+                for ready_page in boilerplate.flush():
+                    await self._process_page(ready_page)
+                continue
+            if page is _DONE:
+                break
+            self.stats.pages_received += 1
+            if page['url'] in seen_urls:
+                self.crawl.release(page['url'])
+                continue
+            seen_urls.add(page['url'])
+
+            ready = boilerplate.push(page) if boilerplate is not None else [page]
+            for ready_page in ready:
+                await self._process_page(ready_page)
+
+        if boilerplate is not None:
+            for ready_page in boilerplate.flush():
+                await self._process_page(ready_page)
+            self.stats.boilerplate_chars_removed = boilerplate.chars_removed
+
+        for _ in range(self.embed_concurrency):
+            await self._chunk_queue.put(_DONE)
+
+    async def _process_page(self, page: Dict[str, Any]):
+        # Unchanged pages keep the chunks indexed by a previous crawl
+        if page.get('unchanged'):
+            self.stats.pages_unchanged += 1
+            self.total_chunks += page.get('chunk_count') or 0
+            self._complete(page)
+            return
+
+        # Pages that held nothing but boilerplate
+        if not page['content'].strip():
+            self.dropped_urls.add(page['url'])
+            self.crawl.release(page['url'])
+            return
+
+        # Print views, tracking-param variants and repeated listings share almost all their text
+        if settings.NEAR_DUPLICATE_DETECTION and self._near_duplicate_pages.is_duplicate(page['content']):
+            self.stats.pages_near_duplicate += 1
+            self.dropped_urls.add(page['url'])
+            self.crawl.release(page['url'])
+            return
+
+        chunks = self.embeddings.chunk_page(page, self._near_duplicate_chunks)
+        if not chunks:
+            await self.embeddings.finish_page(self.website_id, page, 0)
+            self._complete(page)
+            return
+
+        self._pending[page['url']] = [page, len(chunks)]
+        page['content'] = ''
+        for chunk in chunks:
+            await self._chunk_queue.put(chunk)
+
+    async def _embed_stage(self):
+        workers = [asyncio.create_task(self._embed_worker()) for _ in range(self.embed_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        for _ in range(self.upsert_concurrency):
+            await self._upsert_queue.put(_DONE)
+
+    async def _embed_worker(self):
+        """Embed chunks in batches that may span pages"""
+        finished = False
+        while not finished:
+            batch = []
+            item = await self._chunk_queue.get()
+            while item is not _DONE:
+                batch.append(item)
+                if len(batch) >= self.embed_batch_size or self._chunk_queue.empty():
+                    break
+                item = self._chunk_queue.get_nowait()
+            finished = item is _DONE
+
+            if batch:
+                async with embed_slots.slot(self.crawl.tenant, cost=len(batch), lane=self.crawl.lane):
+                    vectors = await self.embeddings.embed_texts([chunk['text'] for chunk in batch])
+                self.stats.embed_batches += 1
+                self.stats.chunks_embedded += len(batch)
+                await self._upsert_queue.put((batch, vectors))
+
+    async def _upsert_worker(self):
+        """Upsert embedded chunks, merging queued embed batches up to the vector store's batch size"""
+        finished = False
+        while not finished:
+            chunks, vectors = [], []
+            item = await self._upsert_queue.get()
+            while item is not _DONE:
+                chunks.extend(item[0])
+                vectors.extend(item[1])
+                if len(chunks) >= self.embeddings.vector_store.batch_size or self._upsert_queue.empty():
+                    break
+                item = self._upsert_queue.get_nowait()
+            finished = item is _DONE
+            if not chunks:
+                continue
+
+            stored = await self.embeddings.upsert_chunks(self.website_id, chunks, vectors)
+            self.stats.chunks_upserted += stored
+            self.total_chunks += stored
+            if self.stats.first_chunk_at is None:
+                self.stats.first_chunk_at = time.monotonic()
+
+            for chunk in chunks:
+                entry = self._pending[chunk['url']]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._pending[chunk['url']]
+                    page = entry[0]
+                    await self.embeddings.finish_page(self.website_id, page, chunk['total_chunks'])
+                    self._complete(page)
+
+    def _complete(self, page: Dict[str, Any]):
+        self.stats.pages_completed += 1
+        self.pages.append({key: value for key, value in page.items() if key != 'content'})
+        self.crawl.release(page['url'])
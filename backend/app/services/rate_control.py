@@ -0,0 +1,286 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Responses that mean the server wants us to slow down
+OVERLOAD_STATUSES = {429, 503}
+
+
+def jittered_backoff(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff for the `attempt`-th retry with "equal jitter".
+
+    Half the delay is fixed and half random, so clients that failed together
+    do not all retry at the same moment.
+    """
+    delay = min(cap, base * (2 ** max(0, attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Request rate limit: `rate` requests per second with bursts of up to `burst`.
+
+    A rate of 0 disables the limit. pause() stops all requests for a while,
+    e.g. for a Retry-After, after which the bucket restarts empty. Waiters are
+    served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def set_rate(self, rate: float, burst: float = 1.0):
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = min(self._tokens, self.burst)
+
+    def pause(self, seconds: float):
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    return
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit tuned by additive increase / multiplicative decrease.
+
+    Every healthy response raises the limit by 1/limit (about one slot per
+    round of requests). An overload signal (429/503, a timeout, or a latency
+    average above `latency_tolerance` times the best latency seen) cuts it by
+    `decrease_factor`, at most once per round so a burst of failures from
+    the same window counts as one signal.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: Optional[int] = None,
+                 latency_tolerance: float = 3.0, decrease_factor: float = 0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.best_latency: Optional[float] = None
+        self._responses_since_decrease = int(self.limit)
+        self._changed = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+    def on_success(self, latency: float):
+        self._responses_since_decrease += 1
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.best_latency = latency if self.best_latency is None else min(self.best_latency, latency)
+
+        # Ignore latency noise on very fast hosts
+        if self.latency > max(self.best_latency, 0.1) * self.latency_tolerance:
+            self.on_overload()
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_overload(self):
+        if self._responses_since_decrease < int(self.limit):
+            return
+        self._responses_since_decrease = 0
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+class HostRateController:
+    """Politeness for one host: a request rate (Crawl-delay) and an adaptive concurrency limit"""
+
+    def __init__(self, host: str, rate: float, burst: float, initial_concurrency: int,
+                 max_concurrency: int, latency_tolerance: float):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(initial_concurrency, maximum=max_concurrency,
+                                                  latency_tolerance=latency_tolerance)
+        self.throttled = 0
+
+    @asynccontextmanager
+    async def request(self):
+        """Hold one of the host's request slots; call record() with the outcome inside the block"""
+        await self.limiter.acquire()
+        try:
+            await self.bucket.acquire()
+            yield
+        finally:
+            await self.limiter.release()
+
+    def record(self, status_code: int, latency: float, retry_after: Optional[str] = None,
+               backoff: float = 0.0, max_delay: float = float('inf')) -> Optional[float]:
+        """Feed a response into the controller.
+
+        For 429/503 the host is paused and the pause in seconds is returned (the
+        request may be retried after it); otherwise returns None. `backoff` is
+        the pause used when the server sends no Retry-After, and `max_delay`
+        bounds the pause either way.
+        """
+        if status_code not in OVERLOAD_STATUSES:
+            self.limiter.on_success(latency)
+            return None
+
+        self.throttled += 1
+        self.limiter.on_overload()
+        delay = parse_retry_after(retry_after)
+        delay = min(max_delay, backoff if delay is None else delay)
+        self.bucket.pause(delay)
+        return delay
+
+    def record_timeout(self):
+        self.limiter.on_overload()
+
+
+class HostRateLimits:
+    """Process-wide HostRateControllers, one per host, shared by every crawl of that host.
+
+    Up to `max_hosts` idle controllers are kept (least recently used evicted),
+    so learned limits survive between crawls of the same site.
+    """
+
+    def __init__(self, default_rate: float, default_burst: float, initial_concurrency: int,
+                 max_concurrency: int, latency_tolerance: float, max_hosts: int = 1024):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.max_hosts = max_hosts
+        self._hosts: "OrderedDict[str, HostRateController]" = OrderedDict()
+
+    def get(self, host: str, crawl_delay: float = 0.0) -> HostRateController:
+        """Controller for `host`; a positive Crawl-delay sets its rate to one request per delay"""
+        if crawl_delay > 0:
+            rate, burst = 1 / crawl_delay, 1.0
+        else:
+            rate, burst = self.default_rate, self.default_burst
+
+        controller = self._hosts.get(host)
+        if controller is None:
+            controller = HostRateController(host, rate, burst, self.initial_concurrency,
+                                            self.max_concurrency, self.latency_tolerance)
+            self._hosts[host] = controller
+            self._evict()
+        else:
+            self._hosts.move_to_end(host)
+            if controller.bucket.rate != rate or controller.bucket.burst != burst:
+                controller.bucket.set_rate(rate, burst)
+        return controller
+
+    def _evict(self):
+        for host in list(self._hosts):
+            if len(self._hosts) <= self.max_hosts:
+                return
+            if self._hosts[host].limiter.in_flight == 0:
+                del self._hosts[host]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while instead of piling on retries.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    check() raises CircuitOpenError for `reset_timeout` seconds. Then one
+    trial call is let through (half-open): its success closes the circuit,
+    its failure opens it again. A trial that never reports back (e.g. it was
+    cancelled) is replaced by a new one after another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go ahead now"""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"{self.name} circuit is open; retrying in {remaining:.0f}s")
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        now = time.monotonic()
+        if self._trial_in_flight and now - self._trial_started_at < self.reset_timeout:
+            raise CircuitOpenError(f"{self.name} circuit is half-open and waiting for a trial call")
+        self._trial_in_flight = True
+        self._trial_started_at = now
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
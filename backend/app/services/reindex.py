@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.services.archive import CrawlArchive
+from app.services.crawl_context import CrawlContext
+from app.services.extraction import ExtractionPool
+from app.services.scraper import content_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Archived pages read from disk (and extracted concurrently) at a time
+REPLAY_BATCH_SIZE = 32
+
+
+class ArchiveReplay:
+    """Page source that replays a website from the crawl archive instead of the network.
+
+    It stands in for the scraper in an IngestionPipeline: HTML is extracted
+    again with the current extraction code, and every page is handed on as
+    changed, so chunking and embedding run again with the current settings.
+    When the website has a page manifest, only the pages of its latest crawl
+    are replayed.
+    """
+
+    def __init__(self, archive: CrawlArchive, extraction_pool: ExtractionPool, website_id: str):
+        self.archive = archive
+        self.extraction_pool = extraction_pool
+        self.website_id = website_id
+
+    def new_context(self, base_url: str, manifest: Optional[Dict[str, Dict]] = None) -> CrawlContext:
+        return CrawlContext(base_url, settings.MAX_PAGES_TO_SCRAPE, manifest=manifest)
+
+    async def stream_website(self, ctx: CrawlContext, page_sink: asyncio.Queue) -> CrawlContext:
+        ctx.page_sink = page_sink
+        after = ""
+        while not ctx.budget_exhausted:
+            batch = await asyncio.to_thread(self.archive.read_batch, self.website_id, after, REPLAY_BATCH_SIZE)
+            if not batch:
+                break
+            after = batch[-1]['url']
+            records = [record for record in batch if not ctx.manifest or record['url'] in ctx.manifest]
+            pages = await asyncio.gather(*(self._replay_page(ctx, record) for record in records))
+            for page in pages:
+                if page is not None:
+                    ctx.mark_visited(page['url'])
+                    ctx.open_urls[page['url']] = (page['url'], 0)
+                    await ctx.add_page(page)
+
+        missing = len(set(ctx.manifest) - ctx.visited_urls) if ctx.manifest else 0
+        if missing:
+            logger.warning(f"{missing} pages of website {self.website_id} are not in the crawl archive "
+                           f"and were not re-indexed")
+        return ctx
+
+    async def _replay_page(self, ctx: CrawlContext, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        title, content = record['title'], record['text']
+        if record['html'] is not None:
+            extracted = await self.extraction_pool.extract(record['html'])
+            title, content = extracted['title'], extracted['text']
+
+        ctx.stats.pages_fetched += 1
+        if not content or len(content.strip()) <= 100:
+            return None
+
+        previous = ctx.manifest.get(record['url']) or {}
+        return {
+            'url': record['url'],
+            'title': title,
+            'content': content,
+            'etag': record['etag'],
+            'last_modified': record['last_modified'],
+            'lastmod': previous.get('lastmod'),
+            'content_hash': content_fingerprint(content),
+            # Lets the embedding step delete chunks the new chunking no longer produces
+            'previous_chunk_count': previous.get('chunk_count') or 0
+        }
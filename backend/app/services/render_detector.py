@@ -0,0 +1,37 @@
+import re
+
+# Visible text length above which a statically fetched page is never re-rendered
+SUBSTANTIAL_TEXT_LENGTH = 500
+
+# Visible text length below which a page with scripts is treated as a JS shell
+MIN_TEXT_LENGTH = 100
+
+# Empty mount points left by client-side frameworks (React, Vue, Next, Nuxt, Gatsby, Angular, Svelte)
+_EMPTY_SPA_ROOT = re.compile(
+    r'<(?:div|main|section)[^>]+id=["\'](?:root|app|__next|__nuxt|___gatsby|svelte|main-app)["\'][^>]*>\s*</(?:div|main|section)>',
+    re.IGNORECASE
+)
+_ANGULAR_ROOT = re.compile(r'<app-root[^>]*>\s*</app-root>', re.IGNORECASE)
+_NOSCRIPT_WARNING = re.compile(
+    r'<noscript[^>]*>[^<]*(?:enable javascript|javascript (?:is )?(?:required|disabled)|requires javascript|need javascript)',
+    re.IGNORECASE
+)
+_SCRIPT_TAG = re.compile(r'<script\b', re.IGNORECASE)
+
+
+def needs_rendering(html: str, text: str) -> bool:
+    """Decide whether a statically fetched page is a JS shell that needs a browser.
+
+    `html` is the raw response body and `text` the visible text extracted from
+    it. Pages with plenty of static text are never escalated; otherwise an
+    empty SPA mount point, a "please enable JavaScript" notice, or near-empty
+    text on a page that loads scripts marks the page for rendering.
+    """
+    text_length = len(text.strip()) if text else 0
+    if text_length >= SUBSTANTIAL_TEXT_LENGTH:
+        return False
+
+    if _EMPTY_SPA_ROOT.search(html) or _ANGULAR_ROOT.search(html) or _NOSCRIPT_WARNING.search(html):
+        return True
+
+    return text_length < MIN_TEXT_LENGTH and _SCRIPT_TAG.search(html) is not None
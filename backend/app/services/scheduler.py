@@ -0,0 +1,140 @@
+import asyncio
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+# Scheduling lanes; waiters in a higher lane are always served first
+LANE_NORMAL = 0
+LANE_PRIORITY = 1
+
+
+class _Waiter:
+    __slots__ = ('cost', 'future')
+
+    def __init__(self, cost: float, future: asyncio.Future):
+        self.cost = cost
+        self.future = future
+
+
+class FairShareScheduler:
+    """Hands out a fixed number of work slots fairly across tenants.
+
+    Waiting tenants are served by deficit round robin: each visit adds
+    `quantum` to a tenant's deficit and the tenant is served while its deficit
+    covers the cost of its next request. A tenant with thousands of queued
+    requests therefore gets the same share as one with a single request.
+    Lanes are strict priorities, and `per_tenant_cap` bounds the slots any one
+    tenant may hold at once.
+    """
+
+    def __init__(self, capacity: int, per_tenant_cap: Optional[int] = None, quantum: float = 1.0):
+        self.capacity = max(1, capacity)
+        self.per_tenant_cap = per_tenant_cap
+        self.quantum = quantum
+        self.in_use = 0
+        self._tenant_in_use: Counter = Counter()
+        self._deficits: Dict[str, float] = {}
+        # lane -> tenants in round-robin order -> their waiting requests
+        self._lanes: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {}
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, cost: float = 1.0, lane: int = LANE_NORMAL):
+        await self.acquire(tenant, cost, lane)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    async def acquire(self, tenant: str, cost: float = 1.0, lane: int = LANE_NORMAL):
+        if not self._lanes and self.in_use < self.capacity and self._under_cap(tenant):
+            self._grant(tenant)
+            return
+
+        waiter = _Waiter(cost, asyncio.get_running_loop().create_future())
+        self._lanes.setdefault(lane, OrderedDict()).setdefault(tenant, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just before the cancellation arrived
+                self.release(tenant)
+            else:
+                self._remove(lane, tenant, waiter)
+            raise
+
+    def release(self, tenant: str):
+        self.in_use -= 1
+        self._tenant_in_use[tenant] -= 1
+        if self._tenant_in_use[tenant] <= 0:
+            del self._tenant_in_use[tenant]
+        self._dispatch()
+
+    def waiting(self) -> int:
+        return sum(len(queue) for tenants in self._lanes.values() for queue in tenants.values())
+
+    def _under_cap(self, tenant: str) -> bool:
+        return self.per_tenant_cap is None or self._tenant_in_use[tenant] < self.per_tenant_cap
+
+    def _grant(self, tenant: str):
+        self.in_use += 1
+        self._tenant_in_use[tenant] += 1
+
+    def _dispatch(self):
+        while self.in_use < self.capacity:
+            selected = self._next_waiter()
+            if selected is None:
+                return
+            tenant, waiter = selected
+            self._grant(tenant)
+            waiter.future.set_result(None)
+
+    def _next_waiter(self) -> Optional[Tuple[str, _Waiter]]:
+        for lane in sorted(self._lanes, reverse=True):
+            tenants = self._lanes[lane]
+            if not any(self._under_cap(tenant) for tenant in tenants):
+                continue
+
+            while True:
+                tenant, queue = next(iter(tenants.items()))
+                if not self._under_cap(tenant):
+                    tenants.move_to_end(tenant)
+                    continue
+
+                waiter = queue[0]
+                deficit = self._deficits.get(tenant, 0.0)
+                if deficit < waiter.cost:
+                    deficit += self.quantum
+                    self._deficits[tenant] = deficit
+                    if deficit < waiter.cost:
+                        tenants.move_to_end(tenant)
+                        continue
+
+                queue.popleft()
+                self._deficits[tenant] = deficit - waiter.cost
+                if not queue:
+                    # Idle tenants do not bank credit
+                    del tenants[tenant]
+                    self._deficits.pop(tenant, None)
+                    if not tenants:
+                        del self._lanes[lane]
+                elif self._deficits[tenant] < queue[0].cost:
+                    tenants.move_to_end(tenant)
+                return tenant, waiter
+        return None
+
+    def _remove(self, lane: int, tenant: str, waiter: _Waiter):
+        tenants = self._lanes.get(lane)
+        if not tenants or tenant not in tenants:
+            return
+        queue = tenants[tenant]
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        if not queue:
+            del tenants[tenant]
+            self._deficits.pop(tenant, None)
+            if not tenants:
+                del self._lanes[lane]
+        self._dispatch()
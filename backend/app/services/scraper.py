@@ -1,239 +1,466 @@
 import asyncio
-import requests
-from bs4 import BeautifulSoup
+import hashlib
+import time
+import httpx
 from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Set
+from typing import List, Dict, Optional
 import logging
-from playwright.async_api import async_playwright
-import re
 from app.core.config import settings
+from app.services.crawl_context import CrawlContext
+from app.services.browser_pool import browser_pool
+from app.services.frontier import normalize_url
+from app.services.sitemap import fetch_robots, iter_sitemap_urls, default_sitemap_url
+from app.services.extraction import ExtractionPool
+from app.services.dedup import NearDuplicateIndex
+from app.services.boilerplate import strip_boilerplate
+from app.services.scheduler import FairShareScheduler
+from app.services.rate_control import HostRateLimits, jittered_backoff
+from app.services.archive import get_crawl_archive
+from app.services.page_store import PageStore
 
 logger = logging.getLogger(__name__)
 
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js',
+    '.zip', '.gz', '.mp3', '.mp4', '.avi', '.mov', '.woff', '.woff2', '.ttf', '.xml'
+)
+
+# Responses that mean a page was removed, not that the fetch failed
+GONE_STATUSES = (404, 410)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
 class WebsiteScraper:
+    """Crawler shared by all scrape jobs.
+
+    The scraper itself only holds shared resources (the pooled HTTP client and
+    the global fetch limit); everything that belongs to a single crawl lives in
+    a CrawlContext, so many websites can be scraped at the same time.
+    """
+
     def __init__(self):
-        self.visited_urls: Set[str] = set()
         self.max_pages = settings.MAX_PAGES_TO_SCRAPE
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-
-    async def scrape_website(self, base_url: str) -> List[Dict[str, str]]:
-        """Main method to scrape a website"""
-        self.visited_urls.clear()
-        base_domain = urlparse(base_url).netloc
+        self.concurrency = max(1, settings.SCRAPER_CONCURRENCY)
+        self.extraction_pool = ExtractionPool(settings.EXTRACTION_WORKERS, settings.HTML_EXTRACTION_BACKEND)
+        self._client: Optional[httpx.AsyncClient] = None
+        # Caps in-flight fetches across every crawl running in this process and
+        # shares them fairly, so one large site cannot starve the others
+        self._fetch_slots = FairShareScheduler(settings.SCRAPER_GLOBAL_CONCURRENCY,
+                                               per_tenant_cap=settings.SCRAPER_TENANT_CONCURRENCY or None)
+        # Per-host request rate and adaptive concurrency, shared by all crawls of a host
+        self._hosts = HostRateLimits(settings.SCRAPER_HOST_RATE, settings.SCRAPER_HOST_BURST,
+                                     self.concurrency, settings.SCRAPER_HOST_MAX_CONCURRENCY,
+                                     settings.SCRAPER_LATENCY_TOLERANCE)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared pooled HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={'User-Agent': USER_AGENT},
+                timeout=httpx.Timeout(settings.SCRAPER_REQUEST_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SCRAPER_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.SCRAPER_KEEPALIVE_EXPIRY
+                ),
+                follow_redirects=True
+            )
+        return self._client
+
+    async def close(self):
+        """Close the shared HTTP client and stop the extraction workers"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self.extraction_pool.close()
+
+    async def scrape_website(self, base_url: str, manifest: Optional[Dict[str, Dict]] = None) -> PageStore:
+        """Main method to scrape a website.
+
+        `manifest` maps page URLs from a previous crawl to their ETag,
+        Last-Modified, content hash and chunk count. Known pages are revisited
+        with conditional requests and come back flagged `unchanged` (without
+        content) when neither the response nor the extracted text changed.
+
+        The pages come back in a PageStore: once CRAWL_MEMORY_CAP_MB of page
+        text has been collected, further content is spilled to a temporary file
+        and read back as the store is iterated. The caller must close() the
+        store when done with it.
+        """
+        ctx = self.new_context(base_url, manifest)
         
         try:
-            # First try static scraping
-            pages = await self._scrape_static(base_url, base_domain)
-            
-            # If static scraping didn't get enough content, try dynamic scraping
-            if len(pages) < 5:
-                logger.info(f"Static scraping got {len(pages)} pages, trying dynamic scraping")
-                try:
-                    dynamic_pages = await self._scrape_dynamic(base_url, base_domain)
-                    pages.extend(dynamic_pages)
-                except Exception as e:
-                    logger.warning(f"Dynamic scraping failed, continuing with static content: {e}")
-                    logger.info("This is normal if Playwright browsers are not installed")
+            await self._run(ctx)
             
+            # Strip text repeated across the site, keeping one canonical copy
+            if settings.BOILERPLATE_STRIPPING:
+                stripper = strip_boilerplate(ctx.pages, settings.BOILERPLATE_MIN_PAGE_FRACTION,
+                                             settings.BOILERPLATE_MIN_PAGES)
+                ctx.stats.boilerplate_chars_removed = stripper.chars_removed
+
             # Remove duplicates and limit pages
-            unique_pages = self._deduplicate_pages(pages)
-            return unique_pages[:self.max_pages]
+            ctx.pages.retain(self._deduplicate_pages(ctx)[:self.max_pages])
+
+            ctx.stats.pages_spilled = ctx.pages.spilled
+            ctx.stats.finish()
+            logger.info(f"Crawl of {base_url} finished: {ctx.stats.to_dict()}")
+            return ctx.pages
             
         except Exception as e:
             logger.error(f"Error scraping website {base_url}: {e}")
+            ctx.pages.close()
+            raise
+        except asyncio.CancelledError:
+            ctx.pages.close()
             raise
 
-    async def _scrape_static(self, base_url: str, base_domain: str) -> List[Dict[str, str]]:
-        """Scrape static content using BeautifulSoup"""
-        pages = []
-        urls_to_visit = [base_url]
-        
-        while urls_to_visit and len(pages) < self.max_pages:
-            url = urls_to_visit.pop(0)
-            
-            if url in self.visited_urls:
-                continue
-                
-            self.visited_urls.add(url)
-            
-            try:
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract text content
-                content = self._extract_text_content(soup)
-                if content and len(content.strip()) > 100:  # Only add pages with substantial content
-                    pages.append({
-                        'url': url,
-                        'title': self._extract_title(soup),
-                        'content': content
-                    })
-                
-                # Find more links to visit
-                if len(pages) < self.max_pages:
-                    new_urls = self._extract_links(soup, url, base_domain)
-                    urls_to_visit.extend(new_urls)
-                    
-            except Exception as e:
-                logger.warning(f"Failed to scrape {url}: {e}")
-                continue
-        
-        return pages
+    async def stream_website(self, ctx: CrawlContext, page_sink: asyncio.Queue) -> CrawlContext:
+        """Crawl a website, putting each kept page on `page_sink` as soon as it is scraped.
 
-    async def _scrape_dynamic(self, base_url: str, base_domain: str) -> List[Dict[str, str]]:
-        """Scrape dynamic content using Playwright"""
-        pages = []
-        
+        Pages are not collected, stripped or deduplicated here; that is left to
+        the consumer, which must release() each page's URL once it is done with
+        it. The bounded sink provides backpressure: when it is full the fetch
+        workers wait.
+        """
+        ctx.page_sink = page_sink
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-                
-                # Set viewport and user agent
-                await page.set_viewport_size({"width": 1280, "height": 720})
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                })
-                
-                # Visit the main page
-                await page.goto(base_url, wait_until='networkidle', timeout=30000)
-                
-                # Wait for content to load
-                await page.wait_for_timeout(2000)
-                
-                # Extract content from current page
-                content = await self._extract_dynamic_content(page)
-                if content:
-                    pages.append({
-                        'url': base_url,
-                        'title': await page.title(),
-                        'content': content
-                    })
-                
-                # Find and visit additional pages
-                links = await page.query_selector_all('a[href]')
-                urls_to_visit = []
-                
-                for link in links[:20]:  # Limit to first 20 links
-                    href = await link.get_attribute('href')
-                    if href:
-                        full_url = urljoin(base_url, href)
-                        if (urlparse(full_url).netloc == base_domain and 
-                            full_url not in self.visited_urls and
-                            len(pages) < self.max_pages):
-                            urls_to_visit.append(full_url)
-                
-                # Visit additional pages
-                for url in urls_to_visit[:10]:  # Limit to 10 additional pages
-                    try:
-                        await page.goto(url, wait_until='networkidle', timeout=15000)
-                        await page.wait_for_timeout(1000)
-                        
-                        content = await self._extract_dynamic_content(page)
-                        if content and len(content.strip()) > 100:
-                            pages.append({
-                                'url': url,
-                                'title': await page.title(),
-                                'content': content
-                            })
-                    except Exception as e:
-                        logger.warning(f"Failed to scrape dynamic page {url}: {e}")
-                        continue
-                
-                await browser.close()
-                
+            await self._run(ctx)
+            return ctx
         except Exception as e:
-            logger.error(f"Dynamic scraping failed: {e}")
-        
-        return pages
+            logger.error(f"Error scraping website {ctx.base_url}: {e}")
+            raise
 
-    def _extract_text_content(self, soup: BeautifulSoup) -> str:
-        """Extract meaningful text content from BeautifulSoup object"""
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text()
-        
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text
+    def new_context(self, base_url: str, manifest: Optional[Dict[str, Dict]] = None) -> CrawlContext:
+        """Create the state for one crawl of `base_url`"""
+        return CrawlContext(
+            base_url,
+            self.max_pages,
+            max_frontier_size=settings.SCRAPER_MAX_FRONTIER_SIZE,
+            max_depth=settings.SCRAPER_MAX_DEPTH,
+            manifest=manifest,
+            memory_cap=settings.CRAWL_MEMORY_CAP_MB * 1024 * 1024,
+            spill_dir=settings.CRAWL_SPILL_DIR or None
+        )
+
+    async def _run(self, ctx: CrawlContext):
+        """Discover and crawl the site into the context"""
+        # Seed the frontier from robots.txt and sitemaps before following links
+        ctx.frontier.add(ctx.base_url, depth=0)
+        await self._discover(ctx)
+
+        # Static fetch for every page; only JS-shell pages are escalated to the browser pool
+        await self._crawl(ctx)
+
+    async def scrape_websites(self, base_urls: List[str]) -> Dict[str, PageStore]:
+        """Scrape several websites in parallel under the shared global fetch limit.
+
+        A website whose crawl failed gets an empty store. The caller must
+        close() every PageStore returned.
+        """
+        results = await asyncio.gather(
+            *(self.scrape_website(url) for url in base_urls),
+            return_exceptions=True
+        )
+
+        scraped = {}
+        for url, result in zip(base_urls, results):
+            if isinstance(result, Exception):
+                logger.error(f"Parallel scrape of {url} failed: {result}")
+                scraped[url] = PageStore()
+            else:
+                scraped[url] = result
+        return scraped
+
+    async def _discover(self, ctx: CrawlContext):
+        """Read robots.txt for rules, Crawl-delay and sitemaps, then seed the frontier from the sitemaps"""
+        client = self._get_client()
+
+        if settings.SCRAPER_RESPECT_ROBOTS:
+            ctx.robots = await fetch_robots(client, ctx.base_url, USER_AGENT)
+            if ctx.robots.crawl_delay:
+                ctx.crawl_delay = min(ctx.robots.crawl_delay, settings.SCRAPER_MAX_CRAWL_DELAY)
+                logger.info(f"Honoring Crawl-delay of {ctx.crawl_delay}s for {ctx.base_domain}")
+
+        if not settings.SITEMAP_DISCOVERY_ENABLED:
+            return
+
+        sitemap_urls = ctx.robots.sitemaps if ctx.robots and ctx.robots.sitemaps else [default_sitemap_url(ctx.base_url)]
+        async for url, lastmod in iter_sitemap_urls(client, sitemap_urls, settings.SITEMAP_MAX_URLS,
+                                                    settings.SITEMAP_MAX_FILES):
+            if not self._filter_links([url], ctx.base_url, ctx):
+                continue
+            ctx.sitemap_lastmod[normalize_url(url)] = lastmod
+            if ctx.frontier.add(url, depth=1):
+                ctx.stats.sitemap_urls += 1
+
+    async def _crawl(self, ctx: CrawlContext):
+        """Crawl the site using a pool of concurrent fetch workers"""
+        # Pages known from the previous crawl are revisited even when an
+        # unchanged (304) parent no longer yields their links
+        for url in ctx.manifest:
+            ctx.frontier.add(url, depth=1)
+
+        async def worker():
+            while True:
+                item = await ctx.next_url()
+                if item is None:
+                    return
+
+                url, depth = item
+                new_urls = []
+                streamed = False
+                try:
+                    ctx.mark_visited(url)
+                    page, new_urls = await self._scrape_page(ctx, url)
+
+                    if page:
+                        page['lastmod'] = ctx.sitemap_lastmod.get(page['url'])
+                        streamed = await ctx.add_page(page) and ctx.page_sink is not None
+                finally:
+                    # Find more links to visit; a streamed page's URL stays open until the consumer releases it
+                    await ctx.url_done(url, depth, new_urls, release=not streamed)
 
-    async def _extract_dynamic_content(self, page) -> str:
-        """Extract text content from Playwright page"""
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
         try:
-            # Remove unwanted elements
-            await page.evaluate("""
-                () => {
-                    const elements = document.querySelectorAll('script, style, nav, footer, header, .nav, .footer, .header');
-                    elements.forEach(el => el.remove());
-                }
-            """)
-            
-            # Get text content
-            text = await page.evaluate("""
-                () => {
-                    return document.body.innerText;
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def _scrape_page(self, ctx: CrawlContext, url: str):
+        """Scrape one URL statically, rendering it in the browser only if it is a JS shell.
+
+        The URL is fetched as it was discovered; the page is keyed (in the
+        manifest, the archive and its `url`) by the canonical form.
+        """
+        # The sitemap says the page has not changed since it was last indexed
+        key = normalize_url(url)
+        previous = ctx.manifest.get(key)
+        lastmod = ctx.sitemap_lastmod.get(key)
+        if previous and lastmod and previous.get('lastmod') == lastmod:
+            ctx.stats.pages_skipped_lastmod += 1
+            return self._unchanged_page(key, previous), []
+
+        page, new_urls, needs_render = await self._scrape_static(ctx, url)
+
+        if needs_render and settings.DYNAMIC_RENDERING_ENABLED:
+            rendered_page, rendered_urls = await self._scrape_dynamic(ctx, url)
+            if rendered_page is not None:
+                page = rendered_page
+            # Links discovered by the browser go into the same frontier as static ones
+            new_urls = new_urls + rendered_urls
+
+        return page, new_urls
+
+    async def _scrape_static(self, ctx: CrawlContext, url: str):
+        """Fetch and parse a single page.
+
+        Returns the page dict (if it has substantial content), its outgoing
+        links and whether the page looks like a JS shell that needs rendering.
+        """
+        key = normalize_url(url)
+        previous = ctx.manifest.get(key)
+        try:
+            response = await self._fetch(ctx, url, self._conditional_headers(previous))
+
+            if response.status_code == 304 and previous:
+                ctx.stats.pages_not_modified += 1
+                return self._unchanged_page(key, previous), [], False
+
+            if response.status_code in GONE_STATUSES:
+                # Removed from the site; a previously indexed page is pruned after the crawl
+                ctx.gone_urls.add(key)
+                ctx.stats.pages_gone += 1
+                return None, [], False
+
+            response.raise_for_status()
+            ctx.stats.pages_fetched += 1
+            ctx.stats.bytes_downloaded += len(response.content)
+
+            # Parsing runs in the extraction process pool, off the event loop
+            extracted = await self.extraction_pool.extract(response.content)
+            await self._archive_page(ctx, key, extracted['text'], extracted['title'], response.content,
+                                     response.headers.get('etag'), response.headers.get('last-modified'))
+
+            # Extract text content
+            page = None
+            content = extracted['text']
+            if content and len(content.strip()) > 100:  # Only add pages with substantial content
+                page = {
+                    'url': key,
+                    'title': extracted['title'],
+                    'content': content,
+                    'etag': response.headers.get('etag'),
+                    'last_modified': response.headers.get('last-modified')
                 }
-            """)
-            
-            # Clean up text
-            text = re.sub(r'\s+', ' ', text)
-            return text.strip()
-            
+                page = self._compare_with_manifest(ctx, page)
+
+            # Find more links to visit, relative to where any redirects ended up
+            new_urls = self._filter_links(extracted['links'], str(response.url), ctx)
+
+            return page, new_urls, extracted['needs_rendering']
+
         except Exception as e:
-            logger.warning(f"Failed to extract dynamic content: {e}")
-            return ""
-
-    def _extract_title(self, soup: BeautifulSoup) -> str:
-        """Extract page title"""
-        title_tag = soup.find('title')
-        if title_tag:
-            return title_tag.get_text().strip()
-        return ""
-
-    def _extract_links(self, soup: BeautifulSoup, current_url: str, base_domain: str) -> List[str]:
-        """Extract links from page"""
+            ctx.stats.pages_failed += 1
+            logger.warning(f"Failed to scrape {url}: {e}")
+            return None, [], False
+
+    async def _fetch(self, ctx: CrawlContext, url: str, headers: Dict[str, str]) -> httpx.Response:
+        """GET a URL within its host's politeness limits, retrying after 429/503 responses.
+
+        The host's token bucket spaces requests (one per Crawl-delay when robots.txt
+        sets one); its concurrency limit adapts to latency and throttling, and a
+        throttled host is paused for its Retry-After before anything is sent again.
+        """
+        host = self._hosts.get(urlparse(url).netloc, ctx.crawl_delay)
+        attempt = 0
+        while True:
+            async with host.request():
+                async with self._fetch_slots.slot(ctx.tenant, lane=ctx.lane):
+                    started = time.monotonic()
+                    try:
+                        response = await self._get_client().get(url, headers=headers)
+                    except httpx.TimeoutException:
+                        host.record_timeout()
+                        raise
+                attempt += 1
+                pause = host.record(
+                    response.status_code,
+                    time.monotonic() - started,
+                    response.headers.get('retry-after'),
+                    backoff=jittered_backoff(attempt, settings.SCRAPER_RETRY_BASE_DELAY, settings.SCRAPER_MAX_RETRY_AFTER),
+                    max_delay=settings.SCRAPER_MAX_RETRY_AFTER
+                )
+
+            if pause is None or attempt > settings.SCRAPER_MAX_RETRIES:
+                return response
+            ctx.stats.pages_throttled += 1
+            logger.info(f"{host.host} answered {response.status_code}; retrying {url} in {pause:.1f}s")
+
+    async def _scrape_dynamic(self, ctx: CrawlContext, url: str):
+        """Render a single page through the shared Playwright browser pool"""
+        host = self._hosts.get(urlparse(url).netloc, ctx.crawl_delay)
+        async with host.request():
+            result = await browser_pool.render(url)
+        if result is None:
+            ctx.stats.pages_failed += 1
+            return None, []
+
+        ctx.stats.pages_rendered += 1
+        key = normalize_url(url)
+        await self._archive_page(ctx, key, result['content'] or '', result['title'])
+        page = None
+        if result['content'] and len(result['content'].strip()) > 100:
+            page = self._compare_with_manifest(ctx, {
+                'url': key,
+                'title': result['title'],
+                'content': result['content']
+            })
+
+        return page, self._filter_links(result['links'], result['url'], ctx)
+
+    async def _archive_page(self, ctx: CrawlContext, url: str, text: str, title: str,
+                            html: Optional[bytes] = None, etag: Optional[str] = None,
+                            last_modified: Optional[str] = None):
+        """Keep the fetched document in the crawl archive so the site can be re-indexed offline"""
+        archive = get_crawl_archive()
+        if archive is None or ctx.website_id is None:
+            return
+        try:
+            await asyncio.to_thread(archive.put, ctx.website_id, url, text, title, html, etag, last_modified)
+        except Exception as e:
+            logger.warning(f"Failed to archive {url}: {e}")
+
+    def _conditional_headers(self, previous: Optional[Dict]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from a manifest entry"""
+        headers = {}
+        if previous:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        return headers
+
+    def _unchanged_page(self, url: str, previous: Dict) -> Dict:
+        """Page entry for a page whose indexed content is still current"""
+        return {
+            'url': url,
+            'title': previous.get('title') or '',
+            'content': '',
+            'unchanged': True,
+            'etag': previous.get('etag'),
+            'last_modified': previous.get('last_modified'),
+            'content_hash': previous.get('content_hash'),
+            'chunk_count': previous.get('chunk_count') or 0
+        }
+
+    def _compare_with_manifest(self, ctx: CrawlContext, page: Dict) -> Dict:
+        """Fingerprint a freshly scraped page and flag it unchanged if its text matches the manifest"""
+        page['content_hash'] = content_fingerprint(page['content'])
+        previous = ctx.manifest.get(page['url'])
+        if not previous:
+            return page
+
+        if previous.get('content_hash') == page['content_hash']:
+            ctx.stats.pages_unchanged += 1
+            unchanged = self._unchanged_page(page['url'], previous)
+            # Keep the fresh validators so the next recrawl can still get a 304
+            unchanged['etag'] = page.get('etag') or unchanged['etag']
+            unchanged['last_modified'] = page.get('last_modified') or unchanged['last_modified']
+            return unchanged
+
+        # Lets the embedding step delete chunks the new version no longer has
+        page['previous_chunk_count'] = previous.get('chunk_count') or 0
+        return page
+
+    def _filter_links(self, hrefs, current_url: str, ctx: CrawlContext) -> List[str]:
+        """Resolve hrefs against the current page's final URL and keep crawlable same-domain URLs"""
         links = []
-        for link in soup.find_all('a', href=True):
-            href = link['href']
+        for href in hrefs:
             full_url = urljoin(current_url, href)
+            parsed = urlparse(full_url)
             
-            # Only include links from the same domain
-            if (urlparse(full_url).netloc == base_domain and 
-                full_url not in self.visited_urls and
-                not full_url.endswith(('.pdf', '.jpg', '.png', '.gif', '.css', '.js'))):
+            # Only include links from the same domain that robots.txt allows
+            if (parsed.scheme in ('http', 'https') and
+                urlparse(normalize_url(full_url)).netloc == ctx.base_domain and 
+                not parsed.path.lower().endswith(SKIPPED_EXTENSIONS) and
+                (ctx.robots is None or ctx.robots.can_fetch(full_url))):
                 links.append(full_url)
         
-        return links[:10]  # Limit to 10 links per page
+        return links
 
-    def _deduplicate_pages(self, pages: List[Dict[str, str]]) -> List[Dict[str, str]]:
-        """Remove duplicate pages based on URL"""
+    def _deduplicate_pages(self, ctx: CrawlContext) -> List[int]:
+        """Indices of the pages left after removing duplicate URLs and near-duplicate text"""
         seen_urls = set()
         unique_pages = []
+        near_duplicates = NearDuplicateIndex(settings.NEAR_DUPLICATE_MAX_DISTANCE)
         
-        for page in pages:
-            if page['url'] not in seen_urls:
-                seen_urls.add(page['url'])
-                unique_pages.append(page)
+        for index, page in enumerate(ctx.pages):
+            if page['url'] in seen_urls:
+                continue
+            seen_urls.add(page['url'])
+
+            # Pages that held nothing but boilerplate
+            if not page.get('unchanged') and not page['content'].strip():
+                continue
+
+            # Print views, tracking-param variants and repeated listings share almost all their text
+            if (settings.NEAR_DUPLICATE_DETECTION and not page.get('unchanged') and
+                    near_duplicates.is_duplicate(page['content'])):
+                ctx.stats.pages_near_duplicate += 1
+                continue
+
+            unique_pages.append(index)
         
         return unique_pages
 
+def content_fingerprint(content: str) -> str:
+    """Stable hash of extracted page text, used to detect unchanged pages"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
 # Global scraper instance
 scraper = WebsiteScraper()
 
-async def scrape_website(url: str) -> List[Dict[str, str]]:
+async def scrape_website(url: str, manifest: Optional[Dict[str, Dict]] = None) -> PageStore:
     """Main function to scrape a website"""
-    return await scraper.scrape_website(url) 
\ No newline at end of file
+    return await scraper.scrape_website(url, manifest) 
\ No newline at end of file
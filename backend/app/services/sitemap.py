@@ -0,0 +1,159 @@
+import logging
+import zlib
+from contextlib import aclosing
+import xml.etree.ElementTree as ET
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+import httpx
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class RobotsInfo:
+    """Parsed robots.txt of a site: crawl rules, Crawl-delay and sitemap locations"""
+
+    def __init__(self, parser: Optional[RobotFileParser], user_agent: str, crawl_delay: Optional[float] = None):
+        self._parser = parser
+        self._user_agent = user_agent
+        self._crawl_delay = crawl_delay
+
+    @property
+    def sitemaps(self) -> List[str]:
+        if self._parser is None:
+            return []
+        return list(self._parser.site_maps() or [])
+
+    @property
+    def crawl_delay(self) -> Optional[float]:
+        return self._crawl_delay
+
+    def can_fetch(self, url: str) -> bool:
+        if self._parser is None:
+            return True
+        return self._parser.can_fetch(self._user_agent, url)
+
+
+async def fetch_robots(client: httpx.AsyncClient, base_url: str, user_agent: str) -> RobotsInfo:
+    """Fetch and parse robots.txt; a missing or unreadable file allows everything"""
+    robots_url = urljoin(base_url, '/robots.txt')
+    try:
+        response = await client.get(robots_url)
+        if response.status_code != 200:
+            return RobotsInfo(None, user_agent)
+
+        lines = response.text.splitlines()
+        parser = RobotFileParser(robots_url)
+        parser.parse(lines)
+        return RobotsInfo(parser, user_agent, _parse_crawl_delay(lines))
+    except Exception as e:
+        logger.warning(f"Could not read {robots_url}: {e}")
+        return RobotsInfo(None, user_agent)
+
+
+def _parse_crawl_delay(lines: List[str]) -> Optional[float]:
+    """Read the Crawl-delay of the `User-agent: *` group.
+
+    RobotFileParser ignores fractional delays such as `Crawl-delay: 0.5`,
+    so the directive is parsed here.
+    """
+    in_wildcard_group = False
+    reading_agents = False
+    for raw_line in lines:
+        line = raw_line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = (part.strip() for part in line.split(':', 1))
+        field = field.lower()
+
+        if field == 'user-agent':
+            if not reading_agents:
+                in_wildcard_group = False
+            reading_agents = True
+            in_wildcard_group = in_wildcard_group or value == '*'
+            continue
+
+        reading_agents = False
+        if field == 'crawl-delay' and in_wildcard_group:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return None
+    return None
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from an element tag"""
+    return tag.rsplit('}', 1)[-1]
+
+
+async def _stream_sitemap(client: httpx.AsyncClient, sitemap_url: str):
+    """Stream-parse one sitemap file, yielding ('url' | 'sitemap', loc, lastmod) entries"""
+    parser = ET.XMLPullParser(events=('end',))
+    decompressor = None
+    first_chunk = True
+
+    async with client.stream('GET', sitemap_url) as response:
+        if response.status_code != 200:
+            logger.info(f"Sitemap {sitemap_url} returned {response.status_code}")
+            return
+
+        loc = None
+        lastmod = None
+        async for chunk in response.aiter_bytes():
+            # .xml.gz sitemaps are served as gzip files rather than gzip-encoded responses
+            if first_chunk:
+                first_chunk = False
+                if chunk[:2] == GZIP_MAGIC:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                name = _local_name(element.tag)
+                if name == 'loc':
+                    loc = (element.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = (element.text or '').strip() or None
+                elif name in ('url', 'sitemap'):
+                    if loc:
+                        yield name, loc, lastmod
+                    loc = None
+                    lastmod = None
+                    # Free parsed entries so memory stays flat on huge sitemaps
+                    element.clear()
+
+
+async def iter_sitemap_urls(client: httpx.AsyncClient, sitemap_urls: List[str], max_urls: int,
+                            max_files: int) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """Yield (page URL, lastmod) pairs from sitemaps, following sitemap index files"""
+    pending = list(sitemap_urls)
+    seen_files = set()
+    yielded = 0
+
+    while pending and len(seen_files) < max_files and yielded < max_urls:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in seen_files:
+            continue
+        seen_files.add(sitemap_url)
+
+        try:
+            async with aclosing(_stream_sitemap(client, sitemap_url)) as entries:
+                async for kind, loc, lastmod in entries:
+                    if kind == 'sitemap':
+                        pending.append(loc)
+                        continue
+                    yield loc, lastmod
+                    yielded += 1
+                    if yielded >= max_urls:
+                        break
+        except Exception as e:
+            logger.warning(f"Failed to read sitemap {sitemap_url}: {e}")
+
+
+def default_sitemap_url(base_url: str) -> str:
+    parsed = urlparse(base_url)
+    return f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"
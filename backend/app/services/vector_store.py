@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Set
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Batch, Distance, FieldCondition, Filter, FilterSelector, MatchAny, PointIdsList, ScoredPoint, VectorParams
+)
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStore:
+    """Async access to the Qdrant collections of websites.
+
+    One AsyncQdrantClient with a pool of kept-alive connections is shared by
+    every caller, over REST or, with `prefer_grpc`, gRPC. Upserts are split
+    into batches of `batch_size` points and up to `upsert_concurrency` batches
+    are in flight at once across all callers.
+
+    Vectors are taken as a 2-D float32 NumPy array. The Qdrant models only
+    accept nested lists, so each batch is converted with one ndarray.tolist()
+    call and handed over without being validated again point by point.
+    """
+
+    def __init__(self, url: str, api_key: Optional[str] = None, prefer_grpc: bool = False,
+                 grpc_port: int = 6334, timeout: float = 30.0, max_connections: int = 16,
+                 batch_size: int = 256, upsert_concurrency: int = 4):
+        self.url = url
+        self.api_key = api_key
+        self.prefer_grpc = prefer_grpc
+        self.grpc_port = grpc_port
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.batch_size = max(1, batch_size)
+        self.upsert_concurrency = max(1, upsert_concurrency)
+        self._client: Optional[AsyncQdrantClient] = None
+        self._upsert_slots = asyncio.Semaphore(self.upsert_concurrency)
+        self._known_collections: Set[str] = set()
+
+    def _get_client(self) -> AsyncQdrantClient:
+        if self._client is None:
+            self._client = AsyncQdrantClient(
+                url=self.url,
+                api_key=self.api_key,
+                prefer_grpc=self.prefer_grpc,
+                grpc_port=self.grpc_port,
+                timeout=int(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    async def ensure_collection(self, collection_name: str, dimension: int):
+        """Create a cosine-distance collection unless it exists"""
+        if collection_name in self._known_collections:
+            return
+        client = self._get_client()
+        collections = await client.get_collections()
+        if collection_name not in {col.name for col in collections.collections}:
+            await client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=dimension, distance=Distance.COSINE)
+            )
+            logger.info(f"Created collection: {collection_name}")
+        self._known_collections.add(collection_name)
+
+    async def upsert(self, collection_name: str, ids: Sequence[str], vectors: np.ndarray,
+                     payloads: Sequence[Dict[str, Any]]) -> int:
+        """Store points in batches, several at once; returns the number of points stored"""
+        if len(ids) == 0:
+            return 0
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError(f"Expected {len(ids)} vectors in a 2-D array, got shape {vectors.shape}")
+
+        tasks = [
+            asyncio.create_task(self._upsert_batch(collection_name, ids[start:start + self.batch_size],
+                                                   vectors[start:start + self.batch_size],
+                                                   payloads[start:start + self.batch_size]))
+            for start in range(0, len(ids), self.batch_size)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return len(ids)
+
+    async def _upsert_batch(self, collection_name: str, ids: Sequence[str], vectors: np.ndarray,
+                            payloads: Sequence[Dict[str, Any]]):
+        # The vectors come from our own float32 arrays, so pydantic validation of every float is skipped
+        batch = Batch.model_construct(ids=list(ids), vectors=vectors.tolist(), payloads=list(payloads))
+        async with self._upsert_slots:
+            await self._get_client().upsert(collection_name=collection_name, points=batch)
+
+    async def delete_points(self, collection_name: str, ids: List[str]):
+        await self._get_client().delete(collection_name=collection_name, points_selector=PointIdsList(points=ids))
+
+    async def delete_by_urls(self, collection_name: str, urls: List[str]):
+        """Delete every point whose payload `url` is one of `urls`"""
+        await self._get_client().delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(filter=Filter(must=[FieldCondition(key='url', match=MatchAny(any=urls))]))
+        )
+
+    async def search(self, collection_name: str, vector: np.ndarray, limit: int) -> List[ScoredPoint]:
+        response = await self._get_client().query_points(
+            collection_name=collection_name,
+            query=np.asarray(vector, dtype=np.float32),
+            limit=limit,
+            with_payload=True
+        )
+        return response.points
+
+    async def clear(self, collection_name: str):
+        """Delete every point of a collection"""
+        await self._get_client().delete(collection_name=collection_name,
+                                        points_selector=FilterSelector(filter=Filter()))
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        self._upsert_slots = asyncio.Semaphore(self.upsert_concurrency)
+
+
+def create_vector_store() -> VectorStore:
+    return VectorStore(settings.QDRANT_URL, settings.QDRANT_API_KEY,
+                       prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                       grpc_port=settings.QDRANT_GRPC_PORT,
+                       timeout=settings.QDRANT_TIMEOUT,
+                       max_connections=settings.QDRANT_MAX_CONNECTIONS,
+                       batch_size=settings.QDRANT_UPSERT_BATCH_SIZE,
+                       upsert_concurrency=settings.QDRANT_UPSERT_CONCURRENCY)
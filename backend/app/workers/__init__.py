@@ -0,0 +1 @@
+# Background Workers 
\ No newline at end of file
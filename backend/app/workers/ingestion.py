@@ -0,0 +1,179 @@
+"""Ingestion worker: claims scrape-and-index jobs from the job queue and runs them.
+
+Runs inside the API process when INGESTION_EMBEDDED_WORKER is enabled, or as
+separate processes sharing the same queue:
+    python -m app.workers.ingestion [--concurrency 2]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import List, Optional
+from app.core.config import settings
+from app.models.website import WebsiteStatus
+from app.services.browser_pool import browser_pool
+from app.services.embeddings import embedding_service
+from app.services.ingestion import JOB_HANDLERS, update_website_status
+from app.services.job_queue import Job, JobQueue, JobStatus, get_job_queue
+from app.services.scraper import scraper
+
+logger = logging.getLogger(__name__)
+
+# Seconds between deletions of finished jobs older than JOB_RETENTION_SECONDS
+PURGE_INTERVAL = 3600.0
+
+
+class IngestionWorker:
+    """Runs up to `concurrency` jobs at a time, holding a heartbeated lease on each"""
+
+    def __init__(self, queue: Optional[JobQueue] = None, concurrency: Optional[int] = None,
+                 worker_id: Optional[str] = None):
+        self.queue = queue or get_job_queue()
+        self.concurrency = max(1, concurrency or settings.INGESTION_WORKER_CONCURRENCY)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = settings.JOB_LEASE_SECONDS
+        self._stopping = asyncio.Event()
+        self._slots: List[asyncio.Task] = []
+
+    async def run(self):
+        """Process jobs until stop() is called"""
+        logger.info(f"Ingestion worker {self.worker_id} started with {self.concurrency} slots")
+        self._slots = [asyncio.create_task(self._slot()) for _ in range(self.concurrency)]
+        if settings.JOB_RETENTION_SECONDS > 0:
+            self._slots.append(asyncio.create_task(self._purge()))
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        logger.info(f"Ingestion worker {self.worker_id} stopped")
+
+    def stop(self):
+        """Stop claiming jobs and abandon running ones; their leases expire and they are reclaimed"""
+        self._stopping.set()
+        for task in self._slots:
+            task.cancel()
+
+    async def _slot(self):
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.claim(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._execute(job)
+
+    async def _purge(self):
+        """Delete finished jobs past their retention; several workers doing it at once is harmless"""
+        while not self._stopping.is_set():
+            try:
+                deleted = await self.queue.purge(settings.JOB_RETENTION_SECONDS)
+                if deleted:
+                    logger.info(f"Purged {deleted} finished jobs")
+            except Exception as e:
+                logger.warning(f"Failed to purge finished jobs: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=PURGE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: Job):
+        if job.attempts_exhausted:
+            await self._record_failure(job, "Job was abandoned by its worker too many times")
+            return
+
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            await self._record_failure(job, f"Unknown job kind: {job.kind}")
+            return
+
+        logger.info(f"Running {job.kind} job {job.id} for website {job.website_id} (attempt {job.attempts})")
+        task = asyncio.create_task(handler(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, task))
+        try:
+            await task
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                raise
+            # The heartbeat lost the lease; another worker owns the job now
+            logger.warning(f"Job {job.id} stopped after losing its lease")
+            return
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            await self._record_failure(job, str(e))
+            return
+        finally:
+            heartbeat.cancel()
+            if not task.done():
+                task.cancel()
+
+        await self.queue.complete(job.id, self.worker_id)
+        logger.info(f"Job {job.id} completed")
+
+    async def _heartbeat(self, job: Job, task: asyncio.Task):
+        """Extend the job's lease while it runs, cancelling it if the lease was lost"""
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                owned = await self.queue.heartbeat(job.id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job.id} failed: {e}")
+                continue
+            if not owned:
+                task.cancel()
+                return
+
+    async def _record_failure(self, job: Job, error: str):
+        """Fail the attempt in the queue and mirror the outcome in the website status"""
+        try:
+            failed = await self.queue.fail(job.id, self.worker_id, error)
+            if failed is None:
+                # The lease was lost; the job and its website status belong to another worker now
+                logger.warning(f"Job {job.id} failed after losing its lease; leaving it to its new owner")
+                return
+            job = failed
+            if job.status == JobStatus.FAILED:
+                await update_website_status(job.website_id, WebsiteStatus.FAILED, error_message=error)
+            else:
+                await update_website_status(
+                    job.website_id,
+                    WebsiteStatus.PENDING,
+                    error_message=f"Attempt {job.attempts} of {job.max_attempts} failed, retrying: {error}"
+                )
+        except Exception as e:
+            logger.error(f"Failed to record failure of job {job.id}: {e}")
+
+
+async def _run_worker(concurrency: Optional[int]):
+    worker = IngestionWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await scraper.close()
+        await browser_pool.close()
+        await embedding_service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Jobs run at once (default: INGESTION_WORKER_CONCURRENCY)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""End-to-end crawler benchmark against a local synthetic site.
+
+Starts a fixture site server (see fixture_site.py) in a separate process,
+crawls it with WebsiteScraper and reports pages per second, bytes downloaded,
+CPU time of the crawler and of its extraction workers, and peak memory.
+Nothing leaves the machine, so results are comparable between runs and
+between branches.
+
+Usage (from the backend directory):
+    python -m benchmarks.crawler_benchmark [--pages 500] [--latency-ms 20] [--runs 3] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixture_site import FixtureSiteServer, add_site_arguments, site_from_arguments
+
+
+def _serve(site, ready):
+    server = FixtureSiteServer(site)
+    ready.put(server.base_url)
+    server.serve_forever()
+
+
+def start_server(site):
+    """Run the fixture site in its own process so its CPU time is not counted as the crawler's"""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(target=_serve, args=(site, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+def configure(args):
+    """Apply the crawler settings under test before the scraper is created"""
+    from app.core.config import settings
+
+    settings.MAX_PAGES_TO_SCRAPE = args.max_pages or args.pages
+    settings.SCRAPER_MAX_FRONTIER_SIZE = max(settings.SCRAPER_MAX_FRONTIER_SIZE, args.pages * 2)
+    settings.SCRAPER_HOST_RATE = args.host_rate
+    settings.DYNAMIC_RENDERING_ENABLED = args.render
+    settings.SITEMAP_DISCOVERY_ENABLED = args.sitemap
+    if args.concurrency is not None:
+        settings.SCRAPER_CONCURRENCY = args.concurrency
+    if args.extraction_workers is not None:
+        settings.EXTRACTION_WORKERS = args.extraction_workers
+    if args.extraction_backend is not None:
+        settings.HTML_EXTRACTION_BACKEND = args.extraction_backend
+
+
+async def crawl_once(base_url: str, trace_memory: bool):
+    from app.services.browser_pool import browser_pool
+    from app.services.scraper import WebsiteScraper
+
+    scraper = WebsiteScraper()
+    ctx = scraper.new_context(base_url + "/")
+    sink = asyncio.Queue(maxsize=64)
+    pages = 0
+
+    async def drain():
+        nonlocal pages
+        while True:
+            page = await sink.get()
+            pages += 1
+            ctx.release(page['url'])
+
+    if trace_memory:
+        tracemalloc.start()
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+
+    consumer = asyncio.create_task(drain())
+    try:
+        await scraper.stream_website(ctx, sink)
+        while not sink.empty():
+            await asyncio.sleep(0)
+    finally:
+        consumer.cancel()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+
+    # Waiting for the extraction workers to exit makes their CPU time visible in RUSAGE_CHILDREN
+    if scraper._client is not None:
+        await scraper._client.aclose()
+    scraper.extraction_pool.close(wait=True)
+    await browser_pool.close()
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    worker_cpu = ((children_after.ru_utime + children_after.ru_stime)
+                  - (children_before.ru_utime + children_before.ru_stime))
+
+    python_peak = None
+    if trace_memory:
+        python_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    stats = ctx.stats
+    return {
+        'pages': pages,
+        'pages_fetched': stats.pages_fetched,
+        'pages_failed': stats.pages_failed,
+        'pages_rendered': stats.pages_rendered,
+        'seconds': elapsed,
+        'pages_per_second': stats.pages_fetched / elapsed if elapsed else 0.0,
+        'bytes_downloaded': stats.bytes_downloaded,
+        'cpu_seconds': cpu,
+        'worker_cpu_seconds': worker_cpu,
+        'cpu_ms_per_page': 1000 * (cpu + worker_cpu) / max(1, stats.pages_fetched),
+        # Linux reports ru_maxrss in KiB
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'python_peak_mb': python_peak / 1024 / 1024 if python_peak is not None else None
+    }
+
+
+def print_row(label, result):
+    python_peak = f"{result['python_peak_mb']:>9.1f}" if result['python_peak_mb'] is not None else f"{'-':>9}"
+    print(f"{label:<8}{int(result['pages_fetched']):>7}{result['seconds']:>9.2f}{result['pages_per_second']:>10.1f}"
+          f"{result['bytes_downloaded'] / 1024 / 1024:>9.2f}{result['cpu_seconds']:>8.2f}"
+          f"{result['worker_cpu_seconds']:>8.2f}{result['cpu_ms_per_page']:>9.2f}{result['peak_rss_mb']:>9.1f}"
+          f"{python_peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_site_arguments(parser)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-pages", type=int, default=None, help="crawl budget (defaults to --pages)")
+    parser.add_argument("--concurrency", type=int, default=None, help="SCRAPER_CONCURRENCY")
+    parser.add_argument("--host-rate", type=float, default=0.0,
+                        help="SCRAPER_HOST_RATE in requests/s; 0 (default) measures the crawler unthrottled")
+    parser.add_argument("--extraction-workers", type=int, default=None, help="EXTRACTION_WORKERS")
+    parser.add_argument("--extraction-backend", default=None, help="HTML_EXTRACTION_BACKEND")
+    parser.add_argument("--render", action="store_true", help="render JS-only pages (needs Playwright browsers)")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report peak Python heap (slower)")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    configure(args)
+    from app.core.config import settings
+
+    site = site_from_arguments(args)
+    process, base_url = start_server(site)
+    print(f"Fixture site: {args.pages} pages, fanout {args.fanout}, latency {args.latency_ms}ms, "
+          f"{args.js_fraction:.0%} JS-only, at {base_url}")
+    print(f"Crawler: concurrency {settings.SCRAPER_CONCURRENCY}, {settings.EXTRACTION_WORKERS} extraction workers "
+          f"({settings.HTML_EXTRACTION_BACKEND}), host rate {settings.SCRAPER_HOST_RATE or 'unlimited'}, "
+          f"rendering {'on' if args.render else 'off'}")
+
+    results = []
+    try:
+        print(f"\n{'run':<8}{'pages':>7}{'seconds':>9}{'pages/s':>10}{'MB':>9}{'cpu s':>8}{'wrk s':>8}"
+              f"{'cpu ms/p':>9}{'rss MB':>9}{'heap MB':>9}")
+        for run in range(args.runs):
+            result = asyncio.run(crawl_once(base_url, args.tracemalloc))
+            results.append(result)
+            print_row(f"#{run + 1}", result)
+    finally:
+        process.terminate()
+        process.join()
+
+    median = {key: statistics.median(r[key] for r in results) if results[0][key] is not None else None
+              for key in results[0]}
+    print_row("median", median)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'arguments': vars(args), 'runs': results, 'median': median}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 1 if any(r['pages_fetched'] == 0 for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
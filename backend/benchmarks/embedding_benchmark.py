@@ -0,0 +1,109 @@
+"""Remote embedding benchmark against the local embedding stub server.
+
+Starts embedding_stub_server.py in a separate process and embeds synthetic
+chunks through HuggingFaceAPIBackend, reporting texts per second, requests
+sent, retries, 429/503 responses and where the adaptive concurrency limit
+settled. `--sequential` runs the one-text-per-request, one-request-at-a-time
+pattern the backend used before batching, for comparison.
+
+Usage (from the backend directory):
+    python -m benchmarks.embedding_benchmark [--texts 1000] [--latency-ms 80] [--rate 20] [--max-concurrent 8]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import sys
+import time
+
+from benchmarks.embedding_stub_server import EmbeddingStubServer, add_endpoint_arguments, endpoint_from_arguments
+
+WORDS = ("pricing support install configure account billing feature release customer dashboard report "
+         "export integration security privacy overview tutorial reference question answer").split()
+
+
+def _serve(args, ready):
+    server = EmbeddingStubServer(endpoint_from_arguments(args))
+    ready.put(server.api_url)
+    server.serve_forever()
+
+
+def start_server(args):
+    """Run the stub in its own process so serving it does not slow down the event loop under test"""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(target=_serve, args=(args, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+def make_texts(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(WORDS, k=rng.randint(60, 120))) for _ in range(count)]
+
+
+async def run(args, api_url: str):
+    from app.core.config import settings
+    from app.services.embedding_backends import HuggingFaceAPIBackend
+
+    if args.sequential:
+        batch_size, concurrency, max_concurrency = 1, 1, 1
+    else:
+        batch_size, concurrency, max_concurrency = args.batch_size, args.concurrency, args.max_concurrency
+    settings.EMBEDDING_REMOTE_RETRY_BASE_DELAY = args.retry_base_delay
+
+    backend = HuggingFaceAPIBackend("stub-model", args.dimension, api_url, batch_size=batch_size,
+                                    concurrency=concurrency, max_concurrency=max_concurrency,
+                                    max_retries=args.max_retries)
+    texts = make_texts(args.texts)
+    # Several callers at once, like concurrent pipelines sharing the backend
+    calls = [texts[start::args.callers] for start in range(args.callers)]
+
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(backend.embed(call) for call in calls), return_exceptions=True)
+    finally:
+        await backend.close()
+    elapsed = time.perf_counter() - started
+
+    embedded = sum(len(result) for result in results if not isinstance(result, Exception))
+    errors = [result for result in results if isinstance(result, Exception)]
+    return backend, embedded, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_endpoint_arguments(parser)
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--callers", type=int, default=4, help="concurrent embed() calls sharing the backend")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4, help="initial requests in flight")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--retry-base-delay", type=float, default=0.2)
+    parser.add_argument("--sequential", action="store_true", help="one text per request, one request at a time")
+    args = parser.parse_args()
+
+    process, api_url = start_server(args)
+    print(f"Stub endpoint: {args.latency_ms}ms + {args.per_item_ms}ms/text, rate limit {args.rate or 'none'}/s, "
+          f"max concurrent {args.max_concurrent or 'unlimited'}, error rate {args.error_rate:.0%}")
+    try:
+        backend, embedded, errors, elapsed = asyncio.run(run(args, api_url))
+    finally:
+        process.terminate()
+        process.join()
+
+    mode = "sequential" if args.sequential else f"batches of {backend.batch_size}"
+    print(f"\nMode:             {mode}")
+    print(f"Texts embedded:   {embedded}/{args.texts} in {elapsed:.2f}s ({embedded / elapsed:.1f} texts/s)")
+    print(f"Requests:         {backend.stats['requests']} ({backend.stats['retries']} retries, "
+          f"{backend.stats['throttled']} throttled, {backend.stats['failed_batches']} failed batches)")
+    print(f"Concurrency:      settled at {backend.limiter.limit:.1f} (max {backend.limiter.maximum})")
+    print(f"Circuit breaker:  {backend.breaker.state}, opened {backend.breaker.opened} times")
+    for error in errors:
+        print(f"Error: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
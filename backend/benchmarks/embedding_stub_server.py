@@ -0,0 +1,186 @@
+"""Local stand-in for the HuggingFace feature-extraction API.
+
+Answers POST /models/<model> with one deterministic pseudo-embedding per
+input and simulates what makes the real endpoint hard to use well:
+per-request and per-text latency, a request rate limit (429 with
+Retry-After), a concurrency limit (503) and random server errors (500).
+
+Usage (from the backend directory):
+    python -m benchmarks.embedding_stub_server [--port 8900] [--latency-ms 80] [--rate 20] [--max-concurrent 8]
+
+Then point the API backend at it with HUGGINGFACE_API_URL=http://127.0.0.1:8900/models.
+"""
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+class StubEndpoint:
+    """Behaviour of the simulated endpoint"""
+
+    def __init__(self, dimension: int = 384, latency_ms: float = 50.0, per_item_ms: float = 2.0,
+                 rate: float = 0.0, burst: int = 10, max_concurrent: int = 0, error_rate: float = 0.0,
+                 retry_after: int = 1, seed: int = 1):
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+        self.per_item_ms = per_item_ms
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.counts = {'requests': 0, 'texts': 0, 'throttled': 0, 'overloaded': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._in_flight = 0
+
+    def embedding(self, text: str) -> List[float]:
+        """Deterministic unit-length vector for a text"""
+        values = []
+        counter = 0
+        while len(values) < self.dimension:
+            digest = hashlib.sha256(f"{counter}:{text}".encode('utf-8')).digest()
+            values.extend(value / 2 ** 31 for value in struct.unpack('<8i', digest))
+            counter += 1
+        values = values[:self.dimension]
+        norm = sum(value * value for value in values) ** 0.5 or 1.0
+        return [value / norm for value in values]
+
+    def admit(self) -> Optional[int]:
+        """Status to reject a new request with, or None to serve it"""
+        with self._lock:
+            self.counts['requests'] += 1
+            if self.rate > 0:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens < 1:
+                    self.counts['throttled'] += 1
+                    return 429
+                self._tokens -= 1
+            if self.max_concurrent and self._in_flight >= self.max_concurrent:
+                self.counts['overloaded'] += 1
+                return 503
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.counts['errors'] += 1
+                return 500
+            self._in_flight += 1
+            return None
+
+    def finish(self, texts: int):
+        with self._lock:
+            self._in_flight -= 1
+            self.counts['texts'] += texts
+
+
+class EmbeddingStubServer:
+    """Serves a StubEndpoint over HTTP (start() runs it in a background thread)"""
+
+    def __init__(self, endpoint: StubEndpoint, host: str = "127.0.0.1", port: int = 0):
+        self.endpoint = endpoint
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if not self.path.startswith("/models/"):
+                    return self._reply(404, {"error": "Model not found"})
+                try:
+                    inputs = json.loads(body)["inputs"]
+                except (ValueError, KeyError):
+                    return self._reply(400, {"error": "Expected a JSON body with 'inputs'"})
+                texts = inputs if isinstance(inputs, list) else [inputs]
+
+                rejection = endpoint.admit()
+                if rejection == 429:
+                    return self._reply(429, {"error": "Rate limit reached"},
+                                       {"Retry-After": str(endpoint.retry_after)})
+                if rejection is not None:
+                    return self._reply(rejection, {"error": "Model is overloaded"})
+                try:
+                    time.sleep((endpoint.latency_ms + endpoint.per_item_ms * len(texts)) / 1000)
+                    vectors = [endpoint.embedding(text) for text in texts]
+                finally:
+                    endpoint.finish(len(texts))
+                self._reply(200, vectors if isinstance(inputs, list) else vectors[0])
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+
+    @property
+    def api_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/models"
+
+    def start(self) -> "EmbeddingStubServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def add_endpoint_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fixed latency per request")
+    parser.add_argument("--per-item-ms", type=float, default=2.0, help="extra latency per text in a request")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests per second before 429s; 0 for no limit")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--max-concurrent", type=int, default=0, help="requests in progress before 503s; 0 for no limit")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+
+
+def endpoint_from_arguments(args: argparse.Namespace) -> StubEndpoint:
+    return StubEndpoint(dimension=args.dimension, latency_ms=args.latency_ms, per_item_ms=args.per_item_ms,
+                        rate=args.rate, burst=args.burst, max_concurrent=args.max_concurrent,
+                        error_rate=args.error_rate, retry_after=args.retry_after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_endpoint_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+
+    server = EmbeddingStubServer(endpoint_from_arguments(args), args.host, args.port)
+    print(f"Embedding stub listening at {server.api_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
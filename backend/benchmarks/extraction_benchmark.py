@@ -0,0 +1,94 @@
+"""Microbenchmark for the HTML extraction backends.
+
+Runs every available backend over the saved HTML fixtures, reports pages per
+second and checks that all backends produce the same title, text and links.
+
+Usage (from the backend directory):
+    python -m benchmarks.extraction_benchmark [--iterations 200] [--fixtures DIR]
+"""
+import argparse
+import difflib
+import sys
+import time
+from pathlib import Path
+
+from app.services.extraction import EXTRACTORS, LXML_AVAILABLE, BeautifulSoupExtractor
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_fixtures(directory: Path):
+    fixtures = {path.name: path.read_bytes() for path in sorted(directory.glob("*.html"))}
+    if not fixtures:
+        raise SystemExit(f"No .html fixtures found in {directory}")
+    return fixtures
+
+
+def benchmark(extractor, fixtures, iterations: int):
+    documents = list(fixtures.values())
+    total_bytes = sum(len(html) for html in documents) * iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for html in documents:
+            extractor.extract(html)
+    elapsed = time.perf_counter() - start
+
+    pages = len(documents) * iterations
+    return pages / elapsed, total_bytes / elapsed / 1024 / 1024
+
+
+def compare(reference, candidate, fixtures):
+    """Return a list of (fixture, field, similarity) for every output that differs"""
+    mismatches = []
+    for name, html in fixtures.items():
+        expected = reference.extract(html)
+        actual = candidate.extract(html)
+        for field in ("title", "text", "links"):
+            a, b = getattr(expected, field), getattr(actual, field)
+            if a != b:
+                ratio = difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+                mismatches.append((name, field, ratio))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    corpus_kb = sum(len(html) for html in fixtures.values()) / 1024
+    print(f"Corpus: {len(fixtures)} fixtures, {corpus_kb:.1f} KB, {args.iterations} iterations")
+    if not LXML_AVAILABLE:
+        print("lxml is not installed; only the BeautifulSoup backend will run")
+
+    backends = [cls() for name, cls in EXTRACTORS.items() if name != "lxml" or LXML_AVAILABLE]
+    reference = BeautifulSoupExtractor()
+
+    print(f"\n{'backend':<10}{'pages/s':>12}{'MB/s':>10}{'speedup':>10}")
+    baseline = None
+    for extractor in backends:
+        pages_per_second, mb_per_second = benchmark(extractor, fixtures, args.iterations)
+        baseline = baseline or pages_per_second
+        print(f"{extractor.name:<10}{pages_per_second:>12.1f}{mb_per_second:>10.2f}{pages_per_second / baseline:>9.2f}x")
+
+    failed = False
+    print("\nEquivalence against the bs4 reference:")
+    for extractor in backends:
+        if extractor.name == reference.name:
+            continue
+        mismatches = compare(reference, extractor, fixtures)
+        if not mismatches:
+            print(f"  {extractor.name}: identical output on all fixtures")
+            continue
+        failed = True
+        for name, field, ratio in mismatches:
+            print(f"  {extractor.name}: {name} {field} differs (similarity {ratio:.3f})")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Local HTTP server that generates synthetic websites for crawler benchmarks.
+
+Page i links to its children i * fanout + 1 .. i * fanout + fanout (so the
+whole site is reachable from the home page) plus a few random pages. All
+content is derived from the seed, so a given configuration always serves the
+same site. A fraction of the pages can be JS-only shells whose text and links
+are only produced by an inline script.
+
+Usage (from the backend directory):
+    python -m benchmarks.fixture_site [--pages 500] [--fanout 8] [--latency-ms 20] [--port 8800]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+WORDS = (
+    "crawler index page content search vector embedding chunk document product pricing support guide "
+    "install configure account billing feature release update customer team project dashboard report "
+    "export import integration security privacy policy overview tutorial example reference api question"
+).split()
+
+
+class FixtureSite:
+    """Shape of the generated site"""
+
+    def __init__(self, pages: int = 500, fanout: int = 8, random_links: int = 4, paragraphs: int = 6,
+                 latency_ms: float = 0.0, latency_jitter_ms: float = 0.0, js_fraction: float = 0.0,
+                 crawl_delay: Optional[float] = None, sitemap: bool = False, seed: int = 1):
+        self.pages = pages
+        self.fanout = fanout
+        self.random_links = random_links
+        self.paragraphs = paragraphs
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.js_fraction = js_fraction
+        self.crawl_delay = crawl_delay
+        self.sitemap = sitemap
+        self.seed = seed
+
+    def path(self, index: int) -> str:
+        return "/" if index == 0 else f"/page/{index}"
+
+    def is_js_only(self, index: int) -> bool:
+        return index > 0 and random.Random(self.seed * 7919 + index).random() < self.js_fraction
+
+    def render(self, index: int) -> bytes:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        children = range(index * self.fanout + 1, min(self.pages, index * self.fanout + self.fanout + 1))
+        extra = [rng.randrange(self.pages) for _ in range(self.random_links)] if self.pages > 1 else []
+        links = [self.path(i) for i in (*children, *extra)]
+        title = f"Page {index}: {' '.join(rng.choices(WORDS, k=3))}"
+        paragraphs = [' '.join(rng.choices(WORDS, k=rng.randint(40, 90))) for _ in range(self.paragraphs)]
+
+        nav = '<nav><a href="/">Home</a> <a href="/page/1">Docs</a></nav>'
+        footer = '<footer>Copyright Fixture Site. All rights reserved.</footer>'
+        if self.is_js_only(index):
+            body = ''.join(f'<p>{text}</p>' for text in paragraphs)
+            body += ''.join(f'<a href="{link}">{link}</a> ' for link in links)
+            html = (
+                f'<!doctype html><html><head><title>{title}</title></head><body>{nav}'
+                f'<noscript>You need to enable JavaScript to run this app.</noscript><div id="root"></div>'
+                f'<script>document.getElementById("root").innerHTML = {json.dumps(body)};</script>'
+                f'{footer}</body></html>'
+            )
+        else:
+            html = (
+                f'<!doctype html><html><head><title>{title}</title></head><body>{nav}<main><h1>{title}</h1>'
+                + ''.join(f'<p>{text}</p>' for text in paragraphs)
+                + '<ul>' + ''.join(f'<li><a href="{link}">{link}</a></li>' for link in links) + '</ul>'
+                + f'</main>{footer}</body></html>'
+            )
+        return html.encode('utf-8')
+
+    def robots(self, base_url: str) -> bytes:
+        lines = ["User-agent: *", "Allow: /"]
+        if self.crawl_delay:
+            lines.append(f"Crawl-delay: {self.crawl_delay}")
+        if self.sitemap:
+            lines.append(f"Sitemap: {base_url}/sitemap.xml")
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def sitemap_xml(self, base_url: str) -> bytes:
+        urls = ''.join(f'<url><loc>{base_url}{self.path(i)}</loc></url>' for i in range(self.pages))
+        return (f'<?xml version="1.0" encoding="UTF-8"?>'
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>').encode('utf-8')
+
+    def resolve(self, path: str, base_url: str) -> Tuple[int, str, bytes]:
+        """Status, content type and body for a request path"""
+        if path == "/robots.txt":
+            return 200, "text/plain", self.robots(base_url)
+        if path == "/sitemap.xml":
+            if not self.sitemap:
+                return 404, "text/plain", b"not found"
+            return 200, "application/xml", self.sitemap_xml(base_url)
+        if path == "/":
+            return 200, "text/html; charset=utf-8", self.render(0)
+        if path.startswith("/page/"):
+            try:
+                index = int(path[len("/page/"):])
+            except ValueError:
+                index = -1
+            if 0 < index < self.pages:
+                return 200, "text/html; charset=utf-8", self.render(index)
+        return 404, "text/plain", b"not found"
+
+
+class FixtureSiteServer:
+    """Serves a FixtureSite over HTTP/1.1 with keep-alive (start() runs it in a background thread)"""
+
+    def __init__(self, site: FixtureSite, host: str = "127.0.0.1", port: int = 0):
+        self.site = site
+        self.requests = 0
+        self.bytes_sent = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if site.latency_ms or site.latency_jitter_ms:
+                    jitter = random.uniform(-site.latency_jitter_ms, site.latency_jitter_ms)
+                    time.sleep(max(0.0, site.latency_ms + jitter) / 1000)
+                status, content_type, body = site.resolve(self.path.split('?')[0], server.base_url)
+                server.requests += 1
+                server.bytes_sent += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FixtureSiteServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def add_site_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--fanout", type=int, default=8, help="child pages linked from each page")
+    parser.add_argument("--random-links", type=int, default=4, help="extra links to random pages per page")
+    parser.add_argument("--paragraphs", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--js-fraction", type=float, default=0.0, help="share of pages that are JS-only shells")
+    parser.add_argument("--crawl-delay", type=float, default=None, help="Crawl-delay announced in robots.txt")
+    parser.add_argument("--sitemap", action="store_true", help="serve a sitemap.xml listing every page")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def site_from_arguments(args: argparse.Namespace) -> FixtureSite:
+    return FixtureSite(pages=args.pages, fanout=args.fanout, random_links=args.random_links,
+                       paragraphs=args.paragraphs, latency_ms=args.latency_ms,
+                       latency_jitter_ms=args.latency_jitter_ms, js_fraction=args.js_fraction,
+                       crawl_delay=args.crawl_delay, sitemap=args.sitemap, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_site_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    args = parser.parse_args()
+
+    server = FixtureSiteServer(site_from_arguments(args), args.host, args.port)
+    print(f"Serving a {args.pages}-page fixture site at {server.base_url}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
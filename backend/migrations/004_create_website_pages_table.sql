@@ -0,0 +1,42 @@
+-- Migration: 004_create_website_pages_table.sql
+-- Description: Create the website_pages manifest used for incremental recrawls
+-- Date: 2026-10-17
+
+-- Create website_pages table
+CREATE TABLE IF NOT EXISTS public.website_pages (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    website_id UUID NOT NULL REFERENCES public.websites(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    title TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    chunk_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Create indexes for better performance
+CREATE INDEX IF NOT EXISTS idx_website_pages_website_id ON public.website_pages(website_id);
+
+-- One manifest entry per page of a website
+CREATE UNIQUE INDEX IF NOT EXISTS idx_website_pages_website_url ON public.website_pages(website_id, url);
+
+-- Create trigger to automatically update updated_at on row updates
+CREATE TRIGGER update_website_pages_updated_at 
+    BEFORE UPDATE ON public.website_pages 
+    FOR EACH ROW 
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Add comments for documentation
+COMMENT ON TABLE public.website_pages IS 'Per-page crawl manifest used to skip unchanged pages on recrawl';
+COMMENT ON COLUMN public.website_pages.website_id IS 'Foreign key to the website this page belongs to';
+COMMENT ON COLUMN public.website_pages.url IS 'Canonical page URL';
+COMMENT ON COLUMN public.website_pages.title IS 'Page title at the last crawl';
+COMMENT ON COLUMN public.website_pages.etag IS 'ETag response header, sent back as If-None-Match';
+COMMENT ON COLUMN public.website_pages.last_modified IS 'Last-Modified response header, sent back as If-Modified-Since';
+COMMENT ON COLUMN public.website_pages.content_hash IS 'SHA-256 of the extracted page text';
+COMMENT ON COLUMN public.website_pages.chunk_count IS 'Number of chunks embedded for this page';
+
+-- Refresh PostgREST schema cache
+NOTIFY pgrst, 'reload schema';
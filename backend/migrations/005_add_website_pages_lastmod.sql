@@ -0,0 +1,10 @@
+-- Migration: 005_add_website_pages_lastmod.sql
+-- Description: Store the sitemap lastmod of each page so recrawls can skip unchanged pages without fetching them
+-- Date: 2026-10-17
+
+ALTER TABLE public.website_pages ADD COLUMN IF NOT EXISTS lastmod TEXT;
+
+COMMENT ON COLUMN public.website_pages.lastmod IS 'lastmod value from the sitemap at the last crawl';
+
+-- Refresh PostgREST schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,243 @@
+-- Migration: 006_create_ingestion_jobs_table.sql
+-- Description: Create the ingestion job queue shared by workers on several hosts (JOB_QUEUE_BACKEND=supabase)
+-- Date: 2026-10-17
+
+-- Times are epoch seconds (DOUBLE PRECISION), as in the SQLite queue, and are
+-- always taken from the database clock so workers with skewed clocks agree.
+
+-- Create ingestion_jobs table
+CREATE TABLE IF NOT EXISTS public.ingestion_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind TEXT NOT NULL,
+    website_id UUID NOT NULL REFERENCES public.websites(id) ON DELETE CASCADE,
+    tenant_id TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after DOUBLE PRECISION NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at DOUBLE PRECISION,
+    claimed_at DOUBLE PRECISION,
+    last_error TEXT,
+    created_at DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL
+);
+
+-- Create indexes for better performance
+CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_claim ON public.ingestion_jobs(status, run_after)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_running_tenant ON public.ingestion_jobs(tenant_id)
+    WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_finished ON public.ingestion_jobs(updated_at)
+    WHERE status IN ('completed', 'failed');
+
+-- At most one queued or running job per website and kind
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ingestion_jobs_active ON public.ingestion_jobs(website_id, kind)
+    WHERE status IN ('queued', 'running');
+
+-- Create ingestion_tenants table (when each tenant was last served, for fair claims)
+CREATE TABLE IF NOT EXISTS public.ingestion_tenants (
+    tenant_id TEXT PRIMARY KEY,
+    last_claimed_at DOUBLE PRECISION NOT NULL
+);
+
+-- Create ingestion_checkpoints table
+CREATE TABLE IF NOT EXISTS public.ingestion_checkpoints (
+    website_id UUID NOT NULL REFERENCES public.websites(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    data JSONB NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (website_id, kind)
+);
+
+-- Only the service role (the workers and the API) may touch the queue
+ALTER TABLE public.ingestion_jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.ingestion_tenants ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.ingestion_checkpoints ENABLE ROW LEVEL SECURITY;
+
+-- Queue a job, or return the job already queued or running for this website and kind
+CREATE OR REPLACE FUNCTION public.enqueue_ingestion_job(
+    p_kind TEXT, p_website_id UUID, p_tenant_id TEXT, p_payload JSONB, p_priority INTEGER, p_max_attempts INTEGER
+) RETURNS SETOF public.ingestion_jobs
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_now DOUBLE PRECISION := extract(epoch FROM clock_timestamp());
+BEGIN
+    INSERT INTO public.ingestion_jobs (kind, website_id, tenant_id, payload, status, priority, max_attempts,
+                                       run_after, created_at, updated_at)
+    VALUES (p_kind, p_website_id, p_tenant_id, p_payload, 'queued', p_priority, p_max_attempts,
+            v_now, v_now, v_now)
+    ON CONFLICT (website_id, kind) WHERE status IN ('queued', 'running') DO NOTHING;
+
+    RETURN QUERY SELECT * FROM public.ingestion_jobs
+        WHERE website_id = p_website_id AND kind = p_kind AND status IN ('queued', 'running');
+END;
+$$;
+
+-- Lease the next runnable job to a worker, sharing claims fairly between tenants
+CREATE OR REPLACE FUNCTION public.claim_ingestion_job(
+    p_worker_id TEXT, p_lease_seconds DOUBLE PRECISION, p_max_per_tenant INTEGER, p_max_global INTEGER
+) RETURNS SETOF public.ingestion_jobs
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_now DOUBLE PRECISION;
+    v_job public.ingestion_jobs;
+BEGIN
+    -- Running-job limits only hold if claims that count running jobs take turns;
+    -- without limits, SKIP LOCKED alone lets workers claim different jobs at once
+    IF p_max_per_tenant > 0 OR p_max_global > 0 THEN
+        PERFORM pg_advisory_xact_lock(hashtext('public.claim_ingestion_job'));
+    END IF;
+    v_now := extract(epoch FROM clock_timestamp());
+
+    -- Jobs whose lease expired are not running any more, whatever their status says
+    IF p_max_global > 0 AND (
+        SELECT COUNT(*) FROM public.ingestion_jobs WHERE status = 'running' AND lease_expires_at > v_now
+    ) >= p_max_global THEN
+        RETURN;
+    END IF;
+
+    -- Within a priority: the tenant with the fewest running jobs, then the
+    -- one that has waited longest since its last claim (never-served first)
+    SELECT j.* INTO v_job
+    FROM public.ingestion_jobs j
+    LEFT JOIN (
+        SELECT tenant_id, COUNT(*) AS running FROM public.ingestion_jobs
+        WHERE status = 'running' AND lease_expires_at > v_now
+        GROUP BY tenant_id
+    ) r ON r.tenant_id = j.tenant_id
+    LEFT JOIN public.ingestion_tenants t ON t.tenant_id = j.tenant_id
+    WHERE ((j.status = 'queued' AND j.run_after <= v_now) OR (j.status = 'running' AND j.lease_expires_at <= v_now))
+      AND (p_max_per_tenant <= 0 OR COALESCE(r.running, 0) < p_max_per_tenant)
+    ORDER BY j.priority DESC, COALESCE(r.running, 0), t.last_claimed_at NULLS FIRST, j.run_after, j.created_at
+    LIMIT 1
+    FOR UPDATE OF j SKIP LOCKED;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    IF v_job.status = 'running' THEN
+        RAISE WARNING 'Reclaiming job % from % after its lease expired', v_job.id, v_job.lease_owner;
+    END IF;
+
+    INSERT INTO public.ingestion_tenants (tenant_id, last_claimed_at) VALUES (v_job.tenant_id, v_now)
+    ON CONFLICT (tenant_id) DO UPDATE SET last_claimed_at = excluded.last_claimed_at;
+
+    RETURN QUERY UPDATE public.ingestion_jobs
+        SET status = 'running', lease_owner = p_worker_id, lease_expires_at = v_now + p_lease_seconds,
+            claimed_at = v_now, attempts = attempts + 1, updated_at = v_now
+        WHERE id = v_job.id
+        RETURNING *;
+END;
+$$;
+
+-- Extend a lease; false if the worker no longer owns the job
+CREATE OR REPLACE FUNCTION public.heartbeat_ingestion_job(
+    p_job_id UUID, p_worker_id TEXT, p_lease_seconds DOUBLE PRECISION
+) RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_now DOUBLE PRECISION := extract(epoch FROM clock_timestamp());
+BEGIN
+    UPDATE public.ingestion_jobs
+        SET lease_expires_at = v_now + p_lease_seconds, updated_at = v_now
+        WHERE id = p_job_id AND lease_owner = p_worker_id AND status = 'running';
+    RETURN FOUND;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.complete_ingestion_job(p_job_id UUID, p_worker_id TEXT) RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE public.ingestion_jobs
+        SET status = 'completed', lease_owner = NULL, lease_expires_at = NULL, last_error = NULL,
+            updated_at = extract(epoch FROM clock_timestamp())
+        WHERE id = p_job_id AND lease_owner = p_worker_id AND status = 'running';
+    RETURN FOUND;
+END;
+$$;
+
+-- Record a failed attempt: queue a retry after p_retry_delay seconds while attempts remain.
+-- Returns no row if the worker no longer owns the job.
+CREATE OR REPLACE FUNCTION public.fail_ingestion_job(
+    p_job_id UUID, p_worker_id TEXT, p_error TEXT, p_retry_delay DOUBLE PRECISION
+) RETURNS SETOF public.ingestion_jobs
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_now DOUBLE PRECISION := extract(epoch FROM clock_timestamp());
+BEGIN
+    RETURN QUERY UPDATE public.ingestion_jobs
+        SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            run_after = CASE WHEN attempts < max_attempts THEN v_now + p_retry_delay ELSE run_after END,
+            lease_owner = NULL, lease_expires_at = NULL, last_error = p_error, updated_at = v_now
+        WHERE id = p_job_id AND lease_owner = p_worker_id AND status = 'running'
+        RETURNING *;
+END;
+$$;
+
+-- Save the checkpoint of a website's job, stamped with the database clock
+CREATE OR REPLACE FUNCTION public.save_ingestion_checkpoint(p_website_id UUID, p_kind TEXT, p_data JSONB)
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO public.ingestion_checkpoints (website_id, kind, data, updated_at)
+    VALUES (p_website_id, p_kind, p_data, extract(epoch FROM clock_timestamp()))
+    ON CONFLICT (website_id, kind) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at;
+END;
+$$;
+
+-- The saved checkpoint, or NULL if there is none or it is older than p_max_age seconds (NULL: any age)
+CREATE OR REPLACE FUNCTION public.load_ingestion_checkpoint(
+    p_website_id UUID, p_kind TEXT, p_max_age DOUBLE PRECISION
+) RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    SELECT data FROM public.ingestion_checkpoints
+    WHERE website_id = p_website_id AND kind = p_kind
+      AND (p_max_age IS NULL OR updated_at >= extract(epoch FROM clock_timestamp()) - p_max_age);
+$$;
+
+-- Delete finished jobs, checkpoints and tenant history untouched for p_older_than seconds
+CREATE OR REPLACE FUNCTION public.purge_ingestion_jobs(p_older_than DOUBLE PRECISION) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_cutoff DOUBLE PRECISION := extract(epoch FROM clock_timestamp()) - p_older_than;
+    v_deleted INTEGER;
+BEGIN
+    DELETE FROM public.ingestion_jobs WHERE status IN ('completed', 'failed') AND updated_at < v_cutoff;
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+    DELETE FROM public.ingestion_checkpoints WHERE updated_at < v_cutoff;
+    DELETE FROM public.ingestion_tenants t
+        WHERE t.last_claimed_at < v_cutoff
+          AND NOT EXISTS (
+              SELECT 1 FROM public.ingestion_jobs j
+              WHERE j.tenant_id = t.tenant_id AND j.status IN ('queued', 'running')
+          );
+    RETURN v_deleted;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.enqueue_ingestion_job(TEXT, UUID, TEXT, JSONB, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.claim_ingestion_job(TEXT, DOUBLE PRECISION, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.heartbeat_ingestion_job(UUID, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.complete_ingestion_job(UUID, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.fail_ingestion_job(UUID, TEXT, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.save_ingestion_checkpoint(UUID, TEXT, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.load_ingestion_checkpoint(UUID, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.purge_ingestion_jobs(DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+
+-- Add comments for documentation
+COMMENT ON TABLE public.ingestion_jobs IS 'Persistent ingestion job queue with leases, shared by workers on several hosts';
+COMMENT ON COLUMN public.ingestion_jobs.tenant_id IS 'Owner of the website; claims are shared fairly between tenants';
+COMMENT ON COLUMN public.ingestion_jobs.attempts IS 'Claims so far, including reclaims after a lost lease';
+COMMENT ON COLUMN public.ingestion_jobs.run_after IS 'Epoch seconds before which a queued job is not claimed (retry backoff)';
+COMMENT ON COLUMN public.ingestion_jobs.lease_owner IS 'Worker holding the lease of a running job';
+COMMENT ON COLUMN public.ingestion_jobs.lease_expires_at IS 'Epoch seconds after which a running job can be reclaimed';
+COMMENT ON TABLE public.ingestion_tenants IS 'When each tenant last had a job claimed';
+COMMENT ON TABLE public.ingestion_checkpoints IS 'Progress of ingestion jobs per website and job kind, for resuming';
+
+-- Refresh PostgREST schema cache
+NOTIFY pgrst, 'reload schema';
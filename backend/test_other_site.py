@@ -21,14 +21,17 @@ async def test_other_sites():
         
         try:
             result = await scrape_website(url)
-            print(f"✅ Success! Found {len(result)} pages")
-            
-            if result:
-                print(f"   Sample page: {result[0]['url']}")
-                print(f"   Content length: {len(result[0]['content'])} characters")
-                print(f"   Content preview: {result[0]['content'][:100]}...")
-            else:
-                print("   ⚠️  No pages found")
+            try:
+                print(f"✅ Success! Found {len(result)} pages")
+
+                if result:
+                    print(f"   Sample page: {result[0]['url']}")
+                    print(f"   Content length: {len(result[0]['content'])} characters")
+                    print(f"   Content preview: {result[0]['content'][:100]}...")
+                else:
+                    print("   ⚠️  No pages found")
+            finally:
+                result.close()
                 
         except Exception as e:
             print(f"❌ Failed: {e}")
@@ -35,7 +35,11 @@ async def test_scraping():
         # Process embeddings
         print("Processing embeddings...")
         embedding_service = EmbeddingService()
-        total_chunks = await embedding_service.process_website_embeddings(website_id, scraped_content)
+        try:
+            total_chunks = await embedding_service.process_website_embeddings(website_id, scraped_content)
+        finally:
+            # Deletes the temporary file holding page text beyond CRAWL_MEMORY_CAP_MB
+            scraped_content.close()
         print(f"Processed {total_chunks} chunks")
         
         # Update status to completed
@@ -0,0 +1,13 @@
+import os
+
+# Settings are loaded on import and these have no defaults; the unit tests never reach the services
+for name, value in {
+    'SUPABASE_URL': 'http://localhost:54321',
+    'SUPABASE_ANON_KEY': 'test-anon-key',
+    'SUPABASE_SERVICE_ROLE_KEY': 'test-service-role-key',
+    'HUGGINGFACE_API_KEY': 'test-huggingface-key',
+    'QDRANT_URL': 'http://localhost:6333',
+    'QDRANT_API_KEY': 'test-qdrant-key',
+    'SECRET_KEY': 'test-secret-key',
+}.items():
+    os.environ.setdefault(name, value)
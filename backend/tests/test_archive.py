@@ -0,0 +1,130 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.archive import CrawlArchive
+from app.services.extraction import ExtractionPool
+from app.services.reindex import ArchiveReplay
+
+TEXT = 'Shipping and returns policy. ' * 10
+
+
+def _html(title, text):
+    return f'<html><head><title>{title}</title></head><body><p>{text}</p></body></html>'.encode()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = CrawlArchive(str(tmp_path), segment_bytes=1024 * 1024, compression='zlib')
+    yield archive
+    archive.close()
+
+
+def test_pages_round_trip(archive):
+    html = _html('Returns', TEXT)
+    archive.put('site-1', 'https://example.com/returns', TEXT, title='Returns', html=html, etag='"v1"',
+                last_modified='Mon, 05 Oct 2026 10:00:00 GMT')
+    archive.put('site-1', 'https://example.com/rendered', 'Rendered text')
+
+    rendered, returns = archive.read_batch('site-1', '', 10)
+    assert rendered['url'] == 'https://example.com/rendered'
+    assert rendered['html'] is None
+    assert rendered['text'] == 'Rendered text'
+    assert returns['html'] == html
+    assert returns['text'] == TEXT
+    assert (returns['title'], returns['etag']) == ('Returns', '"v1"')
+    assert returns['last_modified'] == 'Mon, 05 Oct 2026 10:00:00 GMT'
+
+
+def test_latest_fetch_replaces_the_page(archive):
+    archive.put('site-1', 'https://example.com/', 'first')
+    archive.put('site-1', 'https://example.com/', 'second')
+
+    assert archive.count('site-1') == 1
+    assert archive.read_batch('site-1', '', 10)[0]['text'] == 'second'
+
+
+def test_identical_content_is_stored_once(archive, tmp_path):
+    archive.put('site-1', 'https://example.com/a', TEXT)
+    archive.close()
+    segments = os.path.join(str(tmp_path), 'segments')
+    size = sum(os.path.getsize(os.path.join(segments, name)) for name in os.listdir(segments))
+
+    archive.put('site-1', 'https://example.com/b', TEXT)
+    archive.put('site-2', 'https://example.com/a', TEXT)
+    archive.close()
+
+    assert sum(os.path.getsize(os.path.join(segments, name)) for name in os.listdir(segments)) == size
+    assert archive.count('site-1') == 2
+
+
+def test_pages_are_read_in_url_batches(archive):
+    for index in range(5):
+        archive.put('site-1', f'https://example.com/{index}', f'page {index}')
+    archive.put('site-2', 'https://example.com/other', 'other site')
+
+    batches = list(archive.iter_pages('site-1', batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [page['text'] for batch in batches for page in batch] == [f'page {index}' for index in range(5)]
+
+
+def test_archive_survives_reopening(archive, tmp_path):
+    archive.put('site-1', 'https://example.com/', TEXT, html=_html('Home', TEXT))
+    archive.close()
+
+    reopened = CrawlArchive(str(tmp_path), segment_bytes=1024 * 1024, compression='zlib')
+    assert reopened.read_batch('site-1', '', 10)[0]['text'] == TEXT
+    reopened.delete_website('site-1')
+    assert reopened.count('site-1') == 0
+
+
+def _replay(archive, manifest=None):
+    async def scenario():
+        pool = ExtractionPool(0)
+        replay = ArchiveReplay(archive, pool, 'site-1')
+        ctx = replay.new_context('https://example.com/', manifest)
+        sink = asyncio.Queue()
+        try:
+            await replay.stream_website(ctx, sink)
+        finally:
+            pool.close()
+        pages = []
+        while not sink.empty():
+            pages.append(sink.get_nowait())
+        return ctx, pages
+
+    return asyncio.run(scenario())
+
+
+def test_replay_extracts_archived_html_again(archive):
+    archive.put('site-1', 'https://example.com/returns', 'stale extraction', title='Old',
+                html=_html('Returns', TEXT))
+    archive.put('site-1', 'https://example.com/app', 'Rendered dashboard help. ' * 10, title='App')
+    archive.put('site-1', 'https://example.com/empty', 'too short')
+
+    ctx, pages = _replay(archive)
+
+    by_url = {page['url']: page for page in pages}
+    assert set(by_url) == {'https://example.com/returns', 'https://example.com/app'}
+    assert by_url['https://example.com/returns']['title'] == 'Returns'
+    assert 'Shipping and returns policy.' in by_url['https://example.com/returns']['content']
+    assert by_url['https://example.com/app']['title'] == 'App'
+    assert ctx.stats.pages_fetched == 3
+
+
+def test_replay_is_limited_to_the_manifest(archive):
+    archive.put('site-1', 'https://example.com/current', TEXT)
+    archive.put('site-1', 'https://example.com/retired', TEXT)
+    manifest = {
+        'https://example.com/current': {'url': 'https://example.com/current', 'chunk_count': 3,
+                                        'lastmod': '2026-09-01'},
+        'https://example.com/missing': {'url': 'https://example.com/missing', 'chunk_count': 1},
+    }
+
+    ctx, pages = _replay(archive, manifest)
+
+    assert [page['url'] for page in pages] == ['https://example.com/current']
+    assert pages[0]['previous_chunk_count'] == 3
+    assert pages[0]['lastmod'] == '2026-09-01'
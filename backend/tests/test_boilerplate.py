@@ -0,0 +1,123 @@
+import time
+
+from app.services.boilerplate import BoilerplateDetector, StreamingBoilerplateFilter, strip_boilerplate
+from app.services.page_store import PageStore
+
+NAV = 'Home | Pricing | Contact'
+FOOTER = 'Copyright 2026 Example Ltd'
+
+
+def _page(url, *lines):
+    return {'url': url, 'content': '\n'.join(lines)}
+
+
+def _pages(count, *shared):
+    return [_page(f'https://example.com/{index}', *shared, f'Body of page {index}') for index in range(count)]
+
+
+def test_detector_needs_the_page_fraction_and_the_page_minimum():
+    detector = BoilerplateDetector(min_page_fraction=0.5, min_pages=3)
+    for page in _pages(2, NAV):
+        detector.observe(page['content'])
+    # Shared by every page, but two pages are too few to tell
+    assert detector.boilerplate_lines() == set()
+
+    for page in _pages(4, FOOTER):
+        detector.observe(page['content'])
+    assert detector.boilerplate_lines() == {FOOTER}
+
+
+def test_detector_counts_a_line_once_per_page():
+    detector = BoilerplateDetector(min_page_fraction=0.5, min_pages=2)
+    detector.observe(f'{NAV}\n{NAV}\nOnly here')
+    detector.observe('Something else')
+
+    assert detector.boilerplate_lines() == set()
+
+
+def test_strip_boilerplate_keeps_one_copy_and_skips_unchanged_pages():
+    pages = _pages(3, NAV) + [{'url': 'https://example.com/old', 'content': '', 'unchanged': True}]
+
+    stripper = strip_boilerplate(pages, min_page_fraction=0.5, min_pages=2)
+
+    assert [page['content'] for page in pages] == [
+        f'{NAV}\nBody of page 0', 'Body of page 1', 'Body of page 2', ''
+    ]
+    assert stripper.stats() == {'boilerplate_lines': 1, 'lines_removed': 2, 'chars_removed': 2 * (len(NAV) + 1)}
+
+
+def test_strip_boilerplate_rewrites_spilled_pages():
+    store = PageStore(memory_cap=1)
+    try:
+        for page in _pages(3, NAV):
+            store.append(page)
+
+        strip_boilerplate(store, min_page_fraction=0.5, min_pages=2)
+
+        assert [page['content'] for page in store] == [f'{NAV}\nBody of page 0', 'Body of page 1', 'Body of page 2']
+    finally:
+        store.close()
+
+
+def test_sample_is_held_back_until_full():
+    boilerplate = StreamingBoilerplateFilter(sample_pages=3, min_page_fraction=0.5, min_pages=2)
+    first, second, third, fourth = _pages(4, NAV)
+
+    assert boilerplate.push(first) == []
+    assert boilerplate.push(second) == []
+    assert boilerplate.push(third) == [first, second, third]
+    assert boilerplate.push(fourth) == [fourth]
+
+    # The first page keeps the canonical copy
+    assert first['content'] == f'{NAV}\nBody of page 0'
+    assert [page['content'] for page in (second, third, fourth)] == [
+        'Body of page 1', 'Body of page 2', 'Body of page 3'
+    ]
+    assert boilerplate.chars_removed == 3 * (len(NAV) + 1)
+
+
+def test_pages_without_content_pass_through():
+    boilerplate = StreamingBoilerplateFilter(sample_pages=3, min_page_fraction=0.5, min_pages=2)
+    unchanged = {'url': 'https://example.com/old', 'content': '', 'unchanged': True}
+
+    assert boilerplate.push(unchanged) == [unchanged]
+
+
+def test_small_crawl_is_flushed_at_the_end():
+    boilerplate = StreamingBoilerplateFilter(sample_pages=10, min_page_fraction=0.5, min_pages=2)
+    pages = _pages(2, NAV)
+    for page in pages:
+        assert boilerplate.push(page) == []
+
+    assert boilerplate.flush() == pages
+    assert pages[1]['content'] == 'Body of page 1'
+
+
+def test_sample_is_released_after_max_wait():
+    boilerplate = StreamingBoilerplateFilter(sample_pages=10, min_page_fraction=0.5, min_pages=2, max_wait=0.01)
+    first = _pages(1, NAV)[0]
+
+    assert boilerplate.push(first) == []
+    assert 0 < boilerplate.wait_remaining() <= 0.01
+    time.sleep(0.02)
+    assert boilerplate.wait_remaining() == 0
+    assert boilerplate.flush() == [first]
+    assert boilerplate.wait_remaining() is None
+
+
+def test_early_release_does_not_keep_a_second_copy_of_late_boilerplate():
+    boilerplate = StreamingBoilerplateFilter(sample_pages=6, min_page_fraction=0.5, min_pages=3, max_wait=0.01)
+    pages = _pages(6, NAV, FOOTER)
+
+    # Released with an empty profile, so both pages keep the shared lines
+    boilerplate.push(pages[0])
+    boilerplate.push(pages[1])
+    time.sleep(0.02)
+    released = boilerplate.flush()
+    assert all(NAV in page['content'] for page in released)
+
+    # The profile learns the shared lines from the later pages
+    for page in pages[2:]:
+        assert boilerplate.push(page) == [page]
+
+    assert all(NAV not in page['content'] and FOOTER not in page['content'] for page in pages[2:])
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.services.crawl_context import CrawlContext
+
+
+def test_checkpoint_restore_round_trip():
+    async def scenario():
+        ctx = CrawlContext('https://example.com/', max_pages=100)
+        ctx.frontier.add('https://example.com/', depth=0)
+
+        # One page finished, one still being fetched, one never started
+        url, depth = await ctx.next_url()
+        ctx.mark_visited(url)
+        await ctx.url_done(url, depth, ['https://example.com/docs', 'https://example.com/pricing'])
+        in_flight, _ = await ctx.next_url()
+        ctx.mark_visited(in_flight)
+        return ctx, in_flight
+
+    ctx, in_flight = asyncio.run(scenario())
+    checkpoint = ctx.checkpoint()
+
+    restored = CrawlContext('https://example.com/', max_pages=100)
+    restored.restore(checkpoint, completed_pages=1)
+
+    assert restored.visited_urls == {'https://example.com/'}
+    assert restored.page_count == 1
+    # The interrupted fetch is done again, the finished page is not
+    queued = {url for url, _ in restored.frontier.snapshot()}
+    assert queued == {'https://example.com/docs', 'https://example.com/pricing'}
+    assert in_flight in queued
+    assert not restored.frontier.add('https://example.com/')
+    assert restored.checkpoint()['visited'] == checkpoint['visited']
+
+
+def test_restore_keeps_depths():
+    ctx = CrawlContext('https://example.com/', max_pages=10)
+    ctx.restore({'visited': [], 'frontier': [('https://example.com/a/b', 2)]})
+
+    assert ctx.frontier.pop() == ('https://example.com/a/b', 2)
+
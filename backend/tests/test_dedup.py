@@ -0,0 +1,64 @@
+import pytest
+
+from app.services import dedup
+from app.services.dedup import NearDuplicateIndex, hamming_distance, simhash
+
+ARTICLE = (
+    "Our support team answers questions about billing, account settings and integrations. "
+    "You can reach us by email or chat on weekdays between nine and five. Most questions are "
+    "answered within one business day, and urgent issues with payments are handled first. "
+    "The help centre also has guides for installing the app, exporting reports and managing users."
+)
+
+
+def test_simhash_ignores_case_and_punctuation():
+    assert simhash(ARTICLE) == simhash(ARTICLE.upper().replace(',', ''))
+
+
+def test_simhash_separates_unrelated_text():
+    other = "Pricing starts with a free plan for small teams and grows with the number of seats you need."
+
+    assert hamming_distance(simhash(ARTICLE), simhash(other)) > 10
+
+
+@pytest.fixture
+def fingerprints(monkeypatch):
+    """Texts are taken as hex fingerprints, so distances are exact"""
+    monkeypatch.setattr(dedup, 'simhash', lambda text: int(text, 16))
+
+
+@pytest.mark.parametrize('flipped_bits', [
+    [0],
+    [0, 1, 2],
+    [5, 21, 37],  # one flip in each of three bands
+    [60, 61, 62, 63],
+])
+def test_index_finds_fingerprints_within_max_distance(fingerprints, flipped_bits):
+    index = NearDuplicateIndex(max_distance=4)
+    original = 0x0123456789ABCDEF
+    near = original
+    for bit in flipped_bits:
+        near ^= 1 << bit
+
+    assert not index.is_duplicate(f'{original:x}')
+    assert index.is_duplicate(f'{near:x}')
+    assert index.stats() == {'checked': 2, 'pruned': 1}
+
+
+def test_index_keeps_fingerprints_beyond_max_distance(fingerprints):
+    index = NearDuplicateIndex(max_distance=3)
+    original = 0x0123456789ABCDEF
+    # One flip in every band: no band matches exactly
+    far = original ^ (1 << 0) ^ (1 << 16) ^ (1 << 32) ^ (1 << 48)
+
+    assert not index.is_duplicate(f'{original:x}')
+    assert not index.is_duplicate(f'{far:x}')
+    assert index.pruned == 0
+
+
+def test_index_flags_repeated_text():
+    index = NearDuplicateIndex(max_distance=3)
+
+    assert not index.is_duplicate(ARTICLE)
+    assert index.is_duplicate(ARTICLE)
+    assert not index.is_duplicate("To install the desktop app, download the installer and sign in.")
@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services import embedding_cache
+from app.services.embedding_cache import EmbeddingCache, QueryEmbeddingCache, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock that moves one second per call, so LRU order is exact"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(embedding_cache.time, 'time', lambda: float(next(ticks)))
+
+
+def _vector(value):
+    return np.full(4, value, dtype=np.float32)
+
+
+def test_normalize_text():
+    assert normalize_text('  Opening\thours\n\n are  9-5 ') == 'Opening hours are 9-5'
+
+
+def test_round_trip_by_model_and_normalized_text(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'cache.db'), max_bytes=0)
+    cache.put_many('model-a', ['Opening hours'], [_vector(0.5)])
+
+    hit, miss, other_model = (
+        cache.get_many('model-a', ['Opening  hours ', 'Prices'])
+        + cache.get_many('model-b', ['Opening hours'])
+    )
+    assert hit.dtype == np.float32
+    np.testing.assert_allclose(hit, _vector(0.5))
+    assert miss is None
+    assert other_model is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_entries_survive_a_new_instance(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    EmbeddingCache(path, max_bytes=0).put_many('model', ['text'], [_vector(1.0)])
+
+    cache = EmbeddingCache(path, max_bytes=0)
+    np.testing.assert_allclose(cache.get_many('model', ['text'])[0], _vector(1.0))
+    assert cache.stats()['bytes'] == 8
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    # Each float16 vector takes 8 bytes
+    cache = EmbeddingCache(str(tmp_path / 'cache.db'), max_bytes=24)
+    for text in ['a', 'b', 'c']:
+        cache.put_many('model', [text], [_vector(1.0)])
+    cache.get_many('model', ['a'])
+
+    cache.put_many('model', ['d'], [_vector(1.0)])
+
+    found = cache.get_many('model', ['a', 'b', 'c', 'd'])
+    assert [vector is not None for vector in found] == [True, False, False, True]
+    stats = cache.stats()
+    assert stats['evictions'] == 2
+    assert stats['bytes'] <= 24 * 0.9
+
+
+class FakeModel:
+    """Embeds a query as its length; `release` gates when calls return"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def embed(self, query):
+        self.calls.append(query)
+        await self.release.wait()
+        if query == 'fail':
+            raise RuntimeError('model unavailable')
+        return np.full(4, len(query), dtype=np.float32)
+
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_query_cache_answers_repeats_until_they_expire(monotonic):
+    async def scenario():
+        cache = QueryEmbeddingCache(max_entries=10, ttl=60)
+        model = FakeModel()
+        first = await cache.get_or_embed('opening hours', model.embed)
+        again = await cache.get_or_embed('  opening   hours ', model.embed)
+        assert again is first
+        assert not first.flags.writeable
+
+        monotonic[0] += 61
+        await cache.get_or_embed('opening hours', model.embed)
+        return model.calls, cache.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert calls == ['opening hours', 'opening hours']
+    assert (stats['hits'], stats['misses'], stats['expired']) == (1, 2, 1)
+
+
+def test_query_cache_evicts_the_least_recently_used(monotonic):
+    async def scenario():
+        cache = QueryEmbeddingCache(max_entries=2, ttl=60)
+        model = FakeModel()
+        for query in ['a', 'b', 'a', 'c', 'a', 'b']:
+            await cache.get_or_embed(query, model.embed)
+        return model.calls, cache.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert calls == ['a', 'b', 'c', 'b']
+    assert stats['evictions'] == 2
+
+
+def test_concurrent_misses_share_one_call():
+    async def scenario():
+        cache = QueryEmbeddingCache(max_entries=10, ttl=60)
+        model = FakeModel()
+        model.release.clear()
+        waiters = [asyncio.create_task(cache.get_or_embed('pricing', model.embed)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        # One waiter giving up does not cancel the call the others wait for
+        waiters[0].cancel()
+        model.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return model.calls, results, cache.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == ['pricing']
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1] is results[2]
+    assert (stats['misses'], stats['coalesced']) == (1, 2)
+
+
+def test_failed_call_is_not_cached():
+    async def scenario():
+        cache = QueryEmbeddingCache(max_entries=10, ttl=60)
+        model = FakeModel()
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.get_or_embed('fail', model.embed)
+        return model.calls
+
+    assert asyncio.run(scenario()) == ['fail', 'fail']
+
+
+def test_without_coalescing_every_miss_calls_the_model():
+    async def scenario():
+        cache = QueryEmbeddingCache(max_entries=10, ttl=60, coalesce=False)
+        model = FakeModel()
+        model.release.clear()
+        waiters = [asyncio.create_task(cache.get_or_embed('pricing', model.embed)) for _ in range(2)]
+        await asyncio.sleep(0)
+        model.release.set()
+        await asyncio.gather(*waiters)
+        return model.calls
+
+    assert asyncio.run(scenario()) == ['pricing', 'pricing']
@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.frontier import URLFrontier, normalize_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://Example.COM/Docs', 'https://example.com/Docs'),
+    ('https://example.com:443/a', 'https://example.com/a'),
+    ('http://example.com:80/a', 'http://example.com/a'),
+    ('https://example.com:8443/a', 'https://example.com:8443/a'),
+    ('https://example.com', 'https://example.com/'),
+    ('https://example.com/docs/', 'https://example.com/docs'),
+    ('https://example.com//docs//intro', 'https://example.com/docs/intro'),
+    ('https://example.com/a#section', 'https://example.com/a'),
+    ('https://example.com/a?b=2&a=1', 'https://example.com/a?a=1&b=2'),
+    ('https://example.com/a?utm_source=x&gclid=y&page=2', 'https://example.com/a?page=2'),
+    ('  https://example.com/a  ', 'https://example.com/a'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_frontier_deduplicates_equivalent_urls():
+    frontier = URLFrontier()
+
+    assert frontier.add('https://example.com/docs/')
+    assert not frontier.add('HTTPS://EXAMPLE.com:443/docs#top')
+    assert 'https://example.com/docs' in frontier
+    assert len(frontier) == 1
+    # Queued as discovered; relative links on the page need the trailing slash
+    assert frontier.pop() == ('https://example.com/docs/', 0)
+
+
+def test_frontier_pops_valuable_urls_first():
+    frontier = URLFrontier()
+    frontier.add('https://example.com/tag/news', depth=1)
+    frontier.add('https://example.com/docs/install', depth=1)
+
+    assert frontier.pop() == ('https://example.com/docs/install', 1)
+    assert frontier.pop() == ('https://example.com/tag/news', 1)
+    assert frontier.pop() is None
+
+
+def test_full_frontier_counts_dropped_urls():
+    frontier = URLFrontier(max_size=1)
+    frontier.add('https://example.com/a')
+
+    assert not frontier.add('https://example.com/b')
+    assert frontier.dropped == 1
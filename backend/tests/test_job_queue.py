@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.job_queue import JobStatus, SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'JOB_MAX_RUNNING_PER_TENANT', 0)
+    monkeypatch.setattr(settings, 'JOB_MAX_RUNNING_GLOBAL', 0)
+    return SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_enqueue_returns_the_active_job_for_a_website(queue):
+    first = run(queue.enqueue('scrape', 'site-1', {'url': 'https://example.com'}))
+    second = run(queue.enqueue('scrape', 'site-1'))
+
+    assert second.id == first.id
+    assert second.payload == {'url': 'https://example.com'}
+    assert second.tenant_id == 'site-1'
+
+
+def test_claim_leases_a_job_to_one_worker(queue):
+    job = run(queue.enqueue('scrape', 'site-1'))
+
+    claimed = run(queue.claim('worker-a', 60))
+    assert claimed.id == job.id
+    assert claimed.status == JobStatus.RUNNING
+    assert claimed.lease_owner == 'worker-a'
+    assert claimed.attempts == 1
+    assert run(queue.claim('worker-b', 60)) is None
+
+    assert run(queue.heartbeat(job.id, 'worker-a', 60))
+    assert not run(queue.heartbeat(job.id, 'worker-b', 60))
+
+    run(queue.complete(job.id, 'worker-a'))
+    assert run(queue.get(job.id)).status == JobStatus.COMPLETED
+    assert run(queue.active_job('site-1')) is None
+
+
+def test_failed_job_is_retried_after_backoff(queue):
+    job = run(queue.enqueue('scrape', 'site-1', max_attempts=2))
+    run(queue.claim('worker-a', 60))
+
+    failed = run(queue.fail(job.id, 'worker-a', 'timeout'))
+    assert failed.status == JobStatus.QUEUED
+    assert failed.last_error == 'timeout'
+    assert failed.run_after > time.time()
+    assert failed.lease_owner is None
+    assert run(queue.claim('worker-a', 60)) is None
+
+    # The backoff is over
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET run_after = 0 WHERE id = ?", (job.id,))
+    retried = run(queue.claim('worker-b', 60))
+    assert retried.id == job.id
+    assert retried.attempts == 2
+
+
+def test_job_fails_for_good_once_attempts_run_out(queue):
+    job = run(queue.enqueue('scrape', 'site-1', max_attempts=1))
+    run(queue.claim('worker-a', 60))
+
+    failed = run(queue.fail(job.id, 'worker-a', 'boom'))
+    assert failed.status == JobStatus.FAILED
+    assert not failed.retries_left
+    assert run(queue.claim('worker-a', 60)) is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job = run(queue.enqueue('scrape', 'site-1'))
+    run(queue.claim('worker-a', 0))
+
+    reclaimed = run(queue.claim('worker-b', 60))
+    assert reclaimed.id == job.id
+    assert reclaimed.lease_owner == 'worker-b'
+    assert reclaimed.attempts == 2
+    # The first worker lost the job and must not finish it
+    assert not run(queue.heartbeat(job.id, 'worker-a', 60))
+    run(queue.complete(job.id, 'worker-a'))
+    assert run(queue.get(job.id)).status == JobStatus.RUNNING
+
+
+def test_fail_after_losing_the_lease_changes_nothing(queue):
+    job = run(queue.enqueue('scrape', 'site-1'))
+    run(queue.claim('worker-a', 0))
+    run(queue.claim('worker-b', 60))
+
+    assert run(queue.fail(job.id, 'worker-a', 'timeout')) is None
+    current = run(queue.get(job.id))
+    assert current.status == JobStatus.RUNNING
+    assert current.lease_owner == 'worker-b'
+    assert current.last_error is None
+
+
+def test_claims_alternate_between_tenants(queue):
+    for index in range(3):
+        run(queue.enqueue('scrape', f'big-{index}', tenant_id='big'))
+    run(queue.enqueue('scrape', 'small-0', tenant_id='small'))
+
+    tenants = [run(queue.claim('worker', 60)).tenant_id for _ in range(4)]
+    assert tenants == ['big', 'small', 'big', 'big']
+
+
+def test_claims_respect_the_running_limits(queue, monkeypatch):
+    monkeypatch.setattr(settings, 'JOB_MAX_RUNNING_PER_TENANT', 1)
+    run(queue.enqueue('scrape', 'a-0', tenant_id='a'))
+    run(queue.enqueue('scrape', 'a-1', tenant_id='a'))
+    run(queue.enqueue('scrape', 'b-0', tenant_id='b'))
+
+    assert run(queue.claim('worker', 60)).tenant_id == 'a'
+    assert run(queue.claim('worker', 60)).tenant_id == 'b'
+    assert run(queue.claim('worker', 60)) is None
+
+    monkeypatch.setattr(settings, 'JOB_MAX_RUNNING_PER_TENANT', 0)
+    monkeypatch.setattr(settings, 'JOB_MAX_RUNNING_GLOBAL', 2)
+    assert run(queue.claim('worker', 60)) is None
+
+
+def test_priority_goes_before_fairness(queue):
+    run(queue.enqueue('scrape', 'a-0', tenant_id='a'))
+    run(queue.enqueue('scrape', 'b-0', tenant_id='b', priority=1))
+
+    assert run(queue.claim('worker', 60)).tenant_id == 'b'
+
+
+def test_checkpoints_round_trip_and_expire(queue):
+    run(queue.save_checkpoint('site-1', 'scrape', {'visited': ['https://example.com']}))
+
+    assert run(queue.load_checkpoint('site-1', 'scrape')) == {'visited': ['https://example.com']}
+    assert run(queue.load_checkpoint('site-1', 'scrape', max_age=-1)) is None
+    run(queue.clear_checkpoint('site-1', 'scrape'))
+    assert run(queue.load_checkpoint('site-1', 'scrape')) is None
+
+
+def test_purge_deletes_only_old_finished_jobs(queue):
+    done = run(queue.enqueue('scrape', 'site-1'))
+    run(queue.claim('worker', 60))
+    run(queue.complete(done.id, 'worker'))
+    waiting = run(queue.enqueue('scrape', 'site-2'))
+
+    assert run(queue.purge(3600)) == 0
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET updated_at = 0")
+    assert run(queue.purge(3600)) == 1
+    assert run(queue.get(done.id)) is None
+    assert run(queue.get(waiting.id)).status == JobStatus.QUEUED
@@ -0,0 +1,73 @@
+from app.services.page_store import PageStore
+
+
+def _page(url, content):
+    return {'url': url, 'title': url, 'content': content}
+
+
+def test_pages_beyond_the_cap_are_spilled_and_read_back():
+    store = PageStore(memory_cap=10)
+    try:
+        store.append(_page('a', 'x' * 10))
+        store.append(_page('b', 'y' * 5))
+        store.append(_page('c', ''))
+
+        assert store.spilled == 1
+        assert store.memory_bytes == 10
+        assert [page['content'] for page in store] == ['x' * 10, 'y' * 5, '']
+        assert store[1] == _page('b', 'y' * 5)
+    finally:
+        store.close()
+
+
+def test_cap_counts_encoded_bytes():
+    store = PageStore(memory_cap=8)
+    try:
+        store.append(_page('a', 'é' * 4))
+        store.append(_page('b', 'é'))
+
+        assert store.memory_bytes == 8
+        assert store.spilled == 1
+    finally:
+        store.close()
+
+
+def test_content_rewritten_while_iterating_is_kept():
+    store = PageStore(memory_cap=4)
+    try:
+        store.append(_page('a', 'abcd'))
+        store.append(_page('b', 'spilled text'))
+
+        for page in store:
+            page['content'] = page['content'][:2]
+
+        assert [page['content'] for page in store] == ['ab', 'sp']
+        assert store.memory_bytes == 2
+    finally:
+        store.close()
+
+
+def test_retain_keeps_order_and_frees_dropped_pages():
+    store = PageStore(memory_cap=6)
+    try:
+        store.append(_page('a', 'aaa'))
+        store.append(_page('b', 'bbb'))
+        store.append(_page('c', 'ccc'))
+        for page in store:
+            page['content'] = page['content'][:1]
+
+        store.retain([2, 0])
+
+        assert [page['url'] for page in store] == ['c', 'a']
+        assert [page['content'] for page in store] == ['c', 'a']
+        assert store.memory_bytes == 1
+    finally:
+        store.close()
+
+
+def test_close_without_spilling():
+    store = PageStore(memory_cap=0)
+    store.append(_page('a', 'text'))
+
+    store.close()
+    assert store.spilled == 0
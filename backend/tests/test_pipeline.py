@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.pipeline import IngestionPipeline
+from app.services.scraper import WebsiteScraper
+
+WORDS = ['billing', 'accounts', 'exports', 'reports', 'shipping', 'returns', 'pricing', 'support']
+
+SITE = {
+    '/': ('Home', ['a', 'b']),
+    '/a': ('Alpha', ['c']),
+    '/b': ('Beta', []),
+    '/c': ('Gamma', []),
+}
+
+
+def _html(site, path):
+    title, hrefs = site[path]
+    text = ' '.join(f'{title} {word} {index}' for index, word in enumerate(WORDS * 3))
+    links = ''.join(f'<a href="{href}">{href}</a>' for href in hrefs)
+    return f'<html><head><title>{title}</title></head><body><p>{text}</p>{links}</body></html>'
+
+
+class FakeVectorStore:
+    batch_size = 1
+
+
+class FakeEmbeddings:
+    """Chunks each page into two pieces and records the chunks it stores"""
+
+    def __init__(self, fail_url=None):
+        self.vector_store = FakeVectorStore()
+        self.fail_url = fail_url
+        self.stored = []
+
+    async def ensure_collection(self, website_id):
+        pass
+
+    def chunk_page(self, page, near_duplicates=None):
+        half = len(page['content']) // 2
+        texts = [page['content'][:half], page['content'][half:]]
+        return [{'url': page['url'], 'title': page['title'], 'text': text, 'chunk_index': index,
+                 'total_chunks': len(texts)} for index, text in enumerate(texts)]
+
+    async def embed_texts(self, texts):
+        return [np.zeros(4) for _ in texts]
+
+    async def upsert_chunks(self, website_id, chunks, vectors):
+        if any(chunk['url'] == self.fail_url for chunk in chunks):
+            raise RuntimeError('vector store unavailable')
+        self.stored.extend((chunk['url'], chunk['chunk_index']) for chunk in chunks)
+        return len(chunks)
+
+    async def finish_page(self, website_id, page, chunk_count):
+        page['chunk_count'] = chunk_count
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Pipeline settings for a deterministic run, and the paths the mock site served"""
+    for name, value in {
+        'EXTRACTION_WORKERS': 0, 'SCRAPER_CONCURRENCY': 1, 'SCRAPER_RESPECT_ROBOTS': False,
+        'SITEMAP_DISCOVERY_ENABLED': False, 'DYNAMIC_RENDERING_ENABLED': False,
+        'BOILERPLATE_STRIPPING': False, 'NEAR_DUPLICATE_DETECTION': False,
+        'PIPELINE_EMBED_BATCH_SIZE': 1, 'PIPELINE_EMBED_CONCURRENCY': 1, 'PIPELINE_UPSERT_CONCURRENCY': 1,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    return []
+
+
+def _run(fetched, embeddings, checkpoint=None, site=SITE, manifest=None):
+    """Ingest the mock site, returning the pipeline and the last checkpoint it saved"""
+    def serve(request):
+        fetched.append(request.url.path)
+        if request.url.path not in site:
+            return httpx.Response(404)
+        return httpx.Response(200, text=_html(site, request.url.path), headers={'content-type': 'text/html'})
+
+    saved = {}
+
+    async def on_checkpoint(data):
+        saved['checkpoint'] = data
+
+    async def scenario():
+        crawler = WebsiteScraper()
+        crawler._client = httpx.AsyncClient(transport=httpx.MockTransport(serve))
+        pipeline = IngestionPipeline('site-1', 'https://example.com/', manifest, crawler=crawler,
+                                     embeddings=embeddings, checkpoint=checkpoint, on_checkpoint=on_checkpoint)
+        try:
+            await pipeline.run()
+        finally:
+            await crawler.close()
+        return pipeline
+
+    try:
+        return asyncio.run(scenario()), saved.get('checkpoint')
+    except RuntimeError:
+        return None, saved.get('checkpoint')
+
+
+def test_pipeline_indexes_every_page(fetched):
+    embeddings = FakeEmbeddings()
+    pipeline, _ = _run(fetched, embeddings)
+
+    assert sorted(fetched) == ['/', '/a', '/b', '/c']
+    assert pipeline.total_chunks == 8
+    assert {page['url'] for page in pipeline.pages} == {f'https://example.com{path}' for path in SITE}
+    assert all(page['chunk_count'] == 2 for page in pipeline.pages)
+
+
+def test_resume_skips_pages_indexed_before_the_failure(fetched):
+    failed, checkpoint = _run(fetched, FakeEmbeddings(fail_url='https://example.com/b'))
+    assert failed is None
+    indexed = {page['url'] for page in checkpoint['pages']}
+    # Chunks are stored in order, so the pages queued before the failing one were finished
+    assert {'https://example.com/', 'https://example.com/a'} <= indexed
+    assert 'https://example.com/b' not in indexed
+
+    # Checkpoints are stored as JSON
+    checkpoint = json.loads(json.dumps(checkpoint))
+    refetched = []
+    embeddings = FakeEmbeddings()
+    pipeline, _ = _run(refetched, embeddings, checkpoint=checkpoint)
+
+    assert {f'https://example.com{path}' for path in refetched}.isdisjoint(indexed)
+    assert '/b' in refetched
+    assert {page['url'] for page in pipeline.pages} == {f'https://example.com{path}' for path in SITE}
+    assert pipeline.total_chunks == 8
+    # Only the pages that were not finished are embedded again
+    assert {url for url, _ in embeddings.stored} == {f'https://example.com{path}' for path in SITE} - indexed
+
+
+def test_indexed_page_that_became_a_near_duplicate_is_reported_for_pruning(fetched, monkeypatch):
+    monkeypatch.setattr(settings, 'NEAR_DUPLICATE_DETECTION', True)
+    # /b now repeats the home page; it was indexed with its own text before
+    site = {**SITE, '/b': ('Home', [])}
+    manifest = {'https://example.com/b': {'url': 'https://example.com/b', 'content_hash': 'old', 'chunk_count': 2}}
+
+    pipeline, _ = _run(fetched, FakeEmbeddings(), site=site, manifest=manifest)
+
+    assert 'https://example.com/b' not in {page['url'] for page in pipeline.pages}
+    assert pipeline.dropped_manifest_urls() == {'https://example.com/b'}
+    assert pipeline.crawl.removed_manifest_urls() == set()
+    assert pipeline.checkpoint()['dropped'] == ['https://example.com/b']
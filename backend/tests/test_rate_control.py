@@ -0,0 +1,195 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import rate_control
+from app.services.rate_control import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    HostRateController,
+    HostRateLimits,
+    TokenBucket,
+    jittered_backoff,
+    parse_retry_after,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual monotonic clock for the rate control module"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_control.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_jittered_backoff_stays_between_half_and_full_delay():
+    for attempt in range(1, 8):
+        delay = min(10.0, 0.5 * 2 ** (attempt - 1))
+        assert delay / 2 <= jittered_backoff(attempt, 0.5, 10.0) <= delay
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_token_bucket_allows_a_burst_then_spaces_requests():
+    async def scenario():
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        burst = time.monotonic() - started
+        await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(scenario())
+    assert burst < 0.04
+    assert total >= 0.04
+
+
+def test_paused_bucket_waits_even_without_a_rate_limit():
+    async def scenario():
+        bucket = TokenBucket(rate=0)
+        bucket.pause(0.05)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.04
+
+
+def test_limiter_grows_additively_and_halves_on_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, maximum=8)
+    for _ in range(4):
+        limiter.on_success(0.2)
+    # About one slot per round of requests
+    grown = limiter.limit
+    assert 4.8 < grown < 5
+
+    limiter.on_overload()
+    assert limiter.limit == pytest.approx(grown / 2)
+    # More overload signals from the same round count once
+    limiter.on_overload()
+    assert limiter.limit == pytest.approx(grown / 2)
+
+
+def test_limiter_treats_slow_responses_as_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, latency_tolerance=3.0)
+    limiter.on_success(0.2)
+    for _ in range(10):
+        limiter.on_success(5.0)
+
+    assert limiter.limit < 4
+
+
+def test_limiter_caps_requests_in_flight():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial=2)
+        await limiter.acquire()
+        await limiter.acquire()
+        third = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not third.done()
+
+        await limiter.release()
+        await asyncio.wait_for(third, timeout=1)
+        assert limiter.in_flight == 2
+
+    asyncio.run(scenario())
+
+
+def test_throttled_response_pauses_the_host(clock):
+    controller = HostRateController('example.com', rate=0, burst=1, initial_concurrency=4,
+                                    max_concurrency=8, latency_tolerance=3.0)
+
+    assert controller.record(200, 0.1) is None
+    assert controller.record(429, 0.1, retry_after='7') == 7.0
+    assert controller.record(503, 0.1, backoff=2.0) == 2.0
+    assert controller.record(429, 0.1, retry_after='600', max_delay=30.0) == 30.0
+    assert controller.throttled == 3
+    assert controller.bucket._paused_until == clock[0] + 30.0
+
+
+def test_host_limits_follow_the_crawl_delay():
+    hosts = HostRateLimits(default_rate=0, default_burst=1, initial_concurrency=2, max_concurrency=4,
+                           latency_tolerance=3.0)
+
+    controller = hosts.get('example.com')
+    assert controller.bucket.rate == 0
+    assert hosts.get('example.com', crawl_delay=2.0) is controller
+    assert controller.bucket.rate == 0.5
+
+
+def test_host_limits_evict_idle_hosts():
+    hosts = HostRateLimits(default_rate=0, default_burst=1, initial_concurrency=2, max_concurrency=4,
+                           latency_tolerance=3.0, max_hosts=2)
+    busy = hosts.get('busy.example')
+    busy.limiter.in_flight = 1
+    hosts.get('a.example')
+    hosts.get('b.example')
+
+    assert hosts.get('busy.example') is busy
+    assert 'a.example' not in hosts._hosts
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('embeddings', failure_threshold=2, reset_timeout=30)
+    breaker.check()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    # A success in between resets the count
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_circuit_lets_one_trial_through(clock):
+    breaker = CircuitBreaker('embeddings', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock[0] += 30
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+
+def test_failed_trial_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker('embeddings', failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock[0] += 30
+    breaker.check()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_abandoned_trial_is_replaced_after_the_reset_timeout(clock):
+    breaker = CircuitBreaker('embeddings', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    breaker.check()
+
+    # The trial call was cancelled and never reported back
+    clock[0] += 30
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
@@ -0,0 +1,77 @@
+import asyncio
+
+from app.services.scheduler import LANE_PRIORITY, FairShareScheduler
+
+
+async def _serve_order(scheduler, requests):
+    """Queue `requests` ((tenant, lane) pairs) behind a held slot and record the order they are granted in"""
+    order = []
+
+    async def request(tenant, lane):
+        async with scheduler.slot(tenant, lane=lane):
+            order.append(tenant)
+            await asyncio.sleep(0)
+
+    await scheduler.acquire('holder')
+    tasks = [asyncio.create_task(request(tenant, lane)) for tenant, lane in requests]
+    await asyncio.sleep(0)
+    scheduler.release('holder')
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_busy_tenant_does_not_starve_others():
+    scheduler = FairShareScheduler(capacity=1)
+    requests = [('big', 0)] * 6 + [('small', 0)] * 2
+
+    order = asyncio.run(_serve_order(scheduler, requests))
+
+    assert order[:4] == ['big', 'small', 'big', 'small']
+    assert order.count('big') == 6
+
+
+def test_priority_lane_is_served_first():
+    scheduler = FairShareScheduler(capacity=1)
+    requests = [('normal', 0)] * 3 + [('new-site', LANE_PRIORITY)]
+
+    order = asyncio.run(_serve_order(scheduler, requests))
+
+    assert order[0] == 'new-site'
+
+
+def test_per_tenant_cap_leaves_slots_for_others():
+    async def scenario():
+        scheduler = FairShareScheduler(capacity=4, per_tenant_cap=2)
+        for _ in range(2):
+            await scheduler.acquire('big')
+
+        blocked = asyncio.create_task(scheduler.acquire('big'))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        assert scheduler.waiting() == 1
+
+        await asyncio.wait_for(scheduler.acquire('small'), timeout=1)
+        assert scheduler.in_use == 3
+
+        scheduler.release('big')
+        await asyncio.wait_for(blocked, timeout=1)
+        assert scheduler.in_use == 3
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        scheduler = FairShareScheduler(capacity=1)
+        await scheduler.acquire('a')
+        waiter = asyncio.create_task(scheduler.acquire('b'))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.waiting() == 0
+
+        scheduler.release('a')
+        assert scheduler.in_use == 0
+
+    asyncio.run(scenario())
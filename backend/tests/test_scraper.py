@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.crawl_context import CrawlContext
+from app.services.scraper import WebsiteScraper
+
+
+def _html(text, *hrefs):
+    links = ''.join(f'<a href="{href}">{href}</a>' for href in hrefs)
+    return f'<html><head><title>{text}</title></head><body><p>{text} ' + 'content ' * 30 + f'</p>{links}</body></html>'
+
+
+# Serves directories only with their trailing slash, like many static hosts
+SITE = {
+    '/': _html('Home', 'docs/', 'guide'),
+    '/docs/': _html('Docs', 'intro'),
+    '/docs/intro': _html('Introduction'),
+    '/guide/': _html('Guide', 'start'),
+    '/guide/start': _html('Getting started'),
+}
+
+
+def _serve(request):
+    if request.url.path == '/guide':
+        return httpx.Response(301, headers={'location': '/guide/'})
+    if request.url.path not in SITE:
+        return httpx.Response(404)
+    return httpx.Response(200, text=SITE[request.url.path], headers={'content-type': 'text/html'})
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    monkeypatch.setattr(settings, 'EXTRACTION_WORKERS', 0)
+    monkeypatch.setattr(settings, 'SCRAPER_RESPECT_ROBOTS', False)
+    monkeypatch.setattr(settings, 'SITEMAP_DISCOVERY_ENABLED', False)
+    monkeypatch.setattr(settings, 'DYNAMIC_RENDERING_ENABLED', False)
+    monkeypatch.setattr(settings, 'BOILERPLATE_STRIPPING', False)
+    scraper = WebsiteScraper()
+    scraper._client = httpx.AsyncClient(transport=httpx.MockTransport(_serve), follow_redirects=True)
+    return scraper
+
+
+def _crawl(scraper, url):
+    async def scenario():
+        try:
+            pages = await scraper.scrape_website(url)
+            try:
+                return {page['url'] for page in pages}
+            finally:
+                pages.close()
+        finally:
+            await scraper.close()
+
+    return asyncio.run(scenario())
+
+
+def test_relative_links_resolve_against_the_directory_url(scraper):
+    urls = _crawl(scraper, 'https://example.com/')
+
+    # Pages are keyed by their canonical URL, but fetched with the slash their links depend on
+    assert 'https://example.com/docs' in urls
+    assert 'https://example.com/docs/intro' in urls
+
+
+def test_relative_links_resolve_against_the_redirect_target(scraper):
+    urls = _crawl(scraper, 'https://example.com/')
+
+    assert 'https://example.com/guide/start' in urls
+
+
+def test_base_domain_is_normalized():
+    assert CrawlContext('https://Example.com:443/', max_pages=1).base_domain == 'example.com'
+    assert CrawlContext('http://example.com:8080/', max_pages=1).base_domain == 'example.com:8080'
+
+
+def test_failed_site_gets_an_empty_page_store(scraper, monkeypatch):
+    async def fail(url):
+        raise RuntimeError('unreachable')
+
+    monkeypatch.setattr(scraper, 'scrape_website', fail)
+    scraped = asyncio.run(scraper.scrape_websites(['https://example.com/']))
+
+    pages = scraped['https://example.com/']
+    assert len(pages) == 0
+    pages.close()
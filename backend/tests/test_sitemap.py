@@ -0,0 +1,124 @@
+import asyncio
+import gzip
+
+import httpx
+
+from app.services.sitemap import default_sitemap_url, fetch_robots, iter_sitemap_urls
+
+ROBOTS = """\
+User-agent: special-bot
+Crawl-delay: 10
+
+User-agent: other-bot
+User-agent: *
+Disallow: /private/
+Crawl-delay: 0.5  # seconds
+
+Sitemap: https://example.com/sitemap_index.xml
+"""
+
+SITEMAP_INDEX = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/pages.xml</loc></sitemap>
+  <sitemap><loc>https://example.com/posts.xml.gz</loc></sitemap>
+  <sitemap><loc>https://example.com/missing.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+PAGES = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc> https://example.com/about </loc><lastmod>2026-09-01</lastmod></url>
+  <url><loc>https://example.com/pricing</loc></url>
+  <url><lastmod>2026-09-02</lastmod></url>
+</urlset>
+"""
+
+POSTS = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/blog/launch</loc><lastmod>2026-10-01T09:00:00+00:00</lastmod></url>
+</urlset>
+"""
+
+
+def _serve(request):
+    files = {
+        '/robots.txt': ROBOTS.encode(),
+        '/sitemap_index.xml': SITEMAP_INDEX.encode(),
+        '/pages.xml': PAGES.encode(),
+        '/posts.xml.gz': gzip.compress(POSTS.encode()),
+    }
+    if request.url.path not in files:
+        return httpx.Response(404)
+    return httpx.Response(200, content=files[request.url.path])
+
+
+def _with_client(handler, coroutine_factory):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await coroutine_factory(client)
+
+    return asyncio.run(scenario())
+
+
+def _collect(client, sitemaps, max_urls=100, max_files=10):
+    async def collect():
+        return [entry async for entry in iter_sitemap_urls(client, sitemaps, max_urls, max_files)]
+
+    return collect()
+
+
+def test_robots_rules_crawl_delay_and_sitemaps():
+    robots = _with_client(_serve, lambda client: fetch_robots(client, 'https://example.com/docs', 'crawler'))
+
+    assert robots.sitemaps == ['https://example.com/sitemap_index.xml']
+    # RobotFileParser would drop the fractional delay
+    assert robots.crawl_delay == 0.5
+    assert not robots.can_fetch('https://example.com/private/report')
+    assert robots.can_fetch('https://example.com/pricing')
+
+
+def test_missing_robots_allows_everything():
+    robots = _with_client(lambda request: httpx.Response(404),
+                          lambda client: fetch_robots(client, 'https://example.com/', 'crawler'))
+
+    assert robots.sitemaps == []
+    assert robots.crawl_delay is None
+    assert robots.can_fetch('https://example.com/private/report')
+
+
+def test_sitemap_index_is_followed_including_gzip_files():
+    entries = _with_client(_serve, lambda client: _collect(client, ['https://example.com/sitemap_index.xml']))
+
+    assert entries == [
+        ('https://example.com/about', '2026-09-01'),
+        ('https://example.com/pricing', None),
+        ('https://example.com/blog/launch', '2026-10-01T09:00:00+00:00'),
+    ]
+
+
+def test_sitemap_limits():
+    entries = _with_client(_serve, lambda client: _collect(client, ['https://example.com/sitemap_index.xml'],
+                                                           max_urls=1))
+    assert entries == [('https://example.com/about', '2026-09-01')]
+
+    # The index itself is the only file read
+    entries = _with_client(_serve, lambda client: _collect(client, ['https://example.com/sitemap_index.xml'],
+                                                           max_files=1))
+    assert entries == []
+
+
+def test_broken_sitemap_does_not_stop_the_others():
+    def serve(request):
+        if request.url.path == '/broken.xml':
+            return httpx.Response(200, content=b'<urlset><url><loc>https://example.com/a</loc>')
+        return _serve(request)
+
+    entries = _with_client(serve, lambda client: _collect(
+        client, ['https://example.com/broken.xml', 'https://example.com/pages.xml']
+    ))
+
+    assert ('https://example.com/pricing', None) in entries
+
+
+def test_default_sitemap_url():
+    assert default_sitemap_url('https://example.com/docs/intro') == 'https://example.com/sitemap.xml'